@@ -5,12 +5,14 @@ from datetime import datetime, timedelta
 
 from airflow.models.dag import DAG
 from airflow.operators.bash import BashOperator
-from airflow.operators.python import PythonOperator
+from airflow.operators.python import PythonOperator, ShortCircuitOperator
 
 # --- الخطوة 1: إضافة مسار المشروع إلى مسار بايثون ---
 # هذا يسمح لـ Airflow بالعثور على السكربت الخاص بك في مجلد "scripts"
 sys.path.append('/opt/airflow/projects/Olist_ETL_Project')
-from scripts.ingest_to_bronze import main_ingest
+from config import INGEST_CONFIG, WAREHOUSE_CONFIG
+from scripts.dbt_selection import plan_dbt_selection, save_dbt_state
+from scripts.ingest_to_bronze import discover_sources, ingest_table
 
 # --- تعريف الـ DAG ---
 with DAG(
@@ -26,26 +28,63 @@ with DAG(
     }
 ) as dag:
 
-    # --- المهمة الأولى: تشغيل سكربت بايثون لتحميل البيانات الخام ---
-    ingest_task = PythonOperator(
-        task_id='ingest_raw_data_to_bronze',
-        python_callable=main_ingest
+    # --- المهمة الأولى: اكتشاف مصادر البيانات الخام (جداول PostgreSQL وملفات CSV) ---
+    discover_task = PythonOperator(
+        task_id='discover_bronze_sources',
+        python_callable=discover_sources
     )
 
+    # --- مهمة لكل جدول: تحميل البيانات الخام إلى طبقة Bronze ---
+    # Dynamic task mapping: one task per source, each with its own retries, duration
+    # and a slot of the ingestion pool (the pool size caps how many tables load at once).
+    # The DuckDB warehouse takes one writing process at a time, so its tables load one by
+    # one whatever the pool size
+    ingest_task = PythonOperator.partial(
+        task_id='ingest_raw_data_to_bronze',
+        python_callable=ingest_table,
+        pool=INGEST_CONFIG["airflow_pool"],
+        pool_slots=1,
+        max_active_tis_per_dag=1 if WAREHOUSE_CONFIG["engine"] == "duckdb" else None,
+        # Checkpoints are kept per DAG run, so a retry resumes the failed attempt
+        op_kwargs={"run_id": "{{ run_id }}"}
+    ).expand(op_args=discover_task.output.map(lambda source: [source]))
+
     # --- تعريف المسار إلى مشروع dbt داخل الحاوية ---
     dbt_project_path = "/opt/airflow/projects/Olist_ETL_Project/dbt_project/olist_dbt_project/"
 
-    # --- المهمة الثانية: تشغيل dbt لبناء كل النماذج ---
+    # --- اختيار نماذج dbt المتأثرة بجداول Bronze التي تغيرت ---
+    # Returns the dbt selection (source:bronze.RAW_X+ per changed table, plus state:modified+
+    # when the project changed); when nothing changed it returns None and dbt is skipped
+    select_dbt_task = ShortCircuitOperator(
+        task_id='select_dbt_models',
+        python_callable=plan_dbt_selection,
+        op_args=[ingest_task.output],
+        op_kwargs={"project_dir": dbt_project_path}
+    )
+    dbt_selection = "{{ ti.xcom_pull(task_ids='select_dbt_models')['args'] }}"
+    # Snowflake (dev) or the local DuckDB warehouse (duckdb), see WAREHOUSE_CONFIG
+    dbt_target = f"--target {WAREHOUSE_CONFIG['dbt_target']}"
+
+    # --- المهمة الثانية: تشغيل dbt لبناء النماذج المتأثرة فقط ---
     dbt_run_task = BashOperator(
         task_id='run_dbt_models',
-        bash_command=f"cd {dbt_project_path} && dbt run"
+        bash_command=f"cd {dbt_project_path} && dbt run {dbt_target} {dbt_selection}"
     )
 
-    # --- المهمة الثالثة: تشغيل اختبارات الجودة ---
+    # --- المهمة الثالثة: تشغيل اختبارات الجودة على نفس النماذج ---
     dbt_test_task = BashOperator(
         task_id='test_dbt_models',
-        bash_command=f"cd {dbt_project_path} && dbt test"
+        bash_command=f"cd {dbt_project_path} && dbt test {dbt_target} {dbt_selection}"
+    )
+
+    # --- حفظ حالة dbt (manifest) للمقارنة في التشغيل التالي ---
+    save_dbt_state_task = PythonOperator(
+        task_id='save_dbt_state',
+        python_callable=save_dbt_state,
+        op_args=[select_dbt_task.output],
+        op_kwargs={"project_dir": dbt_project_path}
     )
 
     # --- تحديد ترتيب تنفيذ المهام ---
-    ingest_task >> dbt_run_task >> dbt_test_task
\ No newline at end of file
+    # dbt runs only once every mapped ingestion task has succeeded
+    discover_task >> ingest_task >> select_dbt_task >> dbt_run_task >> dbt_test_task >> save_dbt_state_task
\ No newline at end of file
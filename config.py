@@ -21,3 +21,150 @@ SNOWFLAKE_CONFIG = {
     "database": os.getenv("SNOWFLAKE_DATABASE"),
     "schema": os.getenv("SNOWFLAKE_SCHEMA")
 }
+
+# Warehouse of the bronze tables and the dbt models: "snowflake", or "duckdb" for a local
+# DuckDB file that runs the pipeline offline (see scripts/duckdb_warehouse.py)
+WAREHOUSE_CONFIG = {
+    "engine": os.getenv("WAREHOUSE", "snowflake"),
+    # The file's catalog is named after it, so project_db matches the PROJECT_DB database of the dbt sources
+    "duckdb_path": os.getenv("DUCKDB_PATH") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "data", "_warehouse", "project_db.duckdb"
+    ),
+    "duckdb_schema": os.getenv("DUCKDB_SCHEMA", "BRONZE_RAW_DATA"),
+    # dbt target of profiles.yml the DAG builds with
+    "dbt_target": os.getenv("DBT_TARGET") or ("duckdb" if os.getenv("WAREHOUSE") == "duckdb" else "dev"),
+}
+
+# Connection pools (see connections.py): engines and connections are created lazily,
+# once per process, and reused by every table and worker
+CONNECTION_CONFIG = {
+    # PostgreSQL: SQLAlchemy QueuePool size and overflow, recycle age, liveness check on checkout
+    "pg_pool_size": int(os.getenv("PG_POOL_SIZE", "5")),
+    "pg_max_overflow": int(os.getenv("PG_MAX_OVERFLOW", "5")),
+    "pg_pool_recycle": int(os.getenv("PG_POOL_RECYCLE", "1800")),
+    "pg_pool_pre_ping": os.getenv("PG_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+    # TCP keepalive idle seconds of PostgreSQL connections (0 disables keepalives)
+    "pg_keepalives_idle": int(os.getenv("PG_KEEPALIVES_IDLE", "60")),
+    # Snowflake: pool size (at least INGEST_MAX_WORKERS), reconnect age and session keepalive
+    "sf_pool_size": int(os.getenv("SNOWFLAKE_POOL_SIZE", "4")),
+    "sf_pool_recycle": int(os.getenv("SNOWFLAKE_POOL_RECYCLE", "3600")),
+    "sf_keep_alive": os.getenv("SNOWFLAKE_KEEP_ALIVE", "true").lower() in ("1", "true", "yes"),
+    # Session parameters of every pooled Snowflake connection
+    "sf_session_parameters": {
+        "QUERY_TAG": os.getenv("SNOWFLAKE_QUERY_TAG", "olist_ingest"),
+        "STATEMENT_TIMEOUT_IN_SECONDS": int(os.getenv("SNOWFLAKE_STATEMENT_TIMEOUT", "3600")),
+    },
+    # DuckDB (WAREHOUSE=duckdb): pooled connections to the warehouse file (at least INGEST_MAX_WORKERS)
+    "duckdb_pool_size": int(os.getenv("DUCKDB_POOL_SIZE", "4")),
+}
+
+# Ingestion Configuration
+INGEST_CONFIG = {
+    # Stream source tables in batches instead of loading them fully into memory
+    "streaming": os.getenv("INGEST_STREAMING", "false").lower() in ("1", "true", "yes"),
+    # Number of rows fetched per server-side cursor / CSV chunk in streaming mode
+    "batch_size": int(os.getenv("INGEST_BATCH_SIZE", "50000")),
+    # Number of tables ingested concurrently, each on its own Snowflake connection
+    "max_workers": int(os.getenv("INGEST_MAX_WORKERS", "1")),
+    # Extract only PostgreSQL rows past the stored high-watermark (see INCREMENTAL_SOURCES)
+    "incremental": os.getenv("INGEST_INCREMENTAL", "false").lower() in ("1", "true", "yes"),
+    # How incremental rows reach bronze: "merge" (upsert on the key) or "append"
+    "incremental_write": os.getenv("INGEST_INCREMENTAL_WRITE", "merge"),
+    # Merge the changes of a logical replication slot per PostgreSQL table (wal2json) instead
+    "cdc": os.getenv("INGEST_CDC", "false").lower() in ("1", "true", "yes"),
+    "cdc_slot_prefix": os.getenv("INGEST_CDC_SLOT_PREFIX", "bronze_cdc"),
+    "cdc_batch_changes": int(os.getenv("INGEST_CDC_BATCH_CHANGES", "10000")),
+    # How rows are loaded into Snowflake: "write_pandas" or "copy" (Parquet + PUT + COPY INTO)
+    "load_engine": os.getenv("INGEST_LOAD_ENGINE", "write_pandas"),
+    # "copy" engine: local staging directory, rows per Parquet file, compression and PUT threads
+    "staging_dir": os.getenv(
+        "INGEST_STAGING_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "_staging")
+    ),
+    "parquet_chunk_rows": int(os.getenv("INGEST_PARQUET_CHUNK_ROWS", "250000")),
+    "parquet_compression": os.getenv("INGEST_PARQUET_COMPRESSION", "snappy"),
+    "put_parallel": int(os.getenv("INGEST_PUT_PARALLEL", "8")),
+    # Per-stage metrics: JSON log records, and an optional metrics file ("json" or "statsd" lines)
+    "metrics_log": os.getenv("INGEST_METRICS_LOG", "true").lower() in ("1", "true", "yes"),
+    "metrics_file": os.getenv("INGEST_METRICS_FILE") or None,
+    "metrics_format": os.getenv("INGEST_METRICS_FORMAT", "json"),
+    # Local columnar cache of the sources (Parquet, keyed by content hash), shared with the data-quality report
+    "cache": os.getenv("INGEST_CACHE", "false").lower() in ("1", "true", "yes"),
+    "cache_dir": os.getenv(
+        "INGEST_CACHE_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "_cache")
+    ),
+    "cache_compression": os.getenv("INGEST_CACHE_COMPRESSION", "snappy"),
+    # DataFrame engine of whole-file CSV reads and the report's business metrics: "pandas" or "polars"
+    "frame_engine": os.getenv("INGEST_FRAME_ENGINE", "pandas"),
+    # Parallel CSV reader: parser processes per file (1 = off) and minimum bytes per split range
+    "csv_workers": int(os.getenv("INGEST_CSV_WORKERS", "1")),
+    "csv_split_bytes": int(os.getenv("INGEST_CSV_SPLIT_BYTES", str(64 * 1024 * 1024))),
+    # Apply the PRELOAD_TRANSFORMS below to the batches of every table before loading
+    "transforms": os.getenv("INGEST_TRANSFORMS", "false").lower() in ("1", "true", "yes"),
+    # Hold the Olist key columns as integer codes of a shared dictionary between reading and loading
+    "encode_ids": os.getenv("INGEST_ENCODE_IDS", "false").lower() in ("1", "true", "yes"),
+    # Extract, serialize and upload the batches of a table concurrently, through bounded queues
+    "pipeline": os.getenv("INGEST_PIPELINE", "false").lower() in ("1", "true", "yes"),
+    "pipeline_queue_size": int(os.getenv("INGEST_PIPELINE_QUEUE_SIZE", "2")),
+    # Incrementally maintained aggregates of the business summary (SQLite, see scripts/kpi_store.py)
+    "kpi_store": os.getenv("INGEST_KPI_STORE", "false").lower() in ("1", "true", "yes"),
+    "kpi_store_path": os.getenv(
+        "INGEST_KPI_STORE_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "_kpi", "kpi_store.sqlite")
+    ),
+    # Checkpoint every table and chunk so a retried run resumes where it failed; loads are
+    # committed with their load id in the Snowflake load log table, which makes replays idempotent
+    "checkpoints": os.getenv("INGEST_CHECKPOINTS", "true").lower() in ("1", "true", "yes"),
+    "load_log_table": os.getenv("INGEST_LOAD_LOG_TABLE", "INGEST_LOAD_LOG"),
+    # Airflow pool of the per-table ingestion tasks; its slots cap how many tables load at once
+    "airflow_pool": os.getenv("INGEST_AIRFLOW_POOL", "bronze_ingest"),
+    # Directory for state kept between runs (watermarks, ...)
+    "state_dir": os.getenv(
+        "INGEST_STATE_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "_ingest_state")
+    )
+}
+
+# Incremental extraction settings per PostgreSQL table.
+# "watermark_column" is compared against the stored high-watermark and "key"
+# identifies a row when merging into bronze. raw_customers has no timestamp
+# of its own, so it follows the purchase timestamp of the orders that
+# reference it ("watermark_table" joined on "join_column").
+INCREMENTAL_SOURCES = {
+    "raw_orders": {
+        "key": "order_id",
+        "watermark_column": os.getenv("RAW_ORDERS_WATERMARK_COLUMN", "order_purchase_timestamp")
+    },
+    "raw_customers": {
+        "key": "customer_id",
+        "watermark_column": os.getenv("RAW_CUSTOMERS_WATERMARK_COLUMN", "order_purchase_timestamp"),
+        "watermark_table": "raw_orders",
+        "join_column": "customer_id"
+    }
+}
+
+# Pre-load transformations per Bronze table, applied on every batch when
+# INGEST_TRANSFORMS is enabled (see scripts/preload_transforms.py): column
+# pruning ("columns"), value normalization ("normalize"), hash-based
+# deduplication ("dedupe") and aggregation per key ("aggregate").
+# raw_geolocation repeats every zip code prefix with many duplicate
+# coordinates; it is loaded as one row per prefix instead.
+PRELOAD_TRANSFORMS = {
+    "raw_geolocation": {
+        "normalize": {
+            "geolocation_city": ["strip", "lower", "ascii"],
+            "geolocation_state": ["strip", "upper"],
+        },
+        "dedupe": True,
+        "aggregate": {
+            "by": ["geolocation_zip_code_prefix"],
+            "columns": {
+                "geolocation_lat": "mean",
+                "geolocation_lng": "mean",
+                "geolocation_city": "first",
+                "geolocation_state": "first",
+            },
+        },
+    },
+}
@@ -0,0 +1,373 @@
+"""
+Shared, lazily created connections to the source database and the
+warehouse (Snowflake, or a local DuckDB file).
+
+Nothing connects at import time. The first `get_pg_engine()` call creates
+the process's SQLAlchemy engine (a QueuePool with pre-ping, recycling and
+TCP keepalives) and the first `get_snowflake_pool()` call creates its
+Snowflake connection pool (sessions kept alive, with the session
+parameters of CONNECTION_CONFIG, reopened once they are older than the
+recycle age). Both are reused by every table and worker afterwards, so a
+run, and every later run in the same process, pays the connection setup
+once instead of once per table. With WAREHOUSE=duckdb `get_warehouse_pool()`
+pools connections to the DuckDB file of WAREHOUSE_CONFIG instead, sized
+by "duckdb_pool_size" (see `scripts/duckdb_warehouse.py`).
+
+`pool_stats()` reports how many connections were opened, how often one
+was reused and how long workers waited for one; the ingestion adds it to
+its run metrics. Everything is closed by `close_all()`, which also runs
+at interpreter exit.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+
+from config import PG_CONFIG, SNOWFLAKE_CONFIG, CONNECTION_CONFIG, WAREHOUSE_CONFIG
+
+WAREHOUSES = ('snowflake', 'duckdb')
+
+_lock = threading.Lock()
+_pg_engines = {}
+_pg_counters = {}
+_snowflake_pool = None
+_duckdb_pool = None
+# Put on a pool's idle queue to wake a worker waiting for a connection
+_WAKE = object()
+
+
+def pg_url():
+    """
+    Return the SQLAlchemy URL of the source PostgreSQL database.
+    """
+    return (
+        f'postgresql://{PG_CONFIG["user"]}:{PG_CONFIG["password"]}'
+        f'@{PG_CONFIG["host"]}:{PG_CONFIG["port"]}/{PG_CONFIG["database"]}'
+    )
+
+
+def _count_pg_events(engine, counters):
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        counters["opened"] += 1
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        counters["checkouts"] += 1
+
+
+def get_pg_engine(url=None, pool_size=None):
+    """
+    Return the shared engine of a PostgreSQL database (default: PG_CONFIG),
+    creating it on first use. Its pool holds at least `pool_size`
+    connections (e.g. one per ingestion worker) and CONNECTION_CONFIG's
+    "pg_pool_size" otherwise. A later call asking for a larger pool
+    replaces the engine with a larger one and disposes of the old one
+    (its checked-out connections are closed as they are returned).
+    """
+    url = url or pg_url()
+    with _lock:
+        size = max(CONNECTION_CONFIG["pg_pool_size"], pool_size or 0)
+        previous = _pg_engines.get(url)
+        if previous is not None:
+            if previous.pool.size() >= size:
+                return previous
+            previous.dispose()
+        connect_args = {}
+        if CONNECTION_CONFIG["pg_keepalives_idle"] > 0:
+            connect_args = {
+                "keepalives": 1,
+                "keepalives_idle": CONNECTION_CONFIG["pg_keepalives_idle"],
+                "keepalives_interval": 10,
+                "keepalives_count": 5,
+            }
+        engine = create_engine(
+            url,
+            pool_size=size,
+            max_overflow=CONNECTION_CONFIG["pg_max_overflow"],
+            pool_recycle=CONNECTION_CONFIG["pg_pool_recycle"],
+            pool_pre_ping=CONNECTION_CONFIG["pg_pool_pre_ping"],
+            connect_args=connect_args,
+        )
+        _pg_counters.setdefault(url, {"opened": 0, "checkouts": 0})
+        _count_pg_events(engine, _pg_counters[url])
+        _pg_engines[url] = engine
+        logging.info(f"✅ {'Resized' if previous is not None else 'Created'} PostgreSQL engine "
+                     f"(pool size {size}, overflow {CONNECTION_CONFIG['pg_max_overflow']})")
+        return engine
+
+
+def connect_snowflake():
+    """
+    Open a new Snowflake connection using SNOWFLAKE_CONFIG plus the role
+    from the environment, with the keepalive and session parameters of
+    CONNECTION_CONFIG.
+    """
+    import snowflake.connector
+
+    # Add role to Snowflake config for correct permissions
+    snowflake_config_with_role = SNOWFLAKE_CONFIG.copy()
+    snowflake_config_with_role['role'] = os.getenv("SNOWFLAKE_ROLE", "ACCOUNTADMIN")
+    return snowflake.connector.connect(
+        **snowflake_config_with_role,
+        client_session_keep_alive=CONNECTION_CONFIG["sf_keep_alive"],
+        session_parameters=CONNECTION_CONFIG["sf_session_parameters"],
+    )
+
+
+def connect_duckdb(path=None, schema=None):
+    """
+    Open a connection to the local DuckDB warehouse (default:
+    WAREHOUSE_CONFIG["duckdb_path"]), creating the file and the bronze
+    schema if needed and making the schema the default one.
+    """
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError("The DuckDB warehouse requires duckdb (pip install duckdb)") from e
+
+    path = Path(path or WAREHOUSE_CONFIG["duckdb_path"])
+    schema = schema or WAREHOUSE_CONFIG["duckdb_schema"]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Connections to the same file share one database instance within the process
+    conn = duckdb.connect(str(path))
+    conn.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+    conn.execute(f'USE "{schema}"')
+    return conn
+
+
+class WarehouseConnectionPool:
+    """
+    A thread-safe pool of warehouse connections (Snowflake by default).
+
+    Connections are opened lazily with `connect()` (default
+    `connect_snowflake`) up to `max_size` and handed to one worker at a
+    time. A released connection is reused by the next `acquire()` unless
+    it has been closed or is older than `recycle` seconds, in which case a
+    new one is opened. Connections are opened outside the pool's lock, on
+    a slot reserved under it. All are closed together by `close_all()`,
+    which wakes the workers waiting for a connection. The pool
+    works with any connection factory; `label` names its connections in
+    the log (e.g. "DuckDB").
+    """
+
+    def __init__(self, max_size, connect=None, recycle=None, label="Snowflake"):
+        self.max_size = max_size
+        self.connect = connect or connect_snowflake
+        self.label = label
+        self.recycle = CONNECTION_CONFIG["sf_pool_recycle"] if recycle is None else recycle
+        self._idle = queue.Queue()
+        # id(connection) -> (connection, monotonic time it was opened)
+        self._connections = {}
+        # Slots reserved by connections being opened, and workers waiting for one
+        self._pending = 0
+        self._waiting = 0
+        self._lock = threading.Lock()
+        self.counters = {"opened": 0, "reused": 0, "recycled": 0, "waits": 0, "wait_seconds": 0.0}
+
+    def resize(self, max_size):
+        """
+        Allow at least `max_size` connections.
+        """
+        with self._lock:
+            self.max_size = max(self.max_size, max_size)
+
+    def _usable(self, conn):
+        is_closed = getattr(conn, 'is_closed', None)
+        if is_closed is not None and is_closed():
+            return False
+        entry = self._connections.get(id(conn))
+        # A connection opened before the pool was closed is not reused
+        return entry is not None and (not self.recycle or time.monotonic() - entry[1] < self.recycle)
+
+    def _discard(self, conn):
+        with self._lock:
+            self._connections.pop(id(conn), None)
+            self.counters["recycled"] += 1
+        try:
+            conn.close()
+        except Exception as e:
+            logging.warning(f"⚠️ Could not close a stale {self.label} connection: {e}")
+
+    def _wake_waiter(self):
+        with self._lock:
+            waiting = self._waiting
+        if waiting:
+            self._idle.put(_WAKE)
+
+    def _take_idle(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return None
+            if conn is _WAKE:
+                continue
+            if self._usable(conn):
+                with self._lock:
+                    self.counters["reused"] += 1
+                return conn
+            self._discard(conn)
+
+    def _open(self):
+        try:
+            conn = self.connect()
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            # The reserved slot is free again for a waiting worker
+            self._wake_waiter()
+            raise
+        with self._lock:
+            self._pending -= 1
+            self._connections[id(conn)] = (conn, time.monotonic())
+            self.counters["opened"] += 1
+            opened = len(self._connections)
+        logging.info(f"✅ Opened {self.label} connection {opened}/{self.max_size}")
+        return conn
+
+    def acquire(self):
+        while True:
+            conn = self._take_idle()
+            if conn is not None:
+                return conn
+
+            with self._lock:
+                reserved = len(self._connections) + self._pending < self.max_size
+                if reserved:
+                    self._pending += 1
+                else:
+                    self._waiting += 1
+            if reserved:
+                return self._open()
+
+            started = time.perf_counter()
+            try:
+                conn = self._idle.get()
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+                    self.counters["waits"] += 1
+                    self.counters["wait_seconds"] += time.perf_counter() - started
+            if conn is _WAKE:
+                continue
+            if self._usable(conn):
+                with self._lock:
+                    self.counters["reused"] += 1
+                return conn
+            self._discard(conn)
+
+    def release(self, conn):
+        self._idle.put(conn)
+
+    def stats(self):
+        with self._lock:
+            open_connections = len(self._connections)
+            stats = dict(self.counters, max_size=self.max_size, open=open_connections)
+        stats["idle"] = self._idle.qsize()
+        stats["in_use"] = open_connections - stats["idle"]
+        stats["wait_seconds"] = round(stats["wait_seconds"], 4)
+        return stats
+
+    def close_all(self):
+        with self._lock:
+            connections = [conn for conn, _ in self._connections.values()]
+            self._connections.clear()
+            waiting = self._waiting
+        # Drain the queue in place, as replacing it would strand the workers blocked on it
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        for _ in range(waiting):
+            self._idle.put(_WAKE)
+        for conn in connections:
+            conn.close()
+        if connections:
+            logging.info(f"Closed {len(connections)} {self.label} connection(s).")
+
+
+def get_snowflake_pool(max_size=None):
+    """
+    Return the shared Snowflake connection pool, creating it on first use.
+    It allows at least `max_size` connections (e.g. one per ingestion
+    worker) and CONNECTION_CONFIG's "sf_pool_size" otherwise.
+    """
+    global _snowflake_pool
+    with _lock:
+        if _snowflake_pool is None:
+            _snowflake_pool = WarehouseConnectionPool(CONNECTION_CONFIG["sf_pool_size"])
+        _snowflake_pool.resize(max_size or 0)
+        return _snowflake_pool
+
+
+def get_warehouse_pool(warehouse=None, max_size=None):
+    """
+    Return the shared connection pool of a warehouse (default:
+    WAREHOUSE_CONFIG["engine"]), creating it on first use. It allows at
+    least `max_size` connections and CONNECTION_CONFIG's "sf_pool_size"
+    (Snowflake) or "duckdb_pool_size" (DuckDB) otherwise.
+    """
+    global _duckdb_pool
+    warehouse = warehouse or WAREHOUSE_CONFIG["engine"]
+    if warehouse == 'snowflake':
+        return get_snowflake_pool(max_size)
+    if warehouse != 'duckdb':
+        raise ValueError(f"Unknown warehouse '{warehouse}', expected one of {WAREHOUSES}")
+    with _lock:
+        if _duckdb_pool is None:
+            # Local connections never go stale
+            _duckdb_pool = WarehouseConnectionPool(CONNECTION_CONFIG["duckdb_pool_size"], connect=connect_duckdb,
+                                                   recycle=0, label="DuckDB")
+        _duckdb_pool.resize(max_size or 0)
+        return _duckdb_pool
+
+
+def pool_stats():
+    """
+    Return the statistics of the shared PostgreSQL engines and warehouse pools.
+    """
+    postgres = {}
+    with _lock:
+        for url, engine in _pg_engines.items():
+            pool = engine.pool
+            counters = _pg_counters[url]
+            postgres[engine.url.render_as_string(hide_password=True)] = {
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "opened": counters["opened"],
+                "checkouts": counters["checkouts"],
+                "reused": max(counters["checkouts"] - counters["opened"], 0),
+            }
+        snowflake = _snowflake_pool.stats() if _snowflake_pool is not None else None
+        duckdb = _duckdb_pool.stats() if _duckdb_pool is not None else None
+    return {"postgres": postgres, "snowflake": snowflake, "duckdb": duckdb}
+
+
+def close_all():
+    """
+    Close the shared warehouse connections and dispose of the engines.
+    """
+    global _snowflake_pool, _duckdb_pool
+    with _lock:
+        pools = [_snowflake_pool, _duckdb_pool]
+        _snowflake_pool = _duckdb_pool = None
+        engines = list(_pg_engines.values())
+        _pg_engines.clear()
+        _pg_counters.clear()
+    for pool in pools:
+        if pool is not None:
+            pool.close_all()
+    for engine in engines:
+        engine.dispose()
+
+
+atexit.register(close_all)
@@ -0,0 +1,254 @@
+"""
+Ingestion benchmark against local stand-ins.
+
+For every requested scale factor a synthetic Olist dataset is generated
+(`scripts/synthetic_olist.py`), the PostgreSQL tables are served from
+SQLite and the Snowflake sink is a file-backed RecordingSnowflakeConnection
+used through the Parquet/COPY load engine. Each table is extracted and
+loaded with the same functions main_ingest uses, timing extraction and
+load separately, and the results are written as a JSON report that can be
+diffed across versions. With `--warehouse duckdb` the end-to-end run loads
+into a DuckDB file in the work dir instead (see `scripts/duckdb_warehouse.py`).
+
+Example:
+    python scripts/benchmark_ingest.py --scale 1 10 --output bench/report.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+from config import INGEST_CONFIG
+from scripts.bronze_loaders import ParquetCopyLoader, RecordingSnowflakeConnection
+from scripts.bronze_schemas import CSV_FILE_NAMES, apply_schema, read_csv_typed
+from scripts.ingest_metrics import peak_rss_mb
+from scripts.ingest_to_bronze import iter_csv_batches, iter_postgres_batches, main_ingest
+from scripts.synthetic_olist import POSTGRES_TABLES, generate_dataset
+
+REPORT_VERSION = 1
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment():
+    try:
+        import pyarrow
+        pyarrow_version = pyarrow.__version__
+    except ImportError:
+        pyarrow_version = None
+    return {
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pd.__version__,
+        "pyarrow": pyarrow_version,
+    }
+
+
+def _iter_source(table, csv_dir, sqlite_engine, streaming, batch_size):
+    """
+    Yield the batches of one source the way main_ingest reads it.
+    """
+    if table in POSTGRES_TABLES:
+        if streaming:
+            yield from iter_postgres_batches(sqlite_engine, table, batch_size)
+        else:
+            yield apply_schema(pd.read_sql(f'SELECT * FROM {table}', sqlite_engine), table)
+    elif streaming:
+        yield from iter_csv_batches(csv_dir / CSV_FILE_NAMES[table], table, batch_size)
+    else:
+        yield read_csv_typed(csv_dir / CSV_FILE_NAMES[table], table)
+
+
+def benchmark_table(table, csv_dir, sqlite_engine, sink, staging_dir, streaming, batch_size):
+    """
+    Extract and load one table, timing the two stages separately.
+    """
+    source_bytes = (csv_dir / CSV_FILE_NAMES[table]).stat().st_size
+    loader = ParquetCopyLoader(sink, table, staging_dir=staging_dir)
+    extract_seconds = load_seconds = 0.0
+    rows = batches = 0
+
+    batches_iter = _iter_source(table, csv_dir, sqlite_engine, streaming, batch_size)
+    while True:
+        started = time.perf_counter()
+        df = next(batches_iter, None)
+        extract_seconds += time.perf_counter() - started
+        if df is None:
+            break
+        started = time.perf_counter()
+        loader.write(df)
+        load_seconds += time.perf_counter() - started
+        rows += len(df)
+        batches += 1
+        del df
+
+    started = time.perf_counter()
+    load_stats = loader.close()
+    load_seconds += time.perf_counter() - started
+
+    total_seconds = extract_seconds + load_seconds
+    return {
+        "source": "sqlite" if table in POSTGRES_TABLES else "csv",
+        "rows": rows,
+        "batches": batches,
+        "source_bytes": source_bytes,
+        "staged_bytes": load_stats["bytes"],
+        "extract_seconds": round(extract_seconds, 4),
+        "load_seconds": round(load_seconds, 4),
+        "total_seconds": round(total_seconds, 4),
+        "rows_per_sec": round(rows / total_seconds, 1) if total_seconds else None,
+        "mb_per_sec": round(source_bytes / 1024 / 1024 / total_seconds, 3) if total_seconds else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "load_stats": load_stats,
+    }
+
+
+def run_benchmark(scale, work_dir, streaming=False, batch_size=None, end_to_end=False, max_workers=None,
+                  warehouse='snowflake'):
+    """
+    Generate a dataset at `scale`, benchmark every table and return the
+    report entry for this scale factor.
+    """
+    batch_size = batch_size or INGEST_CONFIG["batch_size"]
+    scale_dir = Path(work_dir) / f"scale_{scale:g}"
+    shutil.rmtree(scale_dir, ignore_errors=True)
+    csv_dir = scale_dir / 'raw_data'
+    sqlite_path = scale_dir / 'source.sqlite'
+
+    logging.info(f"Generating synthetic dataset at scale {scale:g}...")
+    started = time.perf_counter()
+    counts = generate_dataset(csv_dir, scale=scale, sqlite_path=sqlite_path)
+    generation_seconds = time.perf_counter() - started
+
+    sqlite_engine = create_engine(f"sqlite:///{sqlite_path}")
+    sink = RecordingSnowflakeConnection(data_dir=scale_dir / 'sink')
+    tables = {}
+    for table in counts:
+        logging.info(f"Benchmarking {table} ({counts[table]:,} rows)...")
+        tables[table] = benchmark_table(
+            table, csv_dir, sqlite_engine, sink, scale_dir / 'staging', streaming, batch_size
+        )
+        logging.info(
+            f"  extract {tables[table]['extract_seconds']:.2f}s, load {tables[table]['load_seconds']:.2f}s, "
+            f"{tables[table]['rows_per_sec'] or 0:,.0f} rows/sec"
+        )
+
+    total_rows = sum(t["rows"] for t in tables.values())
+    total_bytes = sum(t["source_bytes"] for t in tables.values())
+    total_seconds = sum(t["total_seconds"] for t in tables.values())
+    entry = {
+        "scale": scale,
+        "generation_seconds": round(generation_seconds, 3),
+        "tables": tables,
+        "totals": {
+            "rows": total_rows,
+            "source_bytes": total_bytes,
+            "extract_seconds": round(sum(t["extract_seconds"] for t in tables.values()), 4),
+            "load_seconds": round(sum(t["load_seconds"] for t in tables.values()), 4),
+            "total_seconds": round(total_seconds, 4),
+            "rows_per_sec": round(total_rows / total_seconds, 1) if total_seconds else None,
+            "mb_per_sec": round(total_bytes / 1024 / 1024 / total_seconds, 3) if total_seconds else None,
+            "peak_rss_mb": peak_rss_mb(),
+        },
+    }
+
+    if end_to_end:
+        # Full main_ingest run (discovery, pool, parallelism) against the same stand-ins.
+        # The CSV copies of the PostgreSQL tables are ignored by discovery, as in production.
+        # State, staging and cache files go to the work dir so the real manifest is untouched.
+        INGEST_CONFIG["state_dir"] = str(scale_dir / 'state')
+        INGEST_CONFIG["staging_dir"] = str(scale_dir / 'staging')
+        INGEST_CONFIG["cache_dir"] = str(scale_dir / 'cache')
+        if warehouse == 'duckdb':
+            from connections import connect_duckdb
+            connect = partial(connect_duckdb, scale_dir / 'project_db.duckdb')
+        else:
+            connect = lambda: RecordingSnowflakeConnection(data_dir=scale_dir / 'sink_end_to_end')
+        started = time.perf_counter()
+        main_ingest(
+            streaming=streaming, batch_size=batch_size, max_workers=max_workers, force=True,
+            load_engine='copy', warehouse=warehouse, pg_engine=sqlite_engine, csv_path=csv_dir, connect=connect
+        )
+        entry["end_to_end_seconds"] = round(time.perf_counter() - started, 3)
+
+    sqlite_engine.dispose()
+    return entry
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Olist bronze ingestion against local stand-ins.")
+    parser.add_argument('--scale', type=float, nargs='+', default=[1.0],
+                        help="Scale factors relative to the public dataset (e.g. 1 10 100).")
+    parser.add_argument('--work-dir', default=str(project_root / 'data' / '_benchmark'),
+                        help="Directory for generated data, staging files and the fake sink.")
+    parser.add_argument('--output', default=None,
+                        help="Path of the JSON report (default: <work-dir>/benchmark_report.json).")
+    parser.add_argument('--stream', action='store_true', help="Extract in batches (streaming mode).")
+    parser.add_argument('--batch-size', type=int, default=None, help="Rows per batch in streaming mode.")
+    parser.add_argument('--end-to-end', action='store_true',
+                        help="Also time a full main_ingest run against the stand-ins.")
+    parser.add_argument('--max-workers', type=int, default=None, help="Workers for the end-to-end run.")
+    parser.add_argument('--warehouse', choices=('snowflake', 'duckdb'), default='snowflake',
+                        help="Sink of the end-to-end run: the recorded Snowflake stand-in or a local DuckDB file.")
+    parser.add_argument('--keep-data', action='store_true', help="Keep the generated data after the run.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    work_dir = Path(args.work_dir)
+    output = Path(args.output) if args.output else work_dir / 'benchmark_report.json'
+
+    report = {
+        "report_version": REPORT_VERSION,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "environment": _environment(),
+        "options": {
+            "streaming": args.stream,
+            "batch_size": args.batch_size or INGEST_CONFIG["batch_size"],
+            "load_engine": "copy",
+            "warehouse": args.warehouse,
+            "parquet_chunk_rows": INGEST_CONFIG["parquet_chunk_rows"],
+            "parquet_compression": INGEST_CONFIG["parquet_compression"],
+        },
+        "runs": [],
+    }
+    for scale in args.scale:
+        report["runs"].append(run_benchmark(
+            scale, work_dir, streaming=args.stream, batch_size=args.batch_size,
+            end_to_end=args.end_to_end, max_workers=args.max_workers, warehouse=args.warehouse
+        ))
+        if not args.keep_data:
+            shutil.rmtree(work_dir / f"scale_{scale:g}", ignore_errors=True)
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, default=str)
+    logging.info(f"✅ Benchmark report written to {output}")
+    return report
+
+
+if __name__ == '__main__':
+    main()
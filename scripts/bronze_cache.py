@@ -0,0 +1,325 @@
+"""
+Local columnar cache of the Bronze sources.
+
+The first time a source is read through the cache, its typed DataFrames
+are also written as Parquet part files under
+`cache_dir/<table>/<key>/part-NNNNN.parquet`, where the key is derived from
+the source content and its declared schema:
+
+- CSV files: the SHA-256 of the file (reusing the size/mtime shortcut of
+  the ingestion manifest, so an unchanged file is not rehashed).
+- PostgreSQL tables: a fingerprint of the table's write counters in
+  `pg_stat_user_tables` and its relfilenode (TRUNCATE assigns a new one).
+  Sources without those statistics (e.g. SQLite stand-ins) are not cached.
+
+Later reads with the same key open the part files memory-mapped through
+pyarrow.dataset, read only the requested `columns` and skip row groups
+with `filters` (pandas/pyarrow DNF filters, e.g.
+`[("order_status", "=", "delivered")]`) instead of parsing the text again.
+
+Entries are written to a hidden temporary directory and renamed into
+place once complete, so a failed or interrupted read never leaves a
+partial entry behind. Older entries of a table are removed when a new one
+is committed. The cache is shared by the ingestion (`--cache`) and the
+data-quality report (`--cache`).
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+from sqlalchemy import text
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+from config import INGEST_CONFIG
+from scripts.bronze_schemas import get_schema, read_csv_typed
+from scripts.ingest_metrics import stage, timed_iter
+from scripts.ingest_state import hash_file
+
+# Bump to invalidate every cached entry after a change of the file layout
+CACHE_VERSION = 1
+INDEX_FILE = '_index.json'
+META_FILE = '_meta.json'
+# Row groups are the unit predicate pushdown can skip
+ROW_GROUP_ROWS = 100000
+
+_MMAP_FS = pafs.LocalFileSystem(use_mmap=True)
+_index_lock = threading.Lock()
+
+
+def cache_dir():
+    """
+    Return the cache directory, creating it if needed.
+    """
+    path = Path(INGEST_CONFIG["cache_dir"])
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _cache_key(table, source_fingerprint):
+    schema = get_schema(table)
+    payload = json.dumps([CACHE_VERSION, table, source_fingerprint, schema], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def csv_cache_key(path, table, content_hash=None):
+    """
+    Return the cache key of a CSV file. The content hash is remembered per
+    path with the file's size and mtime, so it is only recomputed when the
+    file changes; a `content_hash` already computed by the caller is used
+    as is.
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    index_path = cache_dir() / INDEX_FILE
+    with _index_lock:
+        index = {}
+        if index_path.exists():
+            with open(index_path, encoding='utf-8') as f:
+                index = json.load(f)
+        entry = index.get(str(path))
+        unchanged = entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+        if content_hash is None and unchanged:
+            content_hash = entry["content_hash"]
+        elif not unchanged or entry["content_hash"] != content_hash:
+            content_hash = content_hash or hash_file(path)
+            index[str(path)] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "content_hash": content_hash}
+            tmp_path = index_path.with_name(f".{INDEX_FILE}.{uuid.uuid4().hex}")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, index_path)
+    return _cache_key(table, content_hash)
+
+
+def postgres_cache_key(pg_engine, table):
+    """
+    Return the cache key of a PostgreSQL table from its write counters, or
+    None when the database does not expose them.
+    """
+    try:
+        with pg_engine.connect() as pg_conn:
+            row = pg_conn.execute(text(
+                "SELECT c.relfilenode, s.n_tup_ins, s.n_tup_upd, s.n_tup_del "
+                "FROM pg_stat_user_tables s JOIN pg_class c ON c.oid = s.relid "
+                "WHERE s.relname = :table"
+            ), {"table": table}).fetchone()
+    except Exception as e:
+        logging.info(f"Cache disabled for {table}: no table statistics available ({e.__class__.__name__})")
+        return None
+    if row is None:
+        return None
+    return _cache_key(table, [str(pg_engine.url.render_as_string(hide_password=True)), *row])
+
+
+def entry_path(table, key):
+    """
+    Return the directory of a committed cache entry, or None if there is none.
+    """
+    path = cache_dir() / table / key
+    return path if (path / META_FILE).exists() else None
+
+
+def _arrow_table(df, schema=None):
+    """
+    Convert a DataFrame to Arrow. Dictionary (category) columns use int32
+    indices so batches with different numbers of categories share a schema.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if schema is None:
+        fields = [
+            field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+            if pa.types.is_dictionary(field.type) else field
+            for field in table.schema
+        ]
+        schema = pa.schema(fields, metadata=table.schema.metadata)
+    return table.cast(schema)
+
+
+def write_through(table, key, frames, chunk_rows=None, compression=None):
+    """
+    Yield every DataFrame of `frames` unchanged while writing it to a new
+    cache entry for (`table`, `key`), in part files of at most `chunk_rows`
+    rows. The entry is committed only once `frames` is exhausted; if the
+    consumer stops early or an error occurs, the partial files are removed.
+    """
+    chunk_rows = chunk_rows or INGEST_CONFIG["parquet_chunk_rows"]
+    compression = compression or INGEST_CONFIG["cache_compression"]
+    table_dir = cache_dir() / table
+    tmp_dir = table_dir / f".tmp-{uuid.uuid4().hex}"
+    tmp_dir.mkdir(parents=True)
+    schema, writer = None, None
+    parts, part_rows, rows = 0, 0, 0
+    committed = False
+
+    def open_part():
+        return pq.ParquetWriter(tmp_dir / f"part-{parts:05d}.parquet", schema, compression=compression)
+
+    try:
+        for df in frames:
+            yield df
+            with stage('cache'):
+                arrow_table = _arrow_table(df, schema)
+                schema = arrow_table.schema
+                position = 0
+                while position < arrow_table.num_rows:
+                    if writer is None or part_rows >= chunk_rows:
+                        if writer is not None:
+                            writer.close()
+                        writer = open_part()
+                        parts, part_rows = parts + 1, 0
+                    piece = arrow_table.slice(position, chunk_rows - part_rows)
+                    writer.write_table(piece, row_group_size=ROW_GROUP_ROWS)
+                    part_rows += piece.num_rows
+                    position += piece.num_rows
+                rows += arrow_table.num_rows
+
+        if schema is None:
+            return
+        with stage('cache'):
+            if writer is None:
+                # An empty source still gets one (empty) file that carries its schema
+                writer = open_part()
+                parts += 1
+            writer.close()
+            writer = None
+            _commit(table_dir, tmp_dir, table, key, rows, parts)
+            committed = True
+    finally:
+        if writer is not None:
+            writer.close()
+        if not committed:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _commit(table_dir, tmp_dir, table, key, rows, parts):
+    """
+    Move a complete entry into place and remove the table's older entries.
+    """
+    with open(tmp_dir / META_FILE, 'w', encoding='utf-8') as f:
+        json.dump({
+            "cache_version": CACHE_VERSION, "table": table, "key": key, "rows": rows, "parts": parts,
+            "created_at": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        }, f, indent=2)
+    final_dir = table_dir / key
+    try:
+        os.rename(tmp_dir, final_dir)
+    except OSError:
+        # Another reader committed the same entry first; keep theirs
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return
+    for other in table_dir.iterdir():
+        if other != final_dir and not other.name.startswith('.'):
+            shutil.rmtree(other, ignore_errors=True)
+    logging.info(f"💾 Cached {table}: {rows:,} rows in {parts} Parquet file(s) under {final_dir}")
+
+
+def _string_dtype(arrow_type):
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.StringDtype('pyarrow')
+    return None
+
+
+def arrow_to_frame(arrow_table, table):
+    """
+    Convert cached Arrow data back to a DataFrame with the declared dtypes.
+    """
+    df = arrow_table.to_pandas(types_mapper=_string_dtype)
+    schema = get_schema(table)
+    if schema is None:
+        return df
+    casts = {
+        column: dtype for column, dtype in schema["columns"].items()
+        if column in df.columns and str(df[column].dtype) != dtype
+    }
+    # Categories of object dtype, as pd.read_csv makes them
+    text_categories = {
+        column: object for column, dtype in casts.items()
+        if dtype == 'category' and isinstance(df[column].dtype, pd.StringDtype)
+    }
+    if text_categories:
+        df = df.astype(text_categories)
+    return df.astype(casts) if casts else df
+
+
+def read_cached(table, key, columns=None, filters=None, batch_size=None):
+    """
+    Yield a committed cache entry as DataFrames: the whole (projected and
+    filtered) table at once, or batches of at most `batch_size` rows.
+    Files are memory-mapped; only the requested `columns` are decoded and
+    row groups whose statistics rule out `filters` are skipped.
+    """
+    path = entry_path(table, key)
+    if path is None:
+        raise FileNotFoundError(f"No cache entry {key} for {table}")
+    dataset = ds.dataset(str(path), format='parquet', filesystem=_MMAP_FS)
+    scanner = dataset.scanner(
+        columns=columns,
+        filter=pq.filters_to_expression(filters) if filters else None,
+        **({"batch_size": batch_size} if batch_size else {}),
+    )
+    if not batch_size:
+        yield arrow_to_frame(scanner.to_table(), table)
+        return
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            yield arrow_to_frame(pa.Table.from_batches([batch]), table)
+
+
+def cached_frames(table, key, read_frames, columns=None, filters=None, batch_size=None):
+    """
+    Yield `table` from its cache entry `key`, or from the source on a miss.
+
+    `read_frames` is a callable returning the source's DataFrames; it is
+    only called on a miss, and what it returns is written to the cache on
+    the way through. A miss that asks for `columns` or `filters` first
+    materializes the entry and then reads it back projected and filtered.
+    With `key` None (an uncacheable source) the source is read directly.
+    """
+    if key is None:
+        if filters:
+            raise ValueError(f"Filters need a cacheable source, {table} has no cache key")
+        for df in read_frames():
+            yield df[columns] if columns else df
+        return
+
+    if entry_path(table, key) is None:
+        if not columns and not filters:
+            logging.info(f"Cache miss for {table}; reading the source and caching it")
+            yield from write_through(table, key, read_frames())
+            return
+        for _ in write_through(table, key, read_frames()):
+            pass
+
+    with open(entry_path(table, key) / META_FILE, encoding='utf-8') as f:
+        cached_rows = json.load(f)["rows"]
+    logging.info(f"⚡ Reading {table} from the cache ({cached_rows:,} rows)")
+    yield from timed_iter(read_cached(table, key, columns, filters, batch_size), 'extract')
+
+
+def read_csv_cached(path, table, chunksize=None, columns=None, filters=None, key=None):
+    """
+    Read a CSV file with its declared schema through the cache, whole or
+    in chunks of `chunksize` rows. `key` defaults to `csv_cache_key`.
+    """
+    key = key or csv_cache_key(path, table)
+
+    def read_frames():
+        if not chunksize:
+            yield read_csv_typed(path, table)
+            return
+        with read_csv_typed(path, table, chunksize=chunksize) as reader:
+            yield from reader
+
+    return cached_frames(table, key, read_frames, columns, filters, chunksize)
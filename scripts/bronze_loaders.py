@@ -0,0 +1,648 @@
+"""
+Load engines that write DataFrames into Snowflake Bronze tables.
+
+Every loader is created for one table, receives that table's rows through
+`write(df)` (once, or once per streamed batch) and returns per-table load
+statistics from `close()`:
+
+- `WritePandasLoader`  calls `write_pandas` for every DataFrame (default).
+- `ParquetCopyLoader`  writes compressed Parquet chunks to a local staging
+  directory, uploads them with one parallel PUT and loads them with a
+  single COPY INTO.
+- `MergeLoader`        upserts rows on a key through a temporary table
+  (and deletes keys with `delete(keys)`, for change data capture).
+
+Created with a `load_id` (checkpointed ingestion, see
+`scripts/ingest_state.py`), a loader stages the rows first and commits
+them in one transaction together with a row in the load log table
+(INGEST_CONFIG["load_log_table"]), so replaying a load that already
+committed is detected with `is_committed()` instead of duplicating rows.
+`begin(resume_state)` picks up the rows staged by an interrupted attempt
+(as described by the `checkpoint_state()` it saved) when they are intact,
+and `abort()` keeps them for the retry.
+
+`write(df)` is also split into `serialize(df)` and `upload(payload)`, so a
+pipelined load (see `scripts/ingest_pipeline.py`) can prepare the next
+batch while the previous one is sent. Only the copy engine has a separate
+serialization (its Parquet files, which `upload` PUTs right away); the
+other loaders send the DataFrame itself.
+
+Key columns encoded as integer codes (INGEST_ENCODE_IDS, see
+`scripts/id_encoding.py`) are decoded back to their strings by
+`serialize(df)` and `write(df)`, so the tables receive the source values.
+
+With WAREHOUSE=duckdb `make_loader` returns a `DuckDBLoader` instead,
+which writes the same tables into the local DuckDB warehouse (see
+`scripts/duckdb_warehouse.py`).
+
+`RecordingSnowflakeConnection` is a local stand-in for a Snowflake
+connection that records the staged files and issued statements (and can
+keep the "loaded" files on disk), so the load engines can be exercised
+without a Snowflake account.
+"""
+import fnmatch
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import pyarrow.parquet as pq
+
+try:
+    from snowflake.connector.pandas_tools import write_pandas
+except ImportError:  # Only the DuckDB warehouse can be used without the Snowflake connector
+    write_pandas = None
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+from config import INGEST_CONFIG, WAREHOUSE_CONFIG
+from scripts.id_encoding import decode_ids
+
+LOAD_ENGINES = ('write_pandas', 'copy')
+
+
+def ensure_load_log(conn_sf):
+    """
+    Create the load log table if it does not exist yet.
+    """
+    cursor = conn_sf.cursor()
+    try:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS "{INGEST_CONFIG["load_log_table"]}" '
+            f'("LOAD_ID" VARCHAR, "TABLE_NAME" VARCHAR, "ROWS" NUMBER, '
+            f'"LOADED_AT" TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP())'
+        )
+    finally:
+        cursor.close()
+
+
+def is_loaded(conn_sf, load_id):
+    """
+    Return True if a load with this id has been committed.
+    """
+    ensure_load_log(conn_sf)
+    cursor = conn_sf.cursor()
+    try:
+        cursor.execute(
+            f'SELECT COUNT(*) FROM "{INGEST_CONFIG["load_log_table"]}" WHERE "LOAD_ID" = %s', (load_id,)
+        )
+        return cursor.fetchone()[0] > 0
+    finally:
+        cursor.close()
+
+
+def commit_load(conn_sf, load_id, table_name, statement, count_rows):
+    """
+    Run the statement that publishes a load and record `load_id` in the
+    load log, in one transaction. `count_rows(cursor)` returns the rows the
+    statement loaded. Returns that row count.
+    """
+    ensure_load_log(conn_sf)
+    cursor = conn_sf.cursor()
+    try:
+        cursor.execute("BEGIN")
+        try:
+            cursor.execute(statement)
+            rows = count_rows(cursor)
+            cursor.execute(
+                f'INSERT INTO "{INGEST_CONFIG["load_log_table"]}" ("LOAD_ID", "TABLE_NAME", "ROWS") '
+                f'VALUES (%s, %s, %s)', (load_id, table_name, rows)
+            )
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        return rows
+    finally:
+        cursor.close()
+
+
+def _copied_rows(cursor):
+    # Each COPY INTO result row describes one file: (file, status, rows_parsed, rows_loaded, ...)
+    return sum(int(row[3] or 0) for row in cursor.fetchall())
+
+
+def _inserted_rows(cursor):
+    return int(cursor.fetchone()[0])
+
+
+class WritePandasLoader:
+    """
+    Load every DataFrame with `write_pandas` as soon as it is received.
+
+    With a `load_id` the DataFrames are written to a transient stage table
+    (`<table>_load_stage`) instead, and `close()` moves them into the
+    table with one INSERT ... SELECT in the transaction that records the
+    load id.
+    """
+
+    def __init__(self, conn_sf, table_name, load_id=None):
+        self.conn_sf = conn_sf
+        self.table_name = table_name
+        self.load_id = load_id
+        self.stage_table = f"{table_name}_load_stage" if load_id else None
+        self.stats = {"engine": "write_pandas", "table": table_name, "rows": 0, "batches": 0, "load_seconds": 0.0}
+
+    def _execute(self, sql):
+        cursor = self.conn_sf.cursor()
+        try:
+            cursor.execute(sql)
+            return cursor.fetchone()
+        finally:
+            cursor.close()
+
+    def is_committed(self):
+        return bool(self.load_id) and is_loaded(self.conn_sf, self.load_id)
+
+    def begin(self, resume_state=None):
+        """
+        Prepare the stage table and return the number of rows already
+        staged by an interrupted attempt that can be kept.
+        """
+        if not self.load_id:
+            return 0
+        if resume_state:
+            try:
+                staged = self._execute(f'SELECT COUNT(*) FROM "{self.stage_table}"')[0]
+            except Exception:
+                staged = None
+            if staged == resume_state["rows"]:
+                self.stats["rows"] = staged
+                return staged
+        self._execute(f'CREATE OR REPLACE TRANSIENT TABLE "{self.stage_table}" LIKE "{self.table_name}"')
+        return 0
+
+    def write(self, df):
+        df = decode_ids(df)
+        started = time.perf_counter()
+        write_pandas(self.conn_sf, df, self.stage_table or self.table_name, use_logical_type=True)
+        self.stats["load_seconds"] += time.perf_counter() - started
+        self.stats["rows"] += len(df)
+        self.stats["batches"] += 1
+
+    def serialize(self, df):
+        # write_pandas serializes and uploads in one call; only encoded keys are decoded ahead
+        return decode_ids(df)
+
+    def upload(self, df):
+        self.write(df)
+
+    def checkpoint_state(self):
+        return {"rows": self.stats["rows"]}
+
+    def close(self):
+        if self.load_id:
+            started = time.perf_counter()
+            commit_load(
+                self.conn_sf, self.load_id, self.table_name,
+                f'INSERT INTO "{self.table_name}" SELECT * FROM "{self.stage_table}"',
+                _inserted_rows
+            )
+            self._execute(f'DROP TABLE IF EXISTS "{self.stage_table}"')
+            self.stats["load_seconds"] += time.perf_counter() - started
+        return self.stats
+
+    def abort(self):
+        pass
+
+
+class ParquetCopyLoader:
+    """
+    Stage a table as compressed Parquet chunks and bulk load it with
+    PUT + COPY INTO.
+
+    Rows are written to files of at most `chunk_rows` rows under
+    `staging_dir/<table>/<load id>/`. `close()` uploads all of them to the
+    table stage in one PUT with `PARALLEL=put_parallel` and loads them with
+    a single COPY INTO, then removes the local files.
+
+    With a `load_id` the staged files outlive a failed attempt, so a retry
+    only writes the chunks that are missing, and the COPY INTO runs in the
+    transaction that records the load id.
+
+    In a pipelined load `serialize(df)` writes the files of a batch and
+    `upload(files)` PUTs them at once, so the upload overlaps with reading
+    and writing the next batches; `close()` then only runs the COPY INTO.
+    """
+
+    def __init__(self, conn_sf, table_name, staging_dir=None, chunk_rows=None,
+                 compression=None, put_parallel=None, load_id=None):
+        self.conn_sf = conn_sf
+        self.table_name = table_name
+        self.chunk_rows = chunk_rows or INGEST_CONFIG["parquet_chunk_rows"]
+        self.compression = compression or INGEST_CONFIG["parquet_compression"]
+        self.put_parallel = put_parallel or INGEST_CONFIG["put_parallel"]
+        self.resumable = load_id is not None
+        self.load_id = load_id or uuid.uuid4().hex
+        self.local_dir = Path(staging_dir or INGEST_CONFIG["staging_dir"]) / table_name / self.load_id
+        self.local_dir.mkdir(parents=True, exist_ok=True)
+        self.stage_path = f'@%"{table_name}"/{self.load_id}'
+        # Number of the next Parquet file, and the files already PUT by upload()
+        self.next_file = 0
+        self.uploaded = set()
+        self.stats = {
+            "engine": "copy", "table": table_name, "rows": 0, "rows_loaded": 0, "files": 0, "bytes": 0,
+            "write_seconds": 0.0, "put_seconds": 0.0, "copy_seconds": 0.0
+        }
+
+    def serialize(self, df):
+        """
+        Write a DataFrame as Parquet files of at most `chunk_rows` rows and
+        return them as (path, rows, bytes) tuples. They count as staged once
+        they are passed to `upload`.
+        """
+        started = time.perf_counter()
+        df = decode_ids(df)
+        files = []
+        for offset in range(0, len(df), self.chunk_rows):
+            chunk = df.iloc[offset:offset + self.chunk_rows]
+            path = self.local_dir / f"{self.table_name}_{self.next_file:05d}.parquet"
+            self.next_file += 1
+            chunk.to_parquet(
+                path, engine='pyarrow', compression=self.compression, index=False,
+                coerce_timestamps='us', allow_truncated_timestamps=True
+            )
+            files.append((path, len(chunk), path.stat().st_size))
+        self.stats["write_seconds"] += time.perf_counter() - started
+        return files
+
+    def _add(self, files):
+        for path, rows, size in files:
+            self.stats["files"] += 1
+            self.stats["bytes"] += size
+            self.stats["rows"] += rows
+
+    def write(self, df):
+        self._add(self.serialize(df))
+
+    def upload(self, files):
+        """
+        PUT serialized files to the table stage now instead of in `close()`.
+        """
+        started = time.perf_counter()
+        self._put([path for path, _, _ in files])
+        self.stats["put_seconds"] += time.perf_counter() - started
+        self.uploaded.update(path.name for path, _, _ in files)
+        self._add(files)
+
+    def _put(self, paths):
+        cursor = self.conn_sf.cursor()
+        try:
+            for path in paths:
+                cursor.execute(
+                    f"PUT 'file://{path.as_posix()}' {self.stage_path} "
+                    f"PARALLEL={self.put_parallel} AUTO_COMPRESS=FALSE OVERWRITE=TRUE"
+                )
+        finally:
+            cursor.close()
+
+    def is_committed(self):
+        return self.resumable and is_loaded(self.conn_sf, self.load_id)
+
+    def begin(self, resume_state=None):
+        """
+        Keep the files staged by an interrupted attempt if they are all
+        still there and return their row count; otherwise start empty.
+        Staging directories of other loads of the table are removed.
+        """
+        if not self.resumable:
+            return 0
+        for other in self.local_dir.parent.iterdir():
+            if other != self.local_dir:
+                shutil.rmtree(other, ignore_errors=True)
+        # Files an earlier pipelined attempt uploaded are PUT again from the local copies
+        cursor = self.conn_sf.cursor()
+        try:
+            cursor.execute(f"REMOVE {self.stage_path}")
+        finally:
+            cursor.close()
+        files = sorted(self.local_dir.glob('*.parquet'))
+        if resume_state and len(files) >= resume_state["files"]:
+            # Files past the checkpoint were written after it was saved and are rewritten
+            for path in files[resume_state["files"]:]:
+                path.unlink()
+            self.stats.update(files=resume_state["files"], rows=resume_state["rows"], bytes=resume_state["bytes"])
+            self.next_file = resume_state["files"]
+            return resume_state["rows"]
+        shutil.rmtree(self.local_dir, ignore_errors=True)
+        self.local_dir.mkdir(parents=True, exist_ok=True)
+        return 0
+
+    def checkpoint_state(self):
+        return {key: self.stats[key] for key in ("files", "rows", "bytes")}
+
+    def close(self):
+        succeeded = False
+        try:
+            if self.stats["files"] == 0:
+                succeeded = True
+                return self.stats
+            stage_path = self.stage_path
+            started = time.perf_counter()
+            if not self.uploaded:
+                cursor = self.conn_sf.cursor()
+                try:
+                    cursor.execute(
+                        f"PUT 'file://{self.local_dir.as_posix()}/*.parquet' {stage_path} "
+                        f"PARALLEL={self.put_parallel} AUTO_COMPRESS=FALSE OVERWRITE=TRUE"
+                    )
+                finally:
+                    cursor.close()
+            else:
+                # Files kept from an interrupted attempt were not PUT by this one
+                self._put([path for path in sorted(self.local_dir.glob('*.parquet'))
+                           if path.name not in self.uploaded])
+            self.stats["put_seconds"] += time.perf_counter() - started
+
+            started = time.perf_counter()
+            copy_sql = (
+                f'COPY INTO "{self.table_name}" FROM {stage_path} '
+                f"FILE_FORMAT=(TYPE=PARQUET USE_LOGICAL_TYPE=TRUE) "
+                f"MATCH_BY_COLUMN_NAME=CASE_SENSITIVE PURGE=TRUE"
+            )
+            if self.resumable:
+                self.stats["rows_loaded"] = commit_load(
+                    self.conn_sf, self.load_id, self.table_name, copy_sql, _copied_rows
+                )
+            else:
+                cursor = self.conn_sf.cursor()
+                try:
+                    cursor.execute(copy_sql)
+                    self.stats["rows_loaded"] = _copied_rows(cursor)
+                finally:
+                    cursor.close()
+            self.stats["copy_seconds"] = time.perf_counter() - started
+            succeeded = True
+            logging.info(
+                f"✓ COPY INTO {self.table_name}: {self.stats['rows_loaded']:,} rows from "
+                f"{self.stats['files']} Parquet file(s), {self.stats['bytes'] / 1024 / 1024:,.1f} MB "
+                f"(write {self.stats['write_seconds']:.1f}s, PUT {self.stats['put_seconds']:.1f}s, "
+                f"COPY {self.stats['copy_seconds']:.1f}s)"
+            )
+            return self.stats
+        finally:
+            if succeeded:
+                shutil.rmtree(self.local_dir, ignore_errors=True)
+            else:
+                self.abort()
+
+    def abort(self):
+        """
+        Remove the staged files, unless they are kept for a retry.
+        """
+        if not self.resumable:
+            shutil.rmtree(self.local_dir, ignore_errors=True)
+
+
+class MergeLoader:
+    """
+    Upsert every DataFrame into a Snowflake table on `key`.
+
+    The rows are first written to a temporary staging table and then
+    applied with a single MERGE, so re-extracted rows replace their
+    previous version instead of being duplicated.
+    """
+
+    def __init__(self, conn_sf, table_name, key):
+        self.conn_sf = conn_sf
+        self.table_name = table_name
+        self.key = key
+        self.stats = {"engine": "merge", "table": table_name, "rows": 0, "batches": 0, "load_seconds": 0.0}
+
+    def write(self, df):
+        if df.empty:
+            return
+        df = decode_ids(df)
+        started = time.perf_counter()
+        stage_table = f"{self.table_name}_incremental_stage"
+        write_pandas(
+            self.conn_sf, df, stage_table,
+            auto_create_table=True, overwrite=True, table_type='temporary', use_logical_type=True
+        )
+
+        columns = [str(c) for c in df.columns]
+        update_set = ", ".join(f't."{c}" = s."{c}"' for c in columns if c != self.key)
+        insert_columns = ", ".join(f'"{c}"' for c in columns)
+        insert_values = ", ".join(f's."{c}"' for c in columns)
+        merge_sql = (
+            f'MERGE INTO "{self.table_name}" t USING "{stage_table}" s ON t."{self.key}" = s."{self.key}" '
+            f'WHEN MATCHED THEN UPDATE SET {update_set} '
+            f'WHEN NOT MATCHED THEN INSERT ({insert_columns}) VALUES ({insert_values})'
+        )
+        cursor = self.conn_sf.cursor()
+        try:
+            cursor.execute(merge_sql)
+        finally:
+            cursor.close()
+        self.stats["load_seconds"] += time.perf_counter() - started
+        self.stats["rows"] += len(df)
+        self.stats["batches"] += 1
+
+    def serialize(self, df):
+        return decode_ids(df)
+
+    def upload(self, df):
+        self.write(df)
+
+    def delete(self, keys):
+        """
+        Delete the rows whose key is in `keys` (a Series), through a
+        temporary table of the keys.
+        """
+        if keys.empty:
+            return
+        started = time.perf_counter()
+        stage_table = f"{self.table_name}_delete_stage"
+        write_pandas(
+            self.conn_sf, keys.to_frame(self.key), stage_table,
+            auto_create_table=True, overwrite=True, table_type='temporary', use_logical_type=True
+        )
+        cursor = self.conn_sf.cursor()
+        try:
+            cursor.execute(
+                f'DELETE FROM "{self.table_name}" t USING "{stage_table}" s WHERE t."{self.key}" = s."{self.key}"'
+            )
+        finally:
+            cursor.close()
+        self.stats["load_seconds"] += time.perf_counter() - started
+        self.stats["deleted"] = self.stats.get("deleted", 0) + len(keys)
+
+    def is_committed(self):
+        return False
+
+    def begin(self, resume_state=None):
+        """
+        Chunks merged by an interrupted attempt are already applied, and
+        merging them again would be harmless, so they are all kept.
+        """
+        self.stats["rows"] = resume_state["rows"] if resume_state else 0
+        return self.stats["rows"]
+
+    def checkpoint_state(self):
+        return {"rows": self.stats["rows"]}
+
+    def close(self):
+        return self.stats
+
+    def abort(self):
+        pass
+
+
+def make_loader(conn_sf, table_name, engine=None, merge_key=None, load_id=None, warehouse=None):
+    """
+    Create the loader for a table. `merge_key` selects a MergeLoader;
+    otherwise `engine` ('write_pandas' or 'copy', default from
+    INGEST_CONFIG["load_engine"]) picks the bulk load path. `load_id`
+    makes the load resumable and idempotent. With `warehouse` 'duckdb'
+    (default from WAREHOUSE_CONFIG["engine"]) every load goes to a
+    DuckDBLoader on `conn_sf`, a DuckDB connection.
+    """
+    if (warehouse or WAREHOUSE_CONFIG["engine"]) == 'duckdb':
+        from scripts.duckdb_warehouse import DuckDBLoader
+        return DuckDBLoader(conn_sf, table_name, merge_key=merge_key, load_id=load_id)
+    if merge_key:
+        return MergeLoader(conn_sf, table_name, merge_key)
+    engine = engine or INGEST_CONFIG["load_engine"]
+    if engine == 'copy':
+        return ParquetCopyLoader(conn_sf, table_name, load_id=load_id)
+    if engine == 'write_pandas':
+        return WritePandasLoader(conn_sf, table_name, load_id=load_id)
+    raise ValueError(f"Unknown load engine '{engine}', expected one of {LOAD_ENGINES}")
+
+
+def _safe_name(stage_path):
+    """
+    Turn a stage path such as @%"raw_orders"/<load id> into a directory name.
+    """
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', stage_path).strip('_')
+
+
+class RecordingCursor:
+    """
+    Cursor of a `RecordingSnowflakeConnection`.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._results = []
+
+    def execute(self, sql, params=None):
+        self.connection.statements.append(sql)
+        self._results = []
+        load_log = f'"{INGEST_CONFIG["load_log_table"]}"'
+        if sql.startswith(f'INSERT INTO {load_log}'):
+            self.connection.record_load(*params)
+            return self
+        if sql.startswith('SELECT COUNT(*) FROM') and load_log in sql:
+            self._results = [(int(params[0] in self.connection.load_log()),)]
+            return self
+        put = re.match(r"PUT 'file://(.+)' (@\S+)", sql)
+        if put:
+            local_pattern, stage_path = put.groups()
+            directory, pattern = local_pattern.rsplit('/', 1)
+            files = sorted(p for p in Path(directory).iterdir() if fnmatch.fnmatch(p.name, pattern))
+            staged = self.connection.staged_files.setdefault(stage_path, [])
+            for path in files:
+                # OVERWRITE=TRUE replaces a file already on the stage
+                staged[:] = [entry for entry in staged if entry["name"] != path.name]
+                staged.append({"name": path.name, "bytes": path.stat().st_size,
+                               "rows": pq.ParquetFile(path).metadata.num_rows})
+                if self.connection.data_dir:
+                    stage_dir = self.connection.data_dir / 'stages' / _safe_name(stage_path)
+                    stage_dir.mkdir(parents=True, exist_ok=True)
+                    shutil.copy2(path, stage_dir / path.name)
+                self._results.append((str(path), path.name, path.stat().st_size, path.stat().st_size,
+                                      'NONE', 'NONE', 'UPLOADED', ''))
+            return self
+
+        remove = re.match(r"REMOVE (@\S+)", sql)
+        if remove:
+            stage_path = remove.group(1)
+            self.connection.staged_files.pop(stage_path, None)
+            if self.connection.data_dir:
+                shutil.rmtree(self.connection.data_dir / 'stages' / _safe_name(stage_path), ignore_errors=True)
+            return self
+
+        copy = re.match(r'COPY INTO "?([^"\s]+)"? FROM (@\S+)', sql)
+        if copy:
+            table_name, stage_path = copy.groups()
+            for staged in self.connection.staged_files.pop(stage_path, []):
+                self.connection.loaded_rows[table_name] = self.connection.loaded_rows.get(table_name, 0) + staged["rows"]
+                if self.connection.data_dir:
+                    table_dir = self.connection.data_dir / 'tables' / table_name
+                    table_dir.mkdir(parents=True, exist_ok=True)
+                    stage_file = self.connection.data_dir / 'stages' / _safe_name(stage_path) / staged["name"]
+                    shutil.move(stage_file, table_dir / f"{_safe_name(stage_path)}_{staged['name']}")
+                self._results.append((f"{stage_path}/{staged['name']}", 'LOADED', staged["rows"], staged["rows"],
+                                      1, 0, None, None, None, None))
+        return self
+
+    def fetchall(self):
+        return list(self._results)
+
+    def fetchone(self):
+        return self._results[0] if self._results else None
+
+    def close(self):
+        pass
+
+
+class RecordingSnowflakeConnection:
+    """
+    Local stand-in for a Snowflake connection used with ParquetCopyLoader.
+
+    It records every statement in `statements`, the files uploaded by PUT
+    per stage path in `staged_files`, the rows "loaded" by COPY INTO per
+    table in `loaded_rows` (REMOVE clears a stage path) and the committed
+    load ids of the load log.
+    Nothing is sent anywhere; transactions are not emulated. With
+    `data_dir` it acts as a file-backed sink: PUT copies the files under
+    `data_dir/stages/`, COPY INTO moves them to `data_dir/tables/<table>/`
+    and the load log is kept in `data_dir/load_log.json`.
+    """
+
+    def __init__(self, data_dir=None):
+        self.data_dir = Path(data_dir) if data_dir else None
+        self.statements = []
+        self.staged_files = {}
+        self.loaded_rows = {}
+        self._load_log = {}
+
+    def load_log(self):
+        """
+        Return the committed loads as {load_id: {"table": ..., "rows": ...}}.
+        """
+        path = self.data_dir / 'load_log.json' if self.data_dir else None
+        if path and path.exists():
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        return self._load_log
+
+    def record_load(self, load_id, table_name, rows):
+        log = self.load_log()
+        log[load_id] = {"table": table_name, "rows": rows}
+        if self.data_dir:
+            self.data_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.data_dir / f".load_log.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(log, f, indent=2)
+            os.replace(tmp_path, self.data_dir / 'load_log.json')
+        else:
+            self._load_log = log
+
+    def cursor(self):
+        return RecordingCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
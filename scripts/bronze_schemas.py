@@ -0,0 +1,276 @@
+"""
+Declared schemas of the Olist Bronze tables.
+
+Each table lists its columns in source order with the pandas dtype they
+are parsed into, plus the columns parsed as timestamps. The registry is
+used by both the CSV loader and the PostgreSQL extractor so every table
+reaches Snowflake with the same types, without a type-inference pass, and
+with schema drift caught before anything is loaded.
+"""
+import importlib.util
+import os
+from pathlib import Path
+
+import pandas as pd
+
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# Keys and free text are held as Arrow-backed strings instead of Python objects
+TEXT = "string[pyarrow]" if PYARROW_AVAILABLE else "string"
+ID = TEXT
+
+BRONZE_SCHEMAS = {
+    "raw_customers": {
+        "columns": {
+            "customer_id": ID,
+            "customer_unique_id": ID,
+            "customer_zip_code_prefix": "int32",
+            "customer_city": "category",
+            "customer_state": "category",
+        },
+        "parse_dates": [],
+    },
+    "raw_geolocation": {
+        "columns": {
+            "geolocation_zip_code_prefix": "int32",
+            "geolocation_lat": "float64",
+            "geolocation_lng": "float64",
+            "geolocation_city": "category",
+            "geolocation_state": "category",
+        },
+        "parse_dates": [],
+    },
+    "raw_order_items": {
+        "columns": {
+            "order_id": ID,
+            "order_item_id": "int16",
+            "product_id": ID,
+            "seller_id": ID,
+            "shipping_limit_date": "datetime64[ns]",
+            "price": "float64",
+            "freight_value": "float64",
+        },
+        "parse_dates": ["shipping_limit_date"],
+    },
+    "raw_order_payments": {
+        "columns": {
+            "order_id": ID,
+            "payment_sequential": "int16",
+            "payment_type": "category",
+            "payment_installments": "int16",
+            "payment_value": "float64",
+        },
+        "parse_dates": [],
+    },
+    "raw_order_reviews": {
+        "columns": {
+            "review_id": ID,
+            "order_id": ID,
+            "review_score": "int8",
+            "review_comment_title": TEXT,
+            "review_comment_message": TEXT,
+            "review_creation_date": "datetime64[ns]",
+            "review_answer_timestamp": "datetime64[ns]",
+        },
+        "parse_dates": ["review_creation_date", "review_answer_timestamp"],
+    },
+    "raw_orders": {
+        "columns": {
+            "order_id": ID,
+            "customer_id": ID,
+            "order_status": "category",
+            "order_purchase_timestamp": "datetime64[ns]",
+            "order_approved_at": "datetime64[ns]",
+            "order_delivered_carrier_date": "datetime64[ns]",
+            "order_delivered_customer_date": "datetime64[ns]",
+            "order_estimated_delivery_date": "datetime64[ns]",
+        },
+        "parse_dates": [
+            "order_purchase_timestamp",
+            "order_approved_at",
+            "order_delivered_carrier_date",
+            "order_delivered_customer_date",
+            "order_estimated_delivery_date",
+        ],
+    },
+    "raw_products": {
+        "columns": {
+            "product_id": ID,
+            "product_category_name": "category",
+            # The misspelled "lenght" column names come from the public dataset
+            "product_name_lenght": "Int16",
+            "product_description_lenght": "Int32",
+            "product_photos_qty": "Int16",
+            "product_weight_g": "Int32",
+            "product_length_cm": "Int16",
+            "product_height_cm": "Int16",
+            "product_width_cm": "Int16",
+        },
+        "parse_dates": [],
+    },
+    "raw_sellers": {
+        "columns": {
+            "seller_id": ID,
+            "seller_zip_code_prefix": "int32",
+            "seller_city": "category",
+            "seller_state": "category",
+        },
+        "parse_dates": [],
+    },
+    "raw_product_category_name_translation": {
+        "columns": {
+            "product_category_name": "category",
+            "product_category_name_english": "category",
+        },
+        "parse_dates": [],
+    },
+}
+
+
+# Source CSV file of every table, as published on Kaggle
+CSV_FILE_NAMES = {
+    "raw_customers": "olist_customers_dataset.csv",
+    "raw_orders": "olist_orders_dataset.csv",
+    "raw_order_items": "olist_order_items_dataset.csv",
+    "raw_order_payments": "olist_order_payments_dataset.csv",
+    "raw_order_reviews": "olist_order_reviews_dataset.csv",
+    "raw_products": "olist_products_dataset.csv",
+    "raw_sellers": "olist_sellers_dataset.csv",
+    "raw_geolocation": "olist_geolocation_dataset.csv",
+    "raw_product_category_name_translation": "product_category_name_translation.csv",
+}
+# Compressed CSV files are recognised by their suffix (.csv.gz, .csv.zst)
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+CSV_SUFFIXES = (".csv",) + tuple(".csv" + suffix for suffix in COMPRESSION_SUFFIXES)
+
+
+class SchemaDriftError(ValueError):
+    """
+    Raised when a source's columns no longer match its declared schema.
+    """
+
+
+def get_schema(table):
+    """
+    Return the declared schema of a Bronze table, or None if it has none.
+    """
+    return BRONZE_SCHEMAS.get(table)
+
+
+def table_for_csv(file_name):
+    """
+    Derive the clean, lowercase Bronze table name of a CSV file, e.g.
+    olist_order_items_dataset.csv (or .csv.gz) -> raw_order_items.
+    """
+    name = os.path.basename(str(file_name))
+    if os.path.splitext(name)[1] in COMPRESSION_SUFFIXES:
+        name = os.path.splitext(name)[0]
+    stem = os.path.splitext(name)[0]
+    return "raw_" + stem.replace('olist_', '').replace('_dataset', '')
+
+
+def csv_file_path(data_dir, table):
+    """
+    Return the path of a table's CSV file in `data_dir`: the first of the
+    plain or compressed variants that exists, the plain name otherwise.
+    """
+    plain = Path(data_dir) / CSV_FILE_NAMES[table]
+    for suffix in COMPRESSION_SUFFIXES:
+        compressed = plain.with_name(plain.name + suffix)
+        if not plain.exists() and compressed.exists():
+            return compressed
+    return plain
+
+
+def validate_columns(table, columns):
+    """
+    Raise SchemaDriftError if `columns` differ from the declared schema.
+    Column order is not enforced.
+    """
+    schema = get_schema(table)
+    if schema is None:
+        return
+    expected = list(schema["columns"])
+    actual = [str(c) for c in columns]
+    missing = [c for c in expected if c not in actual]
+    unexpected = [c for c in actual if c not in expected]
+    if missing or unexpected:
+        raise SchemaDriftError(
+            f"Schema drift in {table}: missing columns {missing}, unexpected columns {unexpected}"
+        )
+
+
+def csv_read_options(table, chunked=False):
+    """
+    Build `pd.read_csv` keyword arguments for a table: explicit dtypes,
+    timestamp columns and, when available and not reading in chunks
+    (which it does not support), the multithreaded pyarrow engine.
+    Returns an empty dict for tables without a declared schema.
+    """
+    schema = get_schema(table)
+    if schema is None:
+        return {}
+    parse_dates = schema["parse_dates"]
+    options = {
+        "usecols": list(schema["columns"]),
+        "dtype": {c: t for c, t in schema["columns"].items() if c not in parse_dates},
+        "parse_dates": parse_dates or None,
+    }
+    if PYARROW_AVAILABLE and not chunked:
+        options["engine"] = "pyarrow"
+    return options
+
+
+def read_csv_typed(path, table, chunksize=None, skip_rows=0):
+    """
+    Read a CSV file with its declared schema. The header is checked first
+    so drift is reported before the file is parsed. With `chunksize` a
+    chunk iterator is returned, as with `pd.read_csv`, starting after the
+    first `skip_rows` data rows.
+    """
+    validate_columns(table, pd.read_csv(path, nrows=0).columns)
+    if chunksize is not None:
+        skip = {"skiprows": range(1, skip_rows + 1)} if skip_rows else {}
+        return pd.read_csv(path, chunksize=chunksize, **skip, **csv_read_options(table, chunked=True))
+
+    df = pd.read_csv(path, **csv_read_options(table))
+    schema = get_schema(table)
+    if schema and schema["parse_dates"]:
+        # The pyarrow engine yields second-resolution timestamps; align them with the declared dtype
+        df = df.astype({c: schema["columns"][c] for c in schema["parse_dates"]})
+    return df
+
+
+def apply_schema(df, table):
+    """
+    Validate and cast a DataFrame (e.g. read from PostgreSQL) to the
+    declared schema of its table, in declared column order.
+    """
+    schema = get_schema(table)
+    if schema is None:
+        return df
+    validate_columns(table, df.columns)
+    df = df[list(schema["columns"])]
+    text_dates = {
+        column: parse_timestamps(table, column, df[column])
+        for column in schema["parse_dates"]
+        if not pd.api.types.is_datetime64_any_dtype(df[column])
+    }
+    return df.assign(**text_dates).astype(schema["columns"])
+
+
+def parse_timestamps(table, column, values):
+    """
+    Parse a text column into timestamps. Raise SchemaDriftError if some
+    values are not timestamps, as the CSV parser does, rather than load
+    them as NULL.
+    """
+    # ISO 8601 takes bare dates and timestamps alike, where an inferred format would reject one or the other
+    parsed = pd.to_datetime(values, errors='coerce', format='ISO8601')
+    malformed = values[parsed.isna() & values.notna()]
+    if len(malformed):
+        raise SchemaDriftError(
+            f"Malformed timestamps in {table}.{column}: {len(malformed)} value(s), "
+            f"e.g. {malformed.astype(str).unique()[:3].tolist()}"
+        )
+    return parsed
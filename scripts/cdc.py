@@ -0,0 +1,298 @@
+"""
+Change data capture (CDC) of the PostgreSQL sources through logical
+replication.
+
+Every table with a key in INCREMENTAL_SOURCES gets its own logical
+replication slot (named INGEST_CDC_SLOT_PREFIX + table) decoded by the
+wal2json output plugin, so the per-table Airflow tasks never share one.
+The source database needs `wal_level = logical` and wal2json installed,
+and every table a primary key (or `REPLICA IDENTITY FULL`) so deletes
+carry their key.
+
+A run reads the slot through the SQL interface with
+`pg_logical_slot_peek_changes`, at most INGEST_CDC_BATCH_CHANGES changes
+at a time. The changes arrive as whole transactions in commit order; the
+inserts, updates and deletes of a batch are collapsed to the last change
+of every key and merged into bronze (upserts with a MERGE on the key,
+deletes with a DELETE on the key, a TRUNCATE as a truncation of the bronze
+table). Only then is the commit LSN of the batch saved in the local state
+directory and the slot advanced to it, so a failed run replays its
+changes from the last saved position, which leaves bronze as it would
+have been. Transactions at or below the saved position are skipped.
+
+The first run of a table (or a `full_refresh`) creates the slot before
+loading a full snapshot of the table, so every change committed after the
+snapshot is kept by the slot; changes already in the snapshot are merged
+again, with no effect. Pre-load transformations do not apply to captured
+tables, whose changes are merged row by row.
+
+Slots keep WAL on the source until they are advanced: drop the slot of a
+table that is no longer captured.
+
+    python scripts/cdc.py --status
+    python scripts/cdc.py --drop raw_orders
+"""
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import text
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+from config import INGEST_CONFIG, INCREMENTAL_SOURCES
+from scripts.bronze_schemas import apply_schema, get_schema
+from scripts.ingest_metrics import record_batch, stage
+from scripts.ingest_state import clear_cdc_position, get_cdc_position
+
+CDC_PLUGIN = 'wal2json'
+# Row changes of wal2json (format version 2); "T" is a TRUNCATE
+CHANGE_ACTIONS = ('I', 'U', 'D', 'T')
+
+
+def slot_name(table):
+    """
+    Return the replication slot of a table.
+    """
+    return f"{INGEST_CONFIG['cdc_slot_prefix']}_{table}".lower()
+
+
+def lsn_value(lsn):
+    """
+    Return an LSN such as '16/B374D848' as an integer, for comparisons.
+    """
+    high, _, low = str(lsn).partition('/')
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+def _autocommit(pg_engine):
+    # Slot functions must not run inside a transaction that has written
+    return pg_engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+
+def slot_exists(pg_engine, slot):
+    with _autocommit(pg_engine) as pg_conn:
+        return pg_conn.execute(
+            text("SELECT 1 FROM pg_replication_slots WHERE slot_name = :slot"), {"slot": slot}
+        ).scalar() is not None
+
+
+def create_slot(pg_engine, slot):
+    """
+    Create a logical replication slot, dropping an existing one first.
+    Returns the LSN the slot starts from.
+    """
+    drop_slot(pg_engine, slot)
+    with _autocommit(pg_engine) as pg_conn:
+        lsn = pg_conn.execute(
+            text("SELECT lsn::text FROM pg_create_logical_replication_slot(:slot, :plugin)"),
+            {"slot": slot, "plugin": CDC_PLUGIN}
+        ).scalar()
+    logging.info(f"✅ Created replication slot {slot} at {lsn}")
+    return lsn
+
+
+def drop_slot(pg_engine, slot):
+    with _autocommit(pg_engine) as pg_conn:
+        pg_conn.execute(
+            text("SELECT pg_drop_replication_slot(slot_name) FROM pg_replication_slots WHERE slot_name = :slot"),
+            {"slot": slot}
+        )
+
+
+def peek_changes(pg_engine, slot, table, limit):
+    """
+    Return up to about `limit` (lsn, data) rows of the slot, without
+    consuming them. Only the changes of `table` are decoded; every
+    transaction still has its begin ("B") and commit ("C") rows.
+    """
+    with _autocommit(pg_engine) as pg_conn:
+        return pg_conn.execute(
+            text(
+                "SELECT lsn::text, data FROM pg_logical_slot_peek_changes(:slot, NULL, :limit, "
+                "'format-version', '2', 'include-transaction', 'true', 'add-tables', :tables)"
+            ),
+            {"slot": slot, "limit": limit, "tables": f"*.{table}"}
+        ).fetchall()
+
+
+def advance_slot(pg_engine, slot, lsn):
+    """
+    Release the changes up to `lsn`, so the source can recycle their WAL.
+    """
+    with _autocommit(pg_engine) as pg_conn:
+        pg_conn.execute(text("SELECT pg_replication_slot_advance(:slot, CAST(:lsn AS pg_lsn))"),
+                        {"slot": slot, "lsn": lsn})
+
+
+def parse_transactions(rows):
+    """
+    Group the (lsn, data) rows of a slot into (commit lsn, changes)
+    transactions, in commit order. A change is an (action, columns,
+    identity) tuple: the new row of an insert or update, the old key of a
+    delete (or of an update that changed it). An unfinished trailing
+    transaction is left out.
+    """
+    transactions = []
+    changes = None
+    for lsn, data in rows:
+        message = json.loads(data)
+        action = message["action"]
+        if action == 'B':
+            changes = []
+        elif action == 'C':
+            if changes is not None:
+                transactions.append((lsn, changes))
+            changes = None
+        elif action in CHANGE_ACTIONS and changes is not None:
+            columns = {c["name"]: c["value"] for c in message.get("columns", [])}
+            identity = {c["name"]: c["value"] for c in message.get("identity", [])}
+            changes.append((action, columns, identity))
+    return transactions
+
+
+class ChangeBatch:
+    """
+    The net effect of consecutive transactions on one table: the last row
+    of every upserted key, the deleted keys and whether the table was
+    truncated first.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.truncate = False
+        # key -> new row, or None for a deleted key; last change wins
+        self.rows = {}
+        self.changes = 0
+        self.transactions = 0
+        self.lsn = None
+
+    def add(self, action, columns, identity):
+        self.changes += 1
+        if action == 'T':
+            # Nothing before a truncation survives it
+            self.truncate = True
+            self.rows.clear()
+            return
+        old_key = identity.get(self.key)
+        if action == 'D':
+            self.rows[old_key] = None
+            return
+        new_key = columns[self.key]
+        if old_key is not None and old_key != new_key:
+            self.rows[old_key] = None
+        self.rows[new_key] = columns
+
+    def upserts(self, table):
+        """
+        Return the upserted rows as a DataFrame typed with the table's schema.
+        """
+        rows = [row for row in self.rows.values() if row is not None]
+        if not rows:
+            return pd.DataFrame(columns=[self.key])
+        df = pd.DataFrame(rows)
+        if any(len(row) < len(df.columns) for row in rows):
+            # wal2json leaves unchanged TOASTed values out of updates
+            raise ValueError(f"Updates of {table} lack unchanged TOASTed columns and cannot be merged")
+        schema = get_schema(table)
+        if schema:
+            # Fractional seconds are only written when non-zero, so one format does not fit every value
+            df = df.assign(**{
+                column: pd.to_datetime(df[column], format='ISO8601')
+                for column in schema["parse_dates"] if column in df
+            })
+        return apply_schema(df, table)
+
+    def deletes(self):
+        return pd.Series([key for key, row in self.rows.items() if row is None], name=self.key, dtype=object)
+
+
+def change_batches(transactions, key, after_lsn=None, limit=None):
+    """
+    Collapse transactions into ChangeBatch objects of whole transactions
+    and at least `limit` changes (all of them without a limit), skipping
+    the transactions committed at or before `after_lsn`.
+    """
+    after = lsn_value(after_lsn) if after_lsn else -1
+    batch = ChangeBatch(key)
+    for lsn, changes in transactions:
+        if lsn_value(lsn) <= after:
+            continue
+        for change in changes:
+            batch.add(*change)
+        batch.transactions += 1
+        batch.lsn = lsn
+        if limit and batch.changes >= limit:
+            yield batch
+            batch = ChangeBatch(key)
+    if batch.transactions:
+        yield batch
+
+
+def apply_batch(loader, batch, truncate):
+    """
+    Merge a ChangeBatch into bronze with a MergeLoader. `truncate()`
+    empties the bronze table. Returns the upserted rows (a DataFrame) and
+    the deleted keys (a Series).
+    """
+    with stage('transform'):
+        upserts = batch.upserts(loader.table_name)
+        deletes = batch.deletes()
+    record_batch(upserts)
+    with stage('load'):
+        if batch.truncate:
+            truncate()
+        loader.delete(deletes)
+        loader.write(upserts)
+    return upserts, deletes
+
+
+def cdc_tables():
+    """
+    Return the PostgreSQL tables captured by CDC and their keys.
+    """
+    return {table: spec["key"] for table, spec in INCREMENTAL_SOURCES.items()}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or drop the CDC replication slots.")
+    parser.add_argument('--status', action='store_true', help="Show the slots and their saved positions.")
+    parser.add_argument('--drop', metavar='TABLE', default=None,
+                        help="Drop the slot of a table and forget its position (its next run takes a snapshot).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from connections import get_pg_engine
+
+    args = parse_args(argv)
+    pg_engine = get_pg_engine()
+    if args.drop:
+        drop_slot(pg_engine, slot_name(args.drop))
+        clear_cdc_position(args.drop)
+        logging.info(f"🗑 Dropped the replication slot of {args.drop}")
+    if args.status or not args.drop:
+        with _autocommit(pg_engine) as pg_conn:
+            slots = {
+                row.slot_name: row for row in pg_conn.execute(text(
+                    "SELECT slot_name, confirmed_flush_lsn::text AS lsn, "
+                    "pg_size_pretty(pg_wal_lsn_diff(pg_current_wal_lsn(), restart_lsn)) AS retained "
+                    "FROM pg_replication_slots"
+                ))
+            }
+        for table in cdc_tables():
+            slot = slots.get(slot_name(table))
+            position = get_cdc_position(table)
+            logging.info(
+                f"{table:20} slot {slot_name(table)}: "
+                + (f"confirmed {slot.lsn}, {slot.retained} of WAL retained" if slot else "missing")
+                + f"; saved position {position['lsn'] if position else 'none'}"
+            )
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,252 @@
+"""
+Vectorized, mergeable column profiles for data-quality reports.
+
+A TableProfile is fed one DataFrame at a time (`update`), either a whole
+table or successive chunks of it, and computes every per-column statistic
+in one vectorized pass over each chunk: null counts, min/max, mean and
+standard deviation, distinct counts (on 64-bit value hashes), top-k values
+of categorical columns and per-block null counts. Profiles built on
+separate chunks can be combined with `merge`, and `finalize()` turns the
+partial state into a JSON-serializable dict with quantiles and IQR outlier
+counts.
+
+By default every statistic is exact. With `approximate=True` the value
+distributions, distinct counts and top-k use the bounded-memory sketches
+of `scripts/sketches.py` (KLL, HyperLogLog, Space-Saving) and each column
+reports the error bounds of its estimates.
+
+Key columns encoded as integer codes (`scripts/id_encoding.py`) are
+profiled as the text columns they stand for: a negative code is a null
+and distinct counts hash the codes, which is much cheaper than hashing
+the 32-character strings.
+"""
+import numpy as np
+import pandas as pd
+
+from scripts.id_encoding import NULL_CODE, is_encoded
+from scripts.sketches import hash_values, make_counter, make_distinct, make_distribution
+
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+TOP_K = 10
+# Rows per block for the null-density summary used by the missing-values chart;
+# neighbouring blocks are combined once there are more than MAX_NULL_BLOCKS
+NULL_BLOCK_ROWS = 1000
+MAX_NULL_BLOCKS = 2000
+
+
+def column_kind(dtype):
+    """
+    Classify a pandas dtype as 'numeric', 'datetime', 'categorical' or 'text'.
+    """
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(dtype):
+        return 'categorical'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'datetime'
+    if pd.api.types.is_numeric_dtype(dtype):
+        return 'numeric'
+    return 'text'
+
+
+def to_float(series, kind='numeric'):
+    """
+    Return the non-null values of a numeric or timestamp column as float64
+    (timestamps as nanoseconds since the epoch).
+    """
+    values = series.dropna()
+    if kind == 'datetime':
+        return values.to_numpy('datetime64[ns]').view('int64').astype('float64')
+    return values.to_numpy('float64', na_value=np.nan)
+
+
+def _from_float(value, kind):
+    """
+    Convert a float statistic back to its column's type for the report.
+    """
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if kind == 'datetime':
+        return pd.Timestamp(int(value)).isoformat()
+    return float(value)
+
+
+class ColumnProfile:
+    """
+    Partial statistics of one column.
+    """
+
+    def __init__(self, name, kind, approximate=False):
+        self.name = name
+        self.kind = kind
+        self.approximate = approximate
+        self.count = 0
+        self.nulls = 0
+        self.sum_squares = 0.0
+        self.distinct = make_distinct(approximate)
+        self.distribution = make_distribution(approximate) if kind in ('numeric', 'datetime') else None
+        self.top = make_counter(approximate) if kind == 'categorical' else None
+
+    def update(self, column, nulls):
+        self.count += len(column)
+        self.nulls += nulls
+        self.distinct.update(hash_values(column[column != NULL_CODE] if is_encoded(column) else column))
+        if self.distribution is not None:
+            values = to_float(column, self.kind)
+            self.distribution.update(values)
+            if self.kind == 'numeric':
+                self.sum_squares += float(np.dot(values, values))
+        elif self.top is not None:
+            self.top.update(column.value_counts(sort=False))
+
+    def merge(self, other):
+        self.count += other.count
+        self.nulls += other.nulls
+        self.sum_squares += other.sum_squares
+        self.distinct.merge(other.distinct)
+        if self.distribution is not None:
+            self.distribution.merge(other.distribution)
+        if self.top is not None:
+            self.top.merge(other.top)
+
+    def finalize(self, quantiles=QUANTILES, top_k=TOP_K):
+        result = {
+            "kind": self.kind,
+            "count": self.count,
+            "nulls": self.nulls,
+            "null_pct": round(self.nulls / self.count * 100, 4) if self.count else 0.0,
+            "distinct": self.distinct.estimate(),
+        }
+        error_bounds = {"distinct_relative_error": self.distinct.relative_error()}
+
+        distribution = self.distribution
+        if distribution is not None:
+            result["min"] = _from_float(distribution.min, self.kind)
+            result["max"] = _from_float(distribution.max, self.kind)
+            if distribution.n:
+                points = distribution.quantiles(list(quantiles) + [0.25, 0.75])
+                result["quantiles"] = {
+                    f"p{round(q * 100):02d}": _from_float(p, self.kind) for q, p in zip(quantiles, points)
+                }
+                q1, q3 = points[-2:]
+                low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+                result["iqr"] = {
+                    "q1": _from_float(q1, self.kind),
+                    "q3": _from_float(q3, self.kind),
+                    "lower_fence": _from_float(low, self.kind),
+                    "upper_fence": _from_float(high, self.kind),
+                    "outliers": distribution.count_below(low) + distribution.count_above(high),
+                }
+                error_bounds["quantile_rank_error"] = distribution.rank_error()
+            if self.kind == 'numeric' and distribution.n:
+                n = distribution.n
+                mean = distribution.sum / n
+                variance = max(self.sum_squares / n - mean * mean, 0.0)
+                result["mean"] = mean
+                result["sum"] = distribution.sum
+                # Sample standard deviation, as pandas' describe() reports it
+                result["std"] = float(np.sqrt(variance * n / max(n - 1, 1)))
+
+        if self.top is not None:
+            top = self.top.top(top_k)
+            result["top"] = {str(value): count for value, count, _ in top}
+            error_bounds["top_count_error"] = max([error for _, _, error in top], default=0)
+            error_bounds["untracked_count_max"] = self.top.floor
+
+        if self.approximate:
+            result["error_bounds"] = error_bounds
+        return result
+
+
+class TableProfile:
+    """
+    Mergeable profile of a table, built from one or more DataFrames.
+    """
+
+    def __init__(self, table, approximate=False, null_block_rows=NULL_BLOCK_ROWS):
+        self.table = table
+        self.approximate = approximate
+        self.null_block_rows = null_block_rows
+        self.rows = 0
+        self.columns = {}
+        # Per-block (rows, nulls per column) in row order, for the null density chart
+        self.null_blocks = []
+
+    def update(self, df):
+        """
+        Add one DataFrame (a whole table or the next chunk of it).
+        """
+        if not self.columns:
+            self.columns = {
+                str(c): ColumnProfile(str(c), 'text' if is_encoded(df[c]) else column_kind(df[c].dtype),
+                                      self.approximate)
+                for c in df.columns
+            }
+        if df.empty:
+            return self
+
+        is_null = df.isna()
+        for c in df.columns:
+            if is_encoded(df[c]):
+                is_null[c] = df[c].to_numpy() == NULL_CODE
+        nulls = is_null.sum()
+        blocks = is_null.groupby(np.arange(len(df)) // self.null_block_rows)
+        self.null_blocks.extend(
+            (int(rows), counts.astype('int64').tolist())
+            for rows, (_, counts) in zip(blocks.size(), blocks.sum().iterrows())
+        )
+        self._coarsen_null_blocks()
+
+        for c in df.columns:
+            self.columns[str(c)].update(df[c], int(nulls[c]))
+        self.rows += len(df)
+        return self
+
+    def _coarsen_null_blocks(self):
+        """
+        Combine neighbouring null blocks pairwise while there are too many.
+        """
+        while len(self.null_blocks) > MAX_NULL_BLOCKS:
+            pairs = zip(self.null_blocks[0::2], self.null_blocks[1::2] + [(0, None)])
+            self.null_blocks = [
+                (rows_a + rows_b, counts_a if counts_b is None else [a + b for a, b in zip(counts_a, counts_b)])
+                for (rows_a, counts_a), (rows_b, counts_b) in pairs
+            ]
+
+    def merge(self, other):
+        """
+        Combine with the profile of the chunks that follow this one.
+        """
+        if not self.columns:
+            self.columns = other.columns
+        else:
+            for name, column in other.columns.items():
+                self.columns[name].merge(column)
+        self.rows += other.rows
+        self.null_blocks.extend(other.null_blocks)
+        self._coarsen_null_blocks()
+        return self
+
+    def finalize(self, quantiles=QUANTILES, top_k=TOP_K):
+        """
+        Return the profile as a JSON-serializable dict.
+        """
+        return {
+            "table": self.table,
+            "rows": self.rows,
+            "approximate": self.approximate,
+            "columns": {name: column.finalize(quantiles, top_k) for name, column in self.columns.items()},
+            "null_density": {
+                "columns": list(self.columns),
+                "block_rows": [rows for rows, _ in self.null_blocks],
+                "nulls": [counts for _, counts in self.null_blocks],
+            },
+        }
+
+
+def profile_frames(table, frames, approximate=False, null_block_rows=NULL_BLOCK_ROWS):
+    """
+    Build the profile of a table from an iterable of DataFrames (chunks).
+    """
+    profile = TableProfile(table, approximate, null_block_rows)
+    for df in frames:
+        profile.update(df)
+    return profile
@@ -0,0 +1,327 @@
+"""
+Charts of the data-quality report.
+
+Every chart is drawn from the JSON report written by
+`scripts/data_quality_report.py` (pre-aggregated counts, histograms and
+box statistics), never from the raw rows, so rendering is independent of
+the data size and can be rerun without reading the CSV files again.
+matplotlib is only needed for this step.
+
+Charts are rendered in a process pool, at a fast preview resolution or
+the publication one (CHART_DPI). The digest of every chart's aggregates
+and resolution is kept in CHART_MANIFEST next to the PNG files, and a
+chart whose digest has not changed since it was rendered is not drawn
+again.
+
+Example:
+    python scripts/data_quality_charts.py data/_reports/data_quality_report.json --quality preview
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+# Resolutions of the chart qualities
+CHART_DPI = {"preview": 72, "publication": 300}
+# Digests of the rendered charts, in the output directory
+CHART_MANIFEST = '.chart_manifest.json'
+# Bump when a renderer changes, so every chart is drawn again
+CHART_VERSION = 1
+
+
+@lru_cache(maxsize=None)
+def _pyplot():
+    # Once per process: the rendering workers set up matplotlib for their first chart only
+    try:
+        import matplotlib
+    except ImportError as e:
+        raise ImportError("Rendering charts requires matplotlib (pip install matplotlib)") from e
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    for style in ('seaborn-v0_8-darkgrid', 'seaborn-darkgrid'):
+        if style in plt.style.available:
+            plt.style.use(style)
+            break
+    return plt
+
+
+def _save(plt, fig, path, dpi):
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return path
+
+
+def _bxp_stats(box, label):
+    return {"label": label, "med": box["median"], "q1": box["q1"], "q3": box["q3"],
+            "whislo": box["whislo"], "whishi": box["whishi"], "mean": box["mean"], "fliers": []}
+
+
+def _histogram_chart(plt, histogram, box, title, xlabel, color, mean_label, median_label):
+    fig, ax = plt.subplots(figsize=(12, 6))
+    edges = np.asarray(histogram["edges"])
+    ax.bar(edges[:-1], histogram["counts"], width=np.diff(edges), align='edge',
+           color=color, edgecolor='black', alpha=0.7)
+    ax.set_title(title, fontsize=14, fontweight='bold')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel('Frequency')
+    ax.axvline(box["mean"], color='red', linestyle='--', label=mean_label.format(box["mean"]))
+    ax.axvline(box["median"], color='blue', linestyle='--', label=median_label.format(box["median"]))
+    ax.legend()
+    return fig
+
+
+def _bar_chart(plt, counts, title, xlabel, ylabel, color, horizontal=False, figsize=(12, 6)):
+    fig, ax = plt.subplots(figsize=figsize)
+    labels, values = list(counts), list(counts.values())
+    if horizontal:
+        # Largest first from the top, as pandas' barh of a sorted Series
+        ax.barh(labels[::-1], values[::-1], color=color, edgecolor='black')
+    else:
+        ax.bar(labels, values, color=color, edgecolor='black')
+        ax.tick_params(axis='x', rotation=45)
+    ax.set_title(title, fontsize=14, fontweight='bold')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    return fig
+
+
+def _missing_heatmap(plt, density):
+    block_rows = np.asarray(density["block_rows"], dtype='float64')[:, None]
+    fractions = np.asarray(density["nulls"], dtype='float64') / block_rows
+    fig, ax = plt.subplots(figsize=(14, 8))
+    image = ax.imshow(fractions, aspect='auto', cmap='RdYlGn_r', vmin=0, vmax=1, interpolation='nearest')
+    fig.colorbar(image, ax=ax, label='Share of missing values')
+    ax.set_xticks(range(len(density["columns"])))
+    ax.set_xticklabels(density["columns"], rotation=45, ha='right')
+    ax.set_yticks([])
+    ax.grid(False)
+    ax.set_title('Missing Values Heatmap - Orders Dataset', fontsize=16, fontweight='bold')
+    ax.set_xlabel('Columns', fontsize=12)
+    ax.set_ylabel(f'Rows (blocks of {int(block_rows.max())})', fontsize=12)
+    return fig
+
+
+def _missing_bar(plt, missing):
+    return _bar_chart(plt, missing, 'Number of Missing Values per Column - Orders',
+                      'Columns', 'Count of Missing Values', 'coral')
+
+
+def _price_outliers(plt, box):
+    fig, (linear, log) = plt.subplots(1, 2, figsize=(14, 6))
+    linear.bxp([_bxp_stats(box, '')], vert=False, showfliers=False, patch_artist=True,
+               boxprops={"facecolor": 'skyblue'})
+    linear.set_title('Price Distribution (Box Plot)', fontsize=14, fontweight='bold')
+    linear.set_xlabel('Price (R$)')
+    log.bxp([_bxp_stats(box, '')], vert=False, showfliers=False, patch_artist=True,
+            boxprops={"facecolor": 'lightcoral'})
+    log.set_xscale('log')
+    log.set_title('Price Distribution (Log Scale)', fontsize=14, fontweight='bold')
+    log.set_xlabel('Price (R$) - Log Scale')
+    return fig
+
+
+def _price_histogram(plt, price):
+    return _histogram_chart(plt, price["histogram"], price["box"], 'Price Distribution Histogram', 'Price (R$)',
+                            'mediumseagreen', 'Mean: R$ {:.2f}', 'Median: R$ {:.2f}')
+
+
+def _top_states(plt, states):
+    return _bar_chart(plt, states, 'Top 10 States by Number of Customers', 'State', 'Number of Customers', 'teal')
+
+
+def _order_status(plt, status):
+    fig, ax = plt.subplots(figsize=(10, 8))
+    colors = plt.get_cmap('Pastel1').colors
+    ax.pie(list(status.values()), labels=list(status), autopct='%1.1f%%',
+           startangle=90, colors=colors, textprops={'fontsize': 11})
+    ax.set_title('Order Status Distribution', fontsize=14, fontweight='bold')
+    return fig
+
+
+def _orders_over_time(plt, monthly):
+    fig, ax = plt.subplots(figsize=(14, 6))
+    positions = np.arange(len(monthly))
+    ax.plot(positions, list(monthly.values()), marker='o', color='dodgerblue', linewidth=2)
+    ax.set_xticks(positions)
+    ax.set_xticklabels(list(monthly), rotation=45, ha='right')
+    ax.set_title('Number of Orders Over Time (Monthly)', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Month')
+    ax.set_ylabel('Number of Orders')
+    ax.grid(True, alpha=0.3)
+    return fig
+
+
+def _delivery_time(plt, delivery):
+    return _histogram_chart(plt, delivery["histogram"], delivery["box"], 'Delivery Time Distribution',
+                            'Delivery Time (Days)', 'purple', 'Mean: {:.1f} days', 'Median: {:.1f} days')
+
+
+def _top_categories(plt, categories):
+    return _bar_chart(plt, categories, 'Top 15 Product Categories by Sales Volume',
+                      'Number of Items Sold', 'Product Category', 'gold', horizontal=True, figsize=(14, 7))
+
+
+def _revenue_by_category(plt, revenue):
+    return _bar_chart(plt, revenue, 'Top 15 Product Categories by Revenue',
+                      'Total Revenue (R$)', 'Product Category', 'seagreen', horizontal=True, figsize=(14, 7))
+
+
+# Chart renderers by name: each draws a figure from the report aggregates given to it
+RENDERERS = {
+    "missing_heatmap": _missing_heatmap,
+    "missing_bar": _missing_bar,
+    "price_outliers": _price_outliers,
+    "price_histogram": _price_histogram,
+    "top_states": _top_states,
+    "order_status": _order_status,
+    "orders_over_time": _orders_over_time,
+    "delivery_time": _delivery_time,
+    "top_categories": _top_categories,
+    "revenue_by_category": _revenue_by_category,
+}
+
+
+def chart_specs(report):
+    """
+    Return the charts of a report as (file name, renderer, aggregates)
+    tuples, leaving out charts without data.
+    """
+    specs = []
+    orders = report["tables"].get("raw_orders")
+    if orders:
+        if orders["null_density"]["nulls"]:
+            specs.append(('output_missing_values_orders.png', "missing_heatmap", orders["null_density"]))
+        missing = {name: column["nulls"] for name, column in orders["columns"].items() if column["nulls"]}
+        if missing:
+            missing = dict(sorted(missing.items(), key=lambda item: item[1], reverse=True))
+            specs.append(('output_missing_values_bar.png', "missing_bar", missing))
+
+    summary = report.get("summary")
+    if summary is None:
+        logging.warning("⚠️ Report has no business summary; only missing-value charts are rendered.")
+        return specs
+    distributions = summary["distributions"]
+    price = distributions["price"]
+    if price["box"]:
+        specs.append(('output_price_outliers.png', "price_outliers", price["box"]))
+        specs.append(('output_price_histogram.png', "price_histogram", price))
+    if distributions["top_states"]:
+        specs.append(('output_top_states.png', "top_states", distributions["top_states"]))
+    if distributions["order_status"]:
+        specs.append(('output_order_status.png', "order_status", distributions["order_status"]))
+    if distributions["orders_by_month"]:
+        specs.append(('output_orders_over_time.png', "orders_over_time", distributions["orders_by_month"]))
+    if distributions["delivery_days"]["box"]:
+        specs.append(('output_delivery_time.png', "delivery_time", distributions["delivery_days"]))
+    if distributions["top_categories"]:
+        specs.append(('output_top_categories.png', "top_categories", distributions["top_categories"]))
+    if distributions["revenue_by_category"]:
+        specs.append(('output_revenue_by_category.png', "revenue_by_category", distributions["revenue_by_category"]))
+    return specs
+
+
+def chart_digest(renderer, data, dpi):
+    """
+    Return a digest of everything a chart is drawn from: its renderer, its
+    aggregates and the resolution.
+    """
+    payload = json.dumps([CHART_VERSION, renderer, dpi, data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def render_chart(renderer, data, path, dpi):
+    """
+    Render one chart to `path`. Runs in the worker processes of `render_charts`.
+    """
+    plt = _pyplot()
+    return _save(plt, RENDERERS[renderer](plt, data), path, dpi)
+
+
+def _load_manifest(output_dir):
+    path = Path(output_dir) / CHART_MANIFEST
+    if not path.exists():
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def render_charts(report, output_dir, dpi=None, quality='publication', workers=None, force=False):
+    """
+    Render the report charts as PNG files in `output_dir` and return their
+    paths.
+
+    `quality` picks the resolution from CHART_DPI ('preview' for a fast
+    look, 'publication' for the final files) unless `dpi` is given. Charts
+    whose aggregates and resolution are unchanged since they were last
+    rendered to `output_dir` are kept as they are, unless `force` is set;
+    the others are rendered by `workers` processes (default: one per CPU,
+    1 renders in this process).
+    """
+    if dpi is None:
+        if quality not in CHART_DPI:
+            raise ValueError(f"Unknown chart quality '{quality}', expected one of {tuple(CHART_DPI)}")
+        dpi = CHART_DPI[quality]
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+
+    manifest = _load_manifest(output_dir)
+    specs = chart_specs(report)
+    digests = {name: chart_digest(renderer, data, dpi) for name, renderer, data in specs}
+    pending = [
+        (name, renderer, data) for name, renderer, data in specs
+        if force or manifest.get(name) != digests[name] or not (output_dir / name).exists()
+    ]
+    workers = min(workers or os.cpu_count() or 1, len(pending))
+    if workers <= 1:
+        for name, renderer, data in pending:
+            render_chart(renderer, data, output_dir / name, dpi)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(render_chart, *zip(*[(renderer, data, output_dir / name, dpi)
+                                               for name, renderer, data in pending])))
+
+    manifest.update((name, digests[name]) for name, _, _ in pending)
+    with open(output_dir / CHART_MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    logging.info(
+        f"✅ Rendered {len(pending)} chart(s) to {output_dir} at {dpi} dpi with {max(workers, 1)} process(es) "
+        f"in {time.perf_counter() - started:.1f}s; {len(specs) - len(pending)} unchanged chart(s) kept"
+    )
+    return [output_dir / name for name, _, _ in specs]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Render the charts of a data-quality report.")
+    parser.add_argument('report', help="Path of data_quality_report.json.")
+    parser.add_argument('--output-dir', default=None, help="Directory for the PNG files (default: next to the report).")
+    parser.add_argument('--quality', choices=tuple(CHART_DPI), default='publication',
+                        help="Chart resolution: preview (72 dpi) or publication (300 dpi).")
+    parser.add_argument('--dpi', type=int, default=None, help="Resolution of the rendered charts (overrides --quality).")
+    parser.add_argument('--workers', type=int, default=None, help="Rendering processes (default: one per CPU).")
+    parser.add_argument('--force', action='store_true', help="Render every chart, even when unchanged.")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args()
+    with open(args.report, encoding='utf-8') as f:
+        report = json.load(f)
+    render_charts(report, args.output_dir or Path(args.report).parent, dpi=args.dpi, quality=args.quality,
+                  workers=args.workers, force=args.force)
@@ -0,0 +1,464 @@
+"""
+Data-quality report of the raw Olist CSV files.
+
+Every table found in the data directory is read once with its declared
+schema and profiled in a single vectorized pass (`scripts/data_profile.py`):
+nulls, min/max, quantiles, IQR outliers, distinct counts and top values per
+column. The business summary (revenue, average order value, delivery
+times, top state and category) is computed from the same DataFrames, with
+one order item -> product lookup shared by every category metric.
+
+With `--approximate` the files are streamed in chunks and quantiles,
+distinct counts and top-k values come from mergeable sketches
+(`scripts/sketches.py`), so the same report can be produced on data far
+larger than memory, with the error bounds of each estimate included.
+With `--cache` the files are parsed once into the local Parquet cache
+shared with the ingestion and read memory-mapped on later runs.
+With `--engine polars` whole files are parsed and the business metrics
+computed by the multithreaded Polars engine (`scripts/frame_engines.py`).
+With `--encode-ids` the key columns are profiled and joined as integer
+codes of one dictionary shared by the tables (`scripts/id_encoding.py`).
+
+The result is written as a machine-readable JSON report plus the text
+summary. Charts are an optional, separate step rendered from the JSON
+report alone (`--charts`, or `scripts/data_quality_charts.py`).
+
+Example:
+    python scripts/data_quality_report.py --data-dir data/raw_data --charts
+    python scripts/data_quality_report.py --data-dir /big/olist --approximate
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+from config import INGEST_CONFIG
+from scripts.bronze_schemas import CSV_FILE_NAMES, csv_file_path, read_csv_typed
+from scripts.data_profile import TableProfile
+from scripts.frame_engines import FRAME_ENGINES, METRIC_TABLES, get_engine
+from scripts.id_encoding import IdDictionary
+from scripts.sketches import make_counter, make_distribution
+
+REPORT_VERSION = 1
+REPORT_FILE = 'data_quality_report.json'
+SUMMARY_FILE = 'output_analysis_summary.txt'
+
+# Tables the business summary is computed from
+SUMMARY_TABLES = ("raw_customers", "raw_orders", "raw_order_items", "raw_products", "raw_sellers")
+HISTOGRAM_BINS = 50
+# Rows per chunk in approximate (streaming) mode unless --chunksize is given
+STREAMING_CHUNKSIZE = 100000
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+
+def read_chunks(path, table, chunksize=None):
+    """
+    Yield a CSV file with its declared schema, whole or in chunks of
+    `chunksize` rows.
+    """
+    if not chunksize:
+        yield read_csv_typed(path, table)
+        return
+    with read_csv_typed(path, table, chunksize=chunksize) as reader:
+        yield from reader
+
+
+def _add_counts(total, counts):
+    return total.add(counts[counts > 0], fill_value=0)
+
+
+def _distribution_summary(distribution, bins=HISTOGRAM_BINS):
+    """
+    Histogram and box-plot statistics (Tukey whiskers at 1.5 IQR) of a
+    distribution from `scripts/sketches.py`.
+    """
+    if not distribution.n:
+        return {"histogram": {"edges": [], "counts": []}, "box": None}
+    counts, edges = distribution.histogram(bins)
+    q1, median, q3 = distribution.quantiles([0.25, 0.5, 0.75])
+    low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    whislo, whishi = distribution.whiskers(low, high)
+    return {
+        "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+        "box": {
+            "q1": float(q1), "median": float(median), "q3": float(q3),
+            "whislo": float(whislo), "whishi": float(whishi),
+            "mean": distribution.sum / distribution.n,
+            "outliers": distribution.count_below(low) + distribution.count_above(high),
+        },
+    }
+
+
+def _counts(series):
+    return {str(key): float(value) if isinstance(value, float) else int(value) for key, value in series.items()}
+
+
+def _timestamp(nanoseconds):
+    return None if nanoseconds is None else pd.Timestamp(int(nanoseconds)).isoformat()
+
+
+class BusinessSummary:
+    """
+    Business metrics accumulated chunk by chunk alongside the table profiles.
+
+    Order items are matched to their product category through one lookup
+    built from raw_products (64-bit hash of the product_id, or of its code
+    when the key columns are encoded -> category), which is
+    why raw_products has to be read before raw_order_items. Sums and the
+    per-month / per-status / per-category totals are exact; with
+    `approximate` the delivery-time distribution and the top categories
+    use sketches. Everything else is taken from the table profiles.
+    """
+
+    def __init__(self, approximate=False):
+        self.approximate = approximate
+        self.total_value = 0.0
+        self.valued_items = 0
+        self.delivery_days = make_distribution(approximate)
+        self.orders_by_month = pd.Series(dtype='int64')
+        self.order_status = pd.Series(dtype='int64')
+        self.category_items = make_counter(approximate)
+        self.category_revenue = pd.Series(dtype='float64')
+        self._product_hashes = []
+        self._product_categories = []
+        self._category_lookup = None
+
+    def update(self, table, df):
+        handler = {
+            "raw_products": self._update_products,
+            "raw_order_items": self._update_items,
+            "raw_orders": self._update_orders,
+        }.get(table)
+        if handler is not None:
+            handler(df)
+
+    def _update_products(self, df):
+        if self._category_lookup is not None:
+            raise ValueError("raw_products must be read before raw_order_items")
+        self._product_hashes.append(pd.util.hash_pandas_object(df["product_id"], index=False).to_numpy())
+        self._product_categories.append(df["product_category_name"].astype(object).to_numpy())
+
+    def _update_items(self, df):
+        if self._category_lookup is None:
+            hashes = pd.Index(np.concatenate(self._product_hashes) if self._product_hashes else [], dtype='uint64')
+            categories = np.concatenate(self._product_categories) if self._product_categories else []
+            unique = ~hashes.duplicated()
+            self._category_lookup = pd.Series(np.asarray(categories, dtype=object)[unique], index=hashes[unique])
+            self._product_hashes, self._product_categories = [], []
+
+        total_value = df["price"] + df["freight_value"]
+        self.total_value += float(total_value.sum())
+        self.valued_items += int(total_value.count())
+        category = self._category_lookup.reindex(
+            pd.util.hash_pandas_object(df["product_id"], index=False).to_numpy()
+        ).to_numpy()
+        self.category_items.update(pd.Series(category).value_counts())
+        self.category_revenue = _add_counts(
+            self.category_revenue, total_value.groupby(category).sum()
+        )
+
+    def _update_orders(self, df):
+        delivery_days = (df["order_delivered_customer_date"] - df["order_purchase_timestamp"]).dt.days
+        self.delivery_days.update(delivery_days[delivery_days.notna() & (delivery_days > 0)].to_numpy('float64'))
+        self.orders_by_month = _add_counts(
+            self.orders_by_month, df["order_purchase_timestamp"].dt.to_period('M').value_counts()
+        )
+        self.order_status = _add_counts(self.order_status, df["order_status"].value_counts())
+
+    def add_metrics(self, metrics):
+        """
+        Add the business metrics of whole tables, as computed by a frame
+        engine's `summary_metrics`.
+        """
+        self.total_value += metrics["total_value"]
+        self.valued_items += metrics["valued_items"]
+        self.delivery_days.update(metrics["delivery_days"])
+        self.orders_by_month = _add_counts(self.orders_by_month, metrics["orders_by_month"])
+        self.order_status = _add_counts(self.order_status, metrics["order_status"])
+        self.category_items.update(metrics["category_items"])
+        self.category_revenue = _add_counts(self.category_revenue, metrics["category_revenue"])
+
+    def finalize(self, profiles):
+        """
+        Return the summary dict, or None when a summary table is missing.
+        """
+        if any(table not in profiles for table in SUMMARY_TABLES):
+            return None
+        customers, orders = profiles["raw_customers"], profiles["raw_orders"]
+        items, products, sellers = profiles["raw_order_items"], profiles["raw_products"], profiles["raw_sellers"]
+
+        states = customers.columns["customer_state"].top
+        purchases = orders.columns["order_purchase_timestamp"].distribution
+        price = items.columns["price"].distribution
+        top_states = states.top(10)
+        top_categories = self.category_items.top(15)
+        orders_by_month = self.orders_by_month.sort_index()
+        revenue_by_category = self.category_revenue.nlargest(15)
+
+        summary = {
+            "customers": customers.rows,
+            "orders": orders.rows,
+            "order_items": items.rows,
+            "unique_products": products.columns["product_id"].distinct.estimate(),
+            "active_sellers": sellers.columns["seller_id"].distinct.estimate(),
+            "orders_missing_delivery_date": orders.columns["order_delivered_customer_date"].nulls,
+            "orders_missing_approval": orders.columns["order_approved_at"].nulls,
+            "total_revenue": self.total_value,
+            # Mean value (price + freight) per order item, as in the original exploration report
+            "average_order_value": self.total_value / self.valued_items if self.valued_items else None,
+            "average_delivery_days": (
+                self.delivery_days.sum / self.delivery_days.n if self.delivery_days.n else None
+            ),
+            "top_state": str(top_states[0][0]) if top_states else None,
+            "most_sold_category": str(top_categories[0][0]) if top_categories else None,
+            "first_order": _timestamp(purchases.min),
+            "last_order": _timestamp(purchases.max),
+            "peak_month": str(orders_by_month.idxmax()) if len(orders_by_month) else None,
+            "distributions": {
+                "price": _distribution_summary(price),
+                "delivery_days": _distribution_summary(self.delivery_days),
+                "orders_by_month": _counts(orders_by_month.astype('int64')),
+                "order_status": _counts(self.order_status.sort_values(ascending=False).astype('int64')),
+                "top_states": {str(value): count for value, count, _ in top_states},
+                "top_categories": {str(value): count for value, count, _ in top_categories},
+                "revenue_by_category": _counts(revenue_by_category),
+            },
+            "error_bounds": None,
+        }
+        if self.approximate:
+            summary["error_bounds"] = {
+                "quantile_rank_error": price.rank_error(),
+                "distinct_relative_error": products.columns["product_id"].distinct.relative_error(),
+                "top_states_count_error": max([error for _, _, error in top_states], default=0),
+                "top_categories_count_error": max([error for _, _, error in top_categories], default=0),
+            }
+        return summary
+
+
+def build_report(data_dir, chunksize=None, approximate=False, cache=False, engine=None, encode_ids=False):
+    """
+    Profile every known CSV file in `data_dir` and return the report dict.
+
+    With `chunksize` the files are read in chunks of that many rows. With
+    `approximate` (which defaults the chunk size to STREAMING_CHUNKSIZE)
+    quantiles, distinct counts and top-k come from bounded-memory sketches,
+    so memory stays flat however large the files are, and the report
+    carries the error bounds of every estimate. With `cache` the files are
+    read from the local Parquet cache shared with the ingestion
+    (`scripts/bronze_cache.py`), which is filled on the first run.
+
+    Otherwise whole files are read and the business metrics computed by
+    the frame `engine` (default: INGEST_CONFIG["frame_engine"]); the
+    engines read whole files, so chunked and cached reads always use
+    pandas. With `encode_ids` the key columns of every table are encoded
+    with one dictionary before they are profiled and joined.
+    """
+    data_dir = Path(data_dir)
+    if approximate and not chunksize:
+        chunksize = STREAMING_CHUNKSIZE
+    engine = engine or INGEST_CONFIG["frame_engine"]
+    if chunksize or cache:
+        if engine != 'pandas':
+            logging.warning(f"⚠️ The {engine} engine reads whole files; using pandas for chunked or cached reads.")
+        engine = None
+    else:
+        engine = get_engine(engine)
+    report = {
+        "report_version": REPORT_VERSION,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "data_dir": str(data_dir),
+        "approximate": approximate,
+        "chunksize": chunksize,
+        "cache": cache,
+        "engine": engine.name if engine else 'pandas',
+        "encode_ids": encode_ids,
+        "tables": {},
+        "summary": None,
+    }
+    if cache:
+        # pyarrow is only needed for the cache
+        from scripts.bronze_cache import read_csv_cached
+    profiles, frames = {}, {}
+    summary = BusinessSummary(approximate)
+    ids = IdDictionary() if encode_ids else None
+    # raw_products goes first so order items can be matched to their category
+    for table in sorted(CSV_FILE_NAMES, key=lambda name: name != "raw_products"):
+        path = csv_file_path(data_dir, table)
+        if not path.exists():
+            logging.warning(f"⚠️ {path.name} not found in {data_dir}; skipping {table}.")
+            continue
+        started = time.perf_counter()
+        profile = TableProfile(table, approximate)
+        if engine is not None:
+            frame = engine.read(path, table)
+            df = engine.to_pandas(frame, table)
+            if ids is not None:
+                df = ids.encode_frame(df)
+                # The pandas engine computes the metrics on the encoded frames too
+                frame = df if engine.name == 'pandas' else frame
+            if table in METRIC_TABLES:
+                frames[table] = frame
+            profile.update(df)
+        else:
+            chunks = read_csv_cached(path, table, chunksize) if cache else read_chunks(path, table, chunksize)
+            for chunk in chunks:
+                if ids is not None:
+                    chunk = ids.encode_frame(chunk)
+                profile.update(chunk)
+                summary.update(table, chunk)
+        profiles[table] = profile
+        report["tables"][table] = dict(profile.finalize(), seconds=round(time.perf_counter() - started, 3))
+        logging.info(f"✅ Profiled {table}: {profile.rows:,} rows in {time.perf_counter() - started:.2f}s")
+
+    if engine is not None and all(table in frames for table in METRIC_TABLES):
+        started = time.perf_counter()
+        summary.add_metrics(engine.summary_metrics(frames))
+        logging.info(f"✅ Computed the business metrics with {engine.name} in {time.perf_counter() - started:.2f}s")
+    report["summary"] = summary.finalize(profiles)
+    if report["summary"] is None:
+        missing = [table for table in SUMMARY_TABLES if table not in profiles]
+        logging.warning(f"⚠️ Business summary skipped, missing tables: {', '.join(missing)}")
+    return report
+
+
+def _fmt(value, pattern, default='n/a'):
+    return default if value is None else format(value, pattern)
+
+
+def format_summary(report):
+    """
+    Render the text summary of a report.
+    """
+    lines = []
+    for table, profile in report["tables"].items():
+        with_nulls = {name: column for name, column in profile["columns"].items() if column["nulls"]}
+        lines.append(f"Missing Values in {table} ({profile['rows']:,} rows):")
+        lines.append("-" * 50)
+        if not with_nulls:
+            lines.append(f"No missing values found in {table}.")
+        for name, column in with_nulls.items():
+            lines.append(f"{name:40} | {column['nulls']:6,} ({column['null_pct']:.2f}%)")
+        lines.append("")
+
+    price = report["tables"].get("raw_order_items", {}).get("columns", {}).get("price")
+    if price and "iqr" in price:
+        lines.append("Price Statistics:")
+        lines.append("-" * 50)
+        lines.append(f"📊 Total Products: {price['count']:,}")
+        lines.append(f"⚠️  Price Outliers Detected: {price['iqr']['outliers']:,} "
+                     f"({price['iqr']['outliers'] / max(price['count'], 1) * 100:.2f}%)")
+        lines.append(f"💰 Most Expensive Product: R$ {price['max']:,.2f}")
+        lines.append("")
+
+    summary = report["summary"]
+    if summary is None:
+        return "\n".join(lines)
+    lines.append(f"""
+Data Quality Summary:
+{'=' * 50}
+✅ Total Customers: {summary['customers']:,}
+✅ Total Orders: {summary['orders']:,}
+✅ Total Products Sold: {summary['order_items']:,}
+✅ Unique Products: {summary['unique_products']:,}
+✅ Active Sellers: {summary['active_sellers']:,}
+
+Missing Data Issues:
+{'=' * 50}
+⚠️  Orders with missing delivery dates: {summary['orders_missing_delivery_date']:,}
+⚠️  Orders with missing approval: {summary['orders_missing_approval']:,}
+
+Business Insights:
+{'=' * 50}
+💰 Total Revenue: R$ {summary['total_revenue']:,.2f}
+📊 Average Order Value: R$ {_fmt(summary['average_order_value'], '.2f')}
+⏱️  Average Delivery Time: {_fmt(summary['average_delivery_days'], '.1f')} days
+🏆 Top State: {summary['top_state'] or 'N/A'}
+🎯 Most Sold Category: {summary['most_sold_category'] or 'N/A'}
+📅 Date Range: {summary['first_order']} to {summary['last_order']}
+📦 Peak Month: {summary['peak_month'] or 'N/A'}
+""")
+    bounds = summary.get("error_bounds")
+    if bounds:
+        lines.append(
+            f"≈ Approximate statistics: quantiles within ±{bounds['quantile_rank_error']:.2%} of rank, "
+            f"distinct counts ±{bounds['distinct_relative_error']:.2%} (1 std. error), "
+            f"top-state counts +{bounds['top_states_count_error']:,}, "
+            f"top-category counts +{bounds['top_categories_count_error']:,} at most."
+        )
+    return "\n".join(lines)
+
+
+def write_report(report, output_dir):
+    """
+    Write the JSON report and the text summary to `output_dir`.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_dir / REPORT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, default=str)
+    with open(output_dir / SUMMARY_FILE, 'w', encoding='utf-8') as f:
+        f.write(format_summary(report))
+    return output_dir / REPORT_FILE
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Profile the raw Olist CSV files and write a data-quality report.")
+    parser.add_argument('--data-dir', default=str(project_root / 'data' / 'raw_data'),
+                        help="Directory with the raw CSV files.")
+    parser.add_argument('--output-dir', default=str(project_root / 'data' / '_reports'),
+                        help="Directory for the JSON report, the text summary and the charts.")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="Read the CSV files in chunks of this many rows.")
+    parser.add_argument('--approximate', action='store_true',
+                        help="Streaming mode: chunked reads and bounded-memory sketches (KLL, HyperLogLog, "
+                             "Space-Saving) instead of exact statistics; error bounds are reported.")
+    parser.add_argument('--cache', action='store_true', default=INGEST_CONFIG["cache"],
+                        help="Read the files through the local Parquet cache shared with the ingestion "
+                             "(default: INGEST_CACHE).")
+    parser.add_argument('--engine', choices=FRAME_ENGINES, default=INGEST_CONFIG["frame_engine"],
+                        help="DataFrame engine of whole-file reads and the business metrics "
+                             "(default: INGEST_FRAME_ENGINE).")
+    parser.add_argument('--encode-ids', action='store_true', default=INGEST_CONFIG["encode_ids"],
+                        help="Profile and join the key columns as integer codes (default: INGEST_ENCODE_IDS).")
+    parser.add_argument('--charts', action='store_true', help="Also render the charts from the report.")
+    parser.add_argument('--chart-quality', choices=('preview', 'publication'), default='publication',
+                        help="Chart resolution: preview (72 dpi) or publication (300 dpi).")
+    parser.add_argument('--dpi', type=int, default=None,
+                        help="Resolution of the rendered charts (overrides --chart-quality).")
+    parser.add_argument('--chart-workers', type=int, default=None,
+                        help="Processes rendering the charts (default: one per CPU).")
+    parser.add_argument('--force-charts', action='store_true',
+                        help="Render every chart, even when its aggregates are unchanged.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    started = time.perf_counter()
+    report = build_report(args.data_dir, chunksize=args.chunksize, approximate=args.approximate,
+                          cache=args.cache, engine=args.engine, encode_ids=args.encode_ids)
+    report_path = write_report(report, args.output_dir)
+    print(format_summary(report))
+    logging.info(f"✅ Report written to {report_path} in {time.perf_counter() - started:.1f}s")
+
+    if args.charts:
+        from scripts.data_quality_charts import render_charts
+        render_charts(report, args.output_dir, dpi=args.dpi, quality=args.chart_quality,
+                      workers=args.chart_workers, force=args.force_charts)
+    return report
+
+
+if __name__ == '__main__':
+    main()
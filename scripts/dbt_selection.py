@@ -0,0 +1,189 @@
+"""
+Selective dbt runs driven by the bronze tables the ingestion changed.
+
+Every ingested table that received rows is recorded in the state
+directory (see `scripts/ingest_state.py`) and flagged "changed" in its
+result record. `plan_dbt_selection` turns the changed tables into a dbt
+node selection, `source:bronze.RAW_X+` per table, so only the models
+built on them and their tests are rebuilt:
+
+- Changes of the dbt project itself (models, macros, seeds, snapshots,
+  tests, dbt_project.yml) are detected with a fingerprint of its files.
+  When the project changed since the last successful build, the modified
+  nodes are selected too (`state:modified+` against the saved manifest);
+  without a saved manifest the whole project is built.
+- When neither the data nor the project changed, the plan is None and the
+  DAG skips dbt altogether.
+
+`save_dbt_state` runs after a successful build: it saves the manifest
+and project fingerprint as the new comparison state and forgets the
+changed tables that were rebuilt. Tables changed by a run whose dbt build
+failed therefore stay selected until a build succeeds.
+
+Example:
+    python scripts/dbt_selection.py --changed raw_orders raw_customers
+"""
+import argparse
+import hashlib
+import json
+import logging
+import shutil
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+from config import INGEST_CONFIG
+from scripts.ingest_state import changed_tables, clear_changed_tables, record_changed_tables
+
+DBT_PROJECT_DIR = project_root / 'dbt_project' / 'olist_dbt_project'
+# dbt source that declares the bronze tables (models/staging/sources.yml)
+BRONZE_SOURCE = 'bronze'
+MANIFEST_FILE = 'manifest.json'
+FINGERPRINT_FILE = 'project_fingerprint.json'
+# Project files that define the dbt nodes; target/, logs/ and dbt_packages/ are not part of it
+PROJECT_PATHS = ('dbt_project.yml', 'models', 'macros', 'seeds', 'snapshots', 'tests', 'analyses')
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+
+def dbt_state_dir():
+    """
+    Return the directory of the saved dbt comparison state.
+    """
+    return Path(INGEST_CONFIG["state_dir"]) / 'dbt'
+
+
+def changed_in_results(results):
+    """
+    Return the tables flagged "changed" in ingestion result records (the
+    return values of `main_ingest` or of the per-table tasks).
+    """
+    tables = set()
+    for result in results or []:
+        # main_ingest returns a list of records, each mapped task a single one
+        for record in (result if isinstance(result, list) else [result]):
+            if record and record.get("changed"):
+                tables.add(record["table"])
+    return sorted(tables)
+
+
+def project_fingerprint(project_dir=DBT_PROJECT_DIR):
+    """
+    Return a SHA-256 over the paths and contents of the dbt project files.
+    """
+    project_dir = Path(project_dir)
+    digest = hashlib.sha256()
+    for name in PROJECT_PATHS:
+        path = project_dir / name
+        files = [path] if path.is_file() else sorted(p for p in path.rglob('*') if p.is_file())
+        for file in files:
+            digest.update(str(file.relative_to(project_dir)).encode('utf-8'))
+            digest.update(file.read_bytes())
+    return digest.hexdigest()
+
+
+def _saved_fingerprint():
+    path = dbt_state_dir() / FINGERPRINT_FILE
+    if not path.exists():
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)["fingerprint"]
+
+
+def source_selector(tables):
+    """
+    Return the dbt selectors of the models and tests downstream of bronze tables.
+    """
+    return [f"source:{BRONZE_SOURCE}.{table.upper()}+" for table in sorted(tables)]
+
+
+def plan_dbt_selection(results=None, project_dir=DBT_PROJECT_DIR):
+    """
+    Plan the dbt build after an ingestion run.
+
+    `results` are the ingestion result records; their changed tables are
+    added to the ones still waiting for a successful build. Returns None
+    when nothing needs to be rebuilt, otherwise a dict with the dbt
+    selection arguments ("args", e.g. `--select source:bronze.RAW_ORDERS+
+    state:modified+ --state <dir>`, empty to build everything), the
+    selected "tables", whether the project changed and the time of the
+    plan ("planned_at", used by `save_dbt_state`).
+    """
+    record_changed_tables(changed_in_results(results))
+    planned_at = datetime.now(timezone.utc).isoformat()
+    tables = changed_tables()
+    state_dir = dbt_state_dir()
+    has_manifest = (state_dir / MANIFEST_FILE).exists()
+    project_changed = project_fingerprint(project_dir) != _saved_fingerprint()
+
+    if project_changed and not has_manifest:
+        logging.info("No saved dbt manifest to compare with; building the whole project.")
+        args = ""
+    elif tables or project_changed:
+        selectors = source_selector(tables)
+        if project_changed:
+            selectors.append("state:modified+")
+        args = f"--select {' '.join(selectors)}"
+        if project_changed:
+            args += f" --state {state_dir}"
+    else:
+        logging.info("⏭ No bronze table and no dbt model changed; skipping dbt.")
+        return None
+
+    logging.info(
+        f"dbt selection: {args} (changed tables: {', '.join(tables) or 'none'}, "
+        f"project changed: {project_changed})"
+    )
+    return {"args": args, "tables": tables, "project_changed": project_changed, "planned_at": planned_at}
+
+
+def save_dbt_state(plan=None, project_dir=DBT_PROJECT_DIR):
+    """
+    Save the manifest and fingerprint of a successful dbt build as the
+    comparison state of the next one, and forget the changed tables of
+    `plan` (unless they changed again after it was made).
+    """
+    project_dir = Path(project_dir)
+    state_dir = dbt_state_dir()
+    state_dir.mkdir(parents=True, exist_ok=True)
+    manifest = project_dir / 'target' / MANIFEST_FILE
+    if not manifest.exists():
+        raise FileNotFoundError(f"dbt manifest not found at {manifest}; run dbt first")
+    shutil.copyfile(manifest, state_dir / MANIFEST_FILE)
+    with open(state_dir / FINGERPRINT_FILE, 'w', encoding='utf-8') as f:
+        json.dump({"fingerprint": project_fingerprint(project_dir), "saved_at": datetime.now(timezone.utc).isoformat()},
+                  f, indent=2)
+    if plan:
+        clear_changed_tables(plan["tables"], before=plan["planned_at"])
+    logging.info(f"✓ Saved the dbt state in {state_dir}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Print the dbt selection for the changed bronze tables.")
+    parser.add_argument('--changed', nargs='*', default=[],
+                        help="Bronze tables changed outside the recorded ingestion runs (e.g. raw_orders).")
+    parser.add_argument('--project-dir', default=str(DBT_PROJECT_DIR), help="dbt project directory.")
+    parser.add_argument('--save-state', action='store_true',
+                        help="Save the state of a successful dbt build instead of planning one.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.save_state:
+        # A build run by hand is taken to cover every table changed so far
+        plan = {"tables": changed_tables(), "planned_at": datetime.now(timezone.utc).isoformat()}
+        save_dbt_state(plan, args.project_dir)
+        return
+    plan = plan_dbt_selection([{"table": table, "changed": True} for table in args.changed], args.project_dir)
+    if plan:
+        print(plan["args"] or "(whole project)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""
+Local DuckDB warehouse: the bronze sink for running the pipeline offline.
+
+With WAREHOUSE=duckdb (WAREHOUSE_CONFIG in config.py) the ingestion writes
+the bronze tables into the DuckDB file DUCKDB_PATH, in the schema
+DUCKDB_SCHEMA (BRONZE_RAW_DATA), instead of Snowflake, and dbt builds the
+models on the same file through the `duckdb` target of profiles.yml. A
+DuckDB file's catalog is named after the file, so the default
+`project_db.duckdb` is the PROJECT_DB database of the dbt sources
+(DuckDB matches identifiers case-insensitively).
+
+`DuckDBLoader` takes the place of every Snowflake loader. A DataFrame is
+handed to DuckDB as an Arrow table, which DuckDB scans in place: numeric
+and Arrow-backed string columns are not copied on their way in, category
+columns arrive as their values and nanosecond timestamps are cast to
+microseconds (a plain TIMESTAMP, as in the Parquet files of the copy
+engine). A missing bronze table is created from the columns of the first
+batch. The load log, the resumable stage table of checkpointed loads,
+merges on a key, deletes (for change data capture) and the decoding of
+encoded key columns behave as in `scripts/bronze_loaders.py`.
+
+DuckDB lets one process write to a file at a time: load the tables of a
+run in one process (`main_ingest`, with any number of workers), not in
+concurrent Airflow tasks.
+
+    WAREHOUSE=duckdb python scripts/ingest_to_bronze.py
+    python scripts/duckdb_warehouse.py          # row counts of the bronze tables
+"""
+import argparse
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pyarrow as pa
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+from config import INGEST_CONFIG, WAREHOUSE_CONFIG
+from scripts.id_encoding import decode_ids
+
+# Name of the Arrow table registered on a connection while it is loaded
+BATCH_VIEW = 'bronze_batch'
+# Concurrent creations of the shared load log would conflict
+_catalog_lock = threading.Lock()
+
+
+def to_arrow(df):
+    """
+    Return a DataFrame as an Arrow table DuckDB can scan without copying,
+    with nanosecond timestamps cast to microseconds.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for index, field in enumerate(table.schema):
+        if pa.types.is_timestamp(field.type) and field.type.unit == 'ns':
+            table = table.set_column(index, field.name, table.column(index).cast(pa.timestamp('us', field.type.tz)))
+    return table
+
+
+def table_exists(conn, table_name):
+    return conn.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = current_schema() AND table_name = ?",
+        [table_name]
+    ).fetchone()[0] > 0
+
+
+def truncate_table(conn, table_name):
+    """
+    Remove every row of a bronze table, if it exists.
+    """
+    if table_exists(conn, table_name):
+        conn.execute(f'DELETE FROM "{table_name}"')
+
+
+def ensure_load_log(conn):
+    with _catalog_lock:
+        conn.execute(
+            f'CREATE TABLE IF NOT EXISTS "{INGEST_CONFIG["load_log_table"]}" '
+            f'("LOAD_ID" VARCHAR, "TABLE_NAME" VARCHAR, "ROWS" BIGINT, "LOADED_AT" TIMESTAMP DEFAULT current_timestamp)'
+        )
+
+
+def is_loaded(conn, load_id):
+    """
+    Return True if a load with this id has been committed.
+    """
+    ensure_load_log(conn)
+    return conn.execute(
+        f'SELECT COUNT(*) FROM "{INGEST_CONFIG["load_log_table"]}" WHERE "LOAD_ID" = ?', [load_id]
+    ).fetchone()[0] > 0
+
+
+class DuckDBLoader:
+    """
+    Load DataFrames into a bronze table of the DuckDB warehouse.
+
+    Every batch is inserted by column name in its own transaction. With a
+    `merge_key` the rows of the batch replace the rows with the same key
+    (incremental merges and change data capture). With a `load_id` the
+    batches go to a stage table (`<table>_load_stage`) that `close()`
+    moves into the table in the transaction that records the load id, so
+    a replayed load is detected with `is_committed()`.
+    """
+
+    def __init__(self, conn, table_name, merge_key=None, load_id=None):
+        self.conn = conn
+        self.table_name = table_name
+        self.merge_key = merge_key
+        self.load_id = load_id
+        self.stage_table = f"{table_name}_load_stage" if load_id and not merge_key else None
+        self.stats = {"engine": "duckdb", "table": table_name, "rows": 0, "batches": 0, "load_seconds": 0.0}
+
+    def _insert(self, batch, target):
+        self.conn.register(BATCH_VIEW, batch)
+        try:
+            self.conn.execute("BEGIN TRANSACTION")
+            try:
+                self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{target}" AS SELECT * FROM {BATCH_VIEW} LIMIT 0')
+                if self.merge_key:
+                    self.conn.execute(
+                        f'DELETE FROM "{target}" WHERE "{self.merge_key}" IN (SELECT "{self.merge_key}" FROM {BATCH_VIEW})'
+                    )
+                self.conn.execute(f'INSERT INTO "{target}" BY NAME SELECT * FROM {BATCH_VIEW}')
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        finally:
+            self.conn.unregister(BATCH_VIEW)
+
+    def serialize(self, df):
+        return to_arrow(decode_ids(df))
+
+    def upload(self, batch):
+        if batch.num_rows == 0:
+            return
+        started = time.perf_counter()
+        self._insert(batch, self.stage_table or self.table_name)
+        self.stats["load_seconds"] += time.perf_counter() - started
+        self.stats["rows"] += batch.num_rows
+        self.stats["batches"] += 1
+
+    def write(self, df):
+        self.upload(self.serialize(df))
+
+    def delete(self, keys):
+        """
+        Delete the rows whose key is in `keys` (a Series).
+        """
+        if keys.empty or not table_exists(self.conn, self.table_name):
+            return
+        started = time.perf_counter()
+        self.conn.register(BATCH_VIEW, pa.table({self.merge_key: pa.array(keys.astype(str).tolist())}))
+        try:
+            self.conn.execute(
+                f'DELETE FROM "{self.table_name}" WHERE "{self.merge_key}" IN (SELECT "{self.merge_key}" FROM {BATCH_VIEW})'
+            )
+        finally:
+            self.conn.unregister(BATCH_VIEW)
+        self.stats["load_seconds"] += time.perf_counter() - started
+        self.stats["deleted"] = self.stats.get("deleted", 0) + len(keys)
+
+    def is_committed(self):
+        return bool(self.stage_table) and is_loaded(self.conn, self.load_id)
+
+    def begin(self, resume_state=None):
+        """
+        Return the number of rows an interrupted attempt left in the stage
+        table that can be kept (merged rows are all kept, as merging them
+        again is harmless), starting over otherwise.
+        """
+        if not self.stage_table:
+            self.stats["rows"] = resume_state["rows"] if resume_state and self.merge_key else 0
+            return self.stats["rows"]
+        if resume_state and table_exists(self.conn, self.stage_table):
+            staged = self.conn.execute(f'SELECT COUNT(*) FROM "{self.stage_table}"').fetchone()[0]
+            if staged == resume_state["rows"]:
+                self.stats["rows"] = staged
+                return staged
+        self.conn.execute(f'DROP TABLE IF EXISTS "{self.stage_table}"')
+        return 0
+
+    def checkpoint_state(self):
+        return {"rows": self.stats["rows"]}
+
+    def close(self):
+        if not self.stage_table:
+            return self.stats
+        started = time.perf_counter()
+        ensure_load_log(self.conn)
+        has_rows = table_exists(self.conn, self.stage_table)
+        self.conn.execute("BEGIN TRANSACTION")
+        try:
+            if has_rows:
+                self.conn.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{self.table_name}" AS SELECT * FROM "{self.stage_table}" LIMIT 0'
+                )
+                self.conn.execute(f'INSERT INTO "{self.table_name}" BY NAME SELECT * FROM "{self.stage_table}"')
+            self.conn.execute(
+                f'INSERT INTO "{INGEST_CONFIG["load_log_table"]}" ("LOAD_ID", "TABLE_NAME", "ROWS") VALUES (?, ?, ?)',
+                [self.load_id, self.table_name, self.stats["rows"]]
+            )
+            self.conn.execute(f'DROP TABLE IF EXISTS "{self.stage_table}"')
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.stats["load_seconds"] += time.perf_counter() - started
+        return self.stats
+
+    def abort(self):
+        pass
+
+
+def table_counts(conn):
+    """
+    Return the row count of every table in the bronze schema.
+    """
+    tables = [row[0] for row in conn.execute(
+        "SELECT table_name FROM information_schema.tables WHERE table_schema = current_schema() ORDER BY table_name"
+    ).fetchall()]
+    return {table: conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in tables}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Show the bronze tables of the local DuckDB warehouse.")
+    parser.add_argument('--path', default=None, help="DuckDB file (default: DUCKDB_PATH).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from connections import connect_duckdb
+
+    args = parse_args(argv)
+    conn = connect_duckdb(args.path)
+    try:
+        logging.info(f"DuckDB warehouse {args.path or WAREHOUSE_CONFIG['duckdb_path']}, "
+                     f"schema {WAREHOUSE_CONFIG['duckdb_schema']}:")
+        for table, rows in table_counts(conn).items():
+            logging.info(f"  {table:45} {rows:>12,} rows")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,320 @@
+"""
+Pluggable DataFrame engines for reading the raw files and computing the
+business metrics of the data-quality report.
+
+Both engines have the same interface:
+
+- `read(path, table)` reads a whole CSV file with the table's declared
+  schema into the engine's own frame type.
+- `to_pandas(frame, table)` converts such a frame to a pandas DataFrame
+  with the declared dtypes (what the profiler and the loaders consume).
+- `summary_metrics(frames)` computes the business metrics from the
+  raw_products, raw_order_items and raw_orders frames: revenue, the
+  order item -> product category join, items and revenue per category,
+  delivery times, orders per month and per status. The result is made of
+  plain numbers, numpy arrays and pandas Series, whatever the engine.
+
+`pandas` (the default) runs these as single-threaded pandas operations;
+with INGEST_CSV_WORKERS > 1, and for compressed files, it parses through
+the parallel reader of `scripts/parallel_csv.py`. When product_id is
+encoded as codes of one dictionary in both tables (`scripts/id_encoding.py`),
+the order item -> product join is a lookup in an array indexed by code.
+`polars` parses the files with Polars' multithreaded CSV reader and runs
+the metrics as lazy queries, optimized (projection and predicate
+pushdown) and executed together on all cores with `collect_all`. Polars
+is optional and only imported when its engine is selected
+(INGEST_FRAME_ENGINE, or `--engine` of the report and the ingestion).
+
+Both engines give the same results, up to the summation order of
+floating-point sums; to check on a data set:
+
+    python scripts/frame_engines.py --data-dir data/raw_data
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+from config import INGEST_CONFIG
+from scripts.bronze_schemas import (
+    COMPRESSION_SUFFIXES, CSV_FILE_NAMES, csv_file_path, get_schema, read_csv_typed, validate_columns,
+)
+from scripts.id_encoding import is_encoded
+
+FRAME_ENGINES = ('pandas', 'polars')
+# Tables summary_metrics needs
+METRIC_TABLES = ("raw_products", "raw_order_items", "raw_orders")
+# Relative tolerance of floating-point sums when comparing engines
+SUM_RTOL = 1e-9
+
+
+def _sorted_counts(series, dtype):
+    """
+    Return per-key totals sorted by key, without empty keys.
+    """
+    return series[series.index.notna()].astype(dtype).sort_index()
+
+
+class PandasEngine:
+    """
+    The pandas implementation: the reference path.
+    """
+
+    name = 'pandas'
+
+    def __init__(self, csv_workers=None):
+        self.csv_workers = INGEST_CONFIG["csv_workers"] if csv_workers is None else csv_workers
+
+    def read(self, path, table):
+        if self.csv_workers > 1 or Path(path).suffix in COMPRESSION_SUFFIXES:
+            # pyarrow is only needed for the parallel reader
+            from scripts.parallel_csv import read_csv_parallel
+            return read_csv_parallel(path, table, workers=self.csv_workers)
+        return read_csv_typed(path, table)
+
+    def to_pandas(self, frame, table):
+        return frame
+
+    def summary_metrics(self, frames):
+        products = frames["raw_products"].drop_duplicates("product_id")
+        items, orders = frames["raw_order_items"], frames["raw_orders"]
+
+        total_value = items["price"] + items["freight_value"]
+        if is_encoded(products["product_id"]) and is_encoded(items["product_id"]):
+            product_codes, item_codes = products["product_id"].to_numpy(), items["product_id"].to_numpy()
+            # Category of every code; the last slot, where null codes (-1) land, is the null product's
+            size = max(product_codes.max(initial=-1), item_codes.max(initial=-1)) + 2
+            lookup = np.full(size, np.nan, dtype=object)
+            lookup[product_codes] = products["product_category_name"].astype(object).to_numpy()
+            category = lookup[item_codes]
+        else:
+            category = items[["product_id"]].merge(
+                products[["product_id", "product_category_name"]], on="product_id", how="left"
+            )["product_category_name"].astype(object).to_numpy()
+
+        delivery_days = (orders["order_delivered_customer_date"] - orders["order_purchase_timestamp"]).dt.days
+        months = orders["order_purchase_timestamp"].dt.to_period('M').astype(str)
+        months = months[orders["order_purchase_timestamp"].notna()]
+        return {
+            "total_value": float(total_value.sum()),
+            "valued_items": int(total_value.count()),
+            "category_items": _sorted_counts(pd.Series(category).value_counts(), 'int64'),
+            "category_revenue": _sorted_counts(total_value.groupby(category).sum(), 'float64'),
+            "delivery_days": np.sort(delivery_days[delivery_days > 0].to_numpy('float64')),
+            "orders_by_month": _sorted_counts(months.value_counts(), 'int64'),
+            "order_status": _sorted_counts(
+                orders["order_status"].astype(object).value_counts(), 'int64'
+            ),
+        }
+
+
+class PolarsEngine:
+    """
+    The Polars implementation: multithreaded CSV parsing and lazy,
+    optimized queries.
+    """
+
+    name = 'polars'
+
+    def __init__(self):
+        try:
+            import polars as pl
+        except ImportError as e:
+            raise ImportError("The polars frame engine requires polars (pip install polars)") from e
+        self.pl = pl
+
+    def _polars_type(self, dtype):
+        pl = self.pl
+        return {
+            "int8": pl.Int8, "int16": pl.Int16, "int32": pl.Int32, "int64": pl.Int64, "float64": pl.Float64,
+        }.get(dtype.lower(), pl.String)
+
+    def _read_type(self, dtype):
+        # Nullable integers ("Int16") are written as floats ("25.0") by the
+        # public dataset; parse them as floats and cast, as pandas does
+        return self.pl.Float64 if dtype.startswith('Int') else self._polars_type(dtype)
+
+    def _parse_timestamp(self, column):
+        # Timestamps are written with seconds, some columns as bare dates
+        pl = self.pl
+        return pl.coalesce(
+            column.str.to_datetime('%Y-%m-%d %H:%M:%S', time_unit='ns', strict=False),
+            column.str.to_date('%Y-%m-%d', strict=False).cast(pl.Datetime('ns')),
+        )
+
+    def read(self, path, table):
+        pl = self.pl
+        schema = get_schema(table)
+        if schema is None:
+            return pl.read_csv(path, infer_schema_length=0)
+        validate_columns(table, pl.read_csv(path, n_rows=0).columns)
+        columns = schema["columns"]
+        frame = pl.read_csv(
+            path,
+            columns=list(columns),
+            schema_overrides={column: self._read_type(dtype) for column, dtype in columns.items()},
+        )
+        return frame.with_columns(
+            [
+                self._parse_timestamp(pl.col(column)).alias(column)
+                for column in schema["parse_dates"]
+            ] + [
+                pl.col(column).cast(self._polars_type(dtype))
+                for column, dtype in columns.items() if dtype.startswith('Int')
+            ]
+        ).select(list(columns))
+
+    def to_pandas(self, frame, table):
+        df = frame.to_pandas()
+        schema = get_schema(table)
+        return df.astype(schema["columns"]) if schema else df
+
+    def _counts(self, frame, key, value, dtype):
+        return _sorted_counts(pd.Series(frame[value].to_list(), index=frame[key].to_list()), dtype)
+
+    def summary_metrics(self, frames):
+        pl = self.pl
+        products = (
+            frames["raw_products"].lazy()
+            .unique(subset="product_id", keep="first", maintain_order=True)
+            .select("product_id", "product_category_name")
+        )
+        items = (
+            frames["raw_order_items"].lazy()
+            .select("product_id", (pl.col("price") + pl.col("freight_value")).alias("total_value"))
+            .join(products, on="product_id", how="left")
+        )
+        orders = frames["raw_orders"].lazy()
+        purchase = pl.col("order_purchase_timestamp")
+
+        totals, categories, delivery, months, statuses = pl.collect_all([
+            items.select(
+                pl.col("total_value").sum().alias("total_value"),
+                pl.col("total_value").count().alias("valued_items"),
+            ),
+            items.filter(pl.col("product_category_name").is_not_null())
+            .group_by("product_category_name")
+            .agg(pl.len().alias("items"), pl.col("total_value").sum().alias("revenue")),
+            orders.select(
+                (pl.col("order_delivered_customer_date") - purchase).dt.total_days().alias("days")
+            ).filter(pl.col("days") > 0),
+            orders.filter(purchase.is_not_null())
+            .group_by(purchase.dt.strftime('%Y-%m').alias("month")).agg(pl.len().alias("orders")),
+            orders.filter(pl.col("order_status").is_not_null())
+            .group_by("order_status").agg(pl.len().alias("orders")),
+        ])
+        return {
+            "total_value": float(totals["total_value"][0] or 0.0),
+            "valued_items": int(totals["valued_items"][0]),
+            "category_items": self._counts(categories, "product_category_name", "items", 'int64'),
+            "category_revenue": self._counts(categories, "product_category_name", "revenue", 'float64'),
+            "delivery_days": np.sort(delivery["days"].to_numpy().astype('float64')),
+            "orders_by_month": self._counts(months, "month", "orders", 'int64'),
+            "order_status": self._counts(statuses, "order_status", "orders", 'int64'),
+        }
+
+
+def get_engine(name=None, csv_workers=None):
+    """
+    Return the frame engine called `name` (default: INGEST_CONFIG["frame_engine"]).
+    `csv_workers` sets the parser processes of the pandas engine (default:
+    INGEST_CONFIG["csv_workers"]).
+    """
+    name = name or INGEST_CONFIG["frame_engine"]
+    if name == 'pandas':
+        return PandasEngine(csv_workers)
+    if name == 'polars':
+        return PolarsEngine()
+    raise ValueError(f"Unknown frame engine '{name}', expected one of {FRAME_ENGINES}")
+
+
+def compare_metrics(expected, actual, rtol=SUM_RTOL):
+    """
+    Return the names of the metrics that differ between two engines.
+    Sums are compared with a relative tolerance, everything else exactly.
+    """
+    differences = []
+    for name, value in expected.items():
+        other = actual[name]
+        if isinstance(value, pd.Series):
+            same = value.index.equals(other.index) and (
+                np.allclose(value.to_numpy(), other.to_numpy(), rtol=rtol, atol=0)
+                if value.dtype.kind == 'f' else value.equals(other)
+            )
+        elif isinstance(value, np.ndarray):
+            same = np.array_equal(value, other)
+        elif isinstance(value, float):
+            same = np.isclose(value, other, rtol=rtol, atol=0)
+        else:
+            same = value == other
+        if not same:
+            differences.append(name)
+    return differences
+
+
+def compare_frames(expected, actual):
+    """
+    Return the columns whose dtype or values differ between two pandas frames.
+    """
+    if list(expected.columns) != list(actual.columns) or len(expected) != len(actual):
+        return ["<shape>"]
+    return [
+        column for column in expected.columns
+        if expected[column].dtype != actual[column].dtype or not expected[column].equals(actual[column])
+    ]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Check that the frame engines give identical results.")
+    parser.add_argument('--data-dir', default=str(project_root / 'data' / 'raw_data'),
+                        help="Directory with the raw CSV files.")
+    parser.add_argument('--engine', choices=FRAME_ENGINES, default='polars',
+                        help="Engine compared with the pandas reference.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    data_dir = Path(args.data_dir)
+    reference, engine = PandasEngine(), get_engine(args.engine)
+    frames = {reference.name: {}, engine.name: {}}
+    failures = []
+    for table in CSV_FILE_NAMES:
+        path = csv_file_path(data_dir, table)
+        if not path.exists():
+            continue
+        for current in (reference, engine):
+            started = time.perf_counter()
+            frames[current.name][table] = current.read(path, table)
+            logging.info(f"{current.name:7} read {table} in {time.perf_counter() - started:.2f}s")
+        differences = compare_frames(
+            frames[reference.name][table], engine.to_pandas(frames[engine.name][table], table)
+        )
+        if differences:
+            failures.append(f"{table}: {', '.join(differences)}")
+
+    if all(table in frames[reference.name] for table in METRIC_TABLES):
+        metrics = {}
+        for current in (reference, engine):
+            started = time.perf_counter()
+            metrics[current.name] = current.summary_metrics(frames[current.name])
+            logging.info(f"{current.name:7} computed the summary metrics in {time.perf_counter() - started:.2f}s")
+        differences = compare_metrics(metrics[reference.name], metrics[engine.name])
+        if differences:
+            failures.append(f"summary metrics: {', '.join(differences)}")
+
+    if failures:
+        logging.error(f"❌ {engine.name} differs from pandas: {'; '.join(failures)}")
+        sys.exit(1)
+    logging.info(f"✅ {engine.name} gives the same frames and summary metrics as pandas")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,364 @@
+"""
+Compact in-memory encoding of the Olist keys.
+
+Every key of the dataset (`order_id`, `customer_id`, `customer_unique_id`,
+`product_id`, `seller_id`) is a 32-character hex string, about 40 bytes
+per row as an Arrow-backed string, and hashing them dominates the
+distinct counts, joins and group-bys on these columns. An `IdDictionary`
+replaces them with int32 surrogate codes (4 bytes per row):
+
+- the hex digits are parsed in bulk into their 16-byte value, without a
+  Python string per row, and looked up on its first 8 bytes (checked
+  against the other 8) in one dictionary per key column, shared by every
+  table, so `raw_order_items.product_id` and `raw_products.product_id`
+  get the same codes and join on them;
+- codes are assigned in first-seen order and never change, so frames
+  encoded at different times stay comparable; a missing key is
+  NULL_CODE (-1);
+- keys that are not 32 lowercase hex digits (or share their first 8 bytes
+  with another key) are kept in a plain string dictionary of the same
+  column, so every value gets a code.
+
+Codes only exist in the process that assigned them: frames are decoded
+back to strings at every boundary they leave it through (the bronze
+loaders, the KPI store, checkpoints, reports). City, state and category
+columns are already categoricals in the declared schemas
+(`scripts/bronze_schemas.py`).
+
+The ingestion encodes the batches it loads with INGEST_ENCODE_IDS
+(`--encode-ids`), through the process-wide `shared_dictionary()`, and the
+data-quality report encodes the tables it profiles. To compare memory
+and the order item -> product join on a data set:
+
+    python scripts/id_encoding.py --data-dir data/raw_data
+"""
+import argparse
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # Without pyarrow frames are left as they are
+    pa = pc = None
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+# Key columns encoded into codes; every column has its own dictionary, shared across tables
+ENCODED_COLUMNS = ("order_id", "customer_id", "customer_unique_id", "product_id", "seller_id")
+CODE_DTYPE = np.dtype('int32')
+NULL_CODE = -1
+KEY_LENGTH = 32
+_HEX_DIGITS = np.frombuffer(b'0123456789abcdef', dtype='uint8')
+# Value of every character as a hex digit, 255 for the other characters
+_NIBBLES = np.full(256, 255, dtype='uint8')
+_NIBBLES[_HEX_DIGITS] = np.arange(16, dtype='uint8')
+# Entries the arrays of a dictionary start with
+_INITIAL_CAPACITY = 1024
+
+
+def is_encoded(series):
+    """
+    Return True if a key column holds codes rather than strings.
+    """
+    return series.name in ENCODED_COLUMNS and pd.api.types.is_integer_dtype(series.dtype)
+
+
+def _to_arrow(values):
+    array = pa.array(values, from_pandas=True)
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks() if array.num_chunks else pa.array([], type=array.type)
+    if not (pa.types.is_string(array.type) or pa.types.is_large_string(array.type)):
+        array = array.cast(pa.string())
+    return array
+
+
+def _hex_rows(array):
+    """
+    Return the characters of a string array without nulls and of 32
+    characters per value as a (rows, 32) uint8 matrix.
+    """
+    offset_type = 'int64' if pa.types.is_large_string(array.type) else 'int32'
+    offsets = np.frombuffer(array.buffers()[1], dtype=offset_type)[array.offset:array.offset + len(array) + 1]
+    data = np.frombuffer(array.buffers()[2], dtype='uint8') if len(array) else np.empty(0, dtype='uint8')
+    return data[offsets[0]:offsets[-1]].reshape(-1, KEY_LENGTH)
+
+
+def parse_keys(values):
+    """
+    Parse the 32-character lowercase hex keys of a Series into their
+    128-bit values. Returns the (high, low) uint64 halves of every value
+    and a boolean mask of the values that are such keys (nulls and other
+    strings are False).
+    """
+    array = _to_arrow(values)
+    rows = len(array)
+    high = np.zeros(rows, dtype='uint64')
+    low = np.zeros(rows, dtype='uint64')
+    is_key = pc.fill_null(pc.equal(pc.binary_length(array), KEY_LENGTH), False).to_numpy(zero_copy_only=False)
+    if not is_key.any():
+        return high, low, is_key
+    keys = array if is_key.all() else array.filter(pa.array(is_key))
+    chars = _hex_rows(keys)
+    try:
+        # Usually every key is lowercase hex, and bytes.fromhex() the fastest parser,
+        # which also takes uppercase digits and skips whitespace
+        if ((chars < ord('0')) | ((chars - ord('A')) < 6)).any():
+            raise ValueError("Not lowercase hex")
+        halves = np.frombuffer(bytes.fromhex(chars.tobytes().decode('ascii')), dtype='>u8').reshape(-1, 2)
+        valid = np.ones(len(halves), dtype=bool)
+    except ValueError:
+        nibbles = _NIBBLES[chars]
+        valid = nibbles.max(axis=1) < 16
+        halves = ((nibbles[:, 0::2] << 4) | nibbles[:, 1::2]).view('>u8')
+    halves = halves.astype('uint64')
+    positions = np.flatnonzero(is_key)
+    high[positions], low[positions] = halves[:, 0], halves[:, 1]
+    is_key[positions[~valid]] = False
+    return high, low, is_key
+
+
+def format_keys(high, low):
+    """
+    Return 128-bit values as an Arrow array of 32-character hex strings.
+    """
+    halves = np.empty((len(high), 2), dtype='>u8')
+    halves[:, 0], halves[:, 1] = high, low
+    octets = halves.view('uint8').reshape(-1, 16)
+    chars = np.empty((len(high), KEY_LENGTH), dtype='uint8')
+    chars[:, 0::2], chars[:, 1::2] = _HEX_DIGITS[octets >> 4], _HEX_DIGITS[octets & 15]
+    offsets = np.arange(0, (len(high) + 1) * KEY_LENGTH, KEY_LENGTH, dtype='int32')
+    return pa.StringArray.from_buffers(len(high), pa.py_buffer(offsets), pa.py_buffer(chars.tobytes()))
+
+
+class _ColumnDictionary:
+    """
+    The codes of one key column: the 128-bit value of every hex key
+    (looked up on its high half) and a string dictionary for the rest.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.high = np.zeros(_INITIAL_CAPACITY, dtype='uint64')
+        self.low = np.zeros(_INITIAL_CAPACITY, dtype='uint64')
+        # Codes of keys kept as strings, and their values
+        self.text_codes = {}
+        self.texts = {}
+        self._index = None
+
+    def _reserve(self, count):
+        if self.size + count > np.iinfo(CODE_DTYPE).max:
+            raise OverflowError(f"More than {np.iinfo(CODE_DTYPE).max:,} distinct keys in one column")
+        if self.size + count > len(self.high):
+            capacity = max(2 * len(self.high), self.size + count)
+            self.high = np.concatenate([self.high[:self.size], np.zeros(capacity - self.size, dtype='uint64')])
+            self.low = np.concatenate([self.low[:self.size], np.zeros(capacity - self.size, dtype='uint64')])
+        codes = np.arange(self.size, self.size + count, dtype=CODE_DTYPE)
+        self.size += count
+        return codes
+
+    def _hex_index(self):
+        # High halves of the hex keys -> code; rebuilt after the dictionary grows
+        if self._index is None:
+            is_hex = np.ones(self.size, dtype=bool)
+            is_hex[list(self.texts)] = False
+            codes = np.flatnonzero(is_hex)
+            self._index = pd.Series(codes.astype(CODE_DTYPE), index=pd.Index(self.high[codes]))
+        return self._index
+
+    def encode_keys(self, high, low):
+        """
+        Return the codes of hex keys, adding the new ones, and a mask of
+        the keys whose high half belongs to another key (left out).
+        """
+        batch_codes, uniques = pd.factorize(high)
+        index = self._hex_index()
+        positions = index.index.get_indexer(uniques)
+        new = positions < 0
+        codes = np.empty(len(uniques), dtype=CODE_DTYPE)
+        codes[~new] = index.to_numpy()[positions[~new]]
+        if new.any():
+            # A new high half is added with the low half of its first key
+            first_low = np.zeros(len(uniques), dtype='uint64')
+            first_low[batch_codes[::-1]] = low[::-1]
+            added = self._reserve(int(new.sum()))
+            self.high[added], self.low[added] = uniques[new], first_low[new]
+            codes[new] = added
+            self._index = None
+        key_codes = codes[batch_codes]
+        return key_codes, self.low[key_codes] != low
+
+    def encode_texts(self, texts):
+        codes = np.empty(len(texts), dtype=CODE_DTYPE)
+        for position, text in enumerate(texts):
+            code = self.text_codes.get(text)
+            if code is None:
+                code = int(self._reserve(1)[0])
+                self.text_codes[text] = code
+                self.texts[code] = text
+                self._index = None
+            codes[position] = code
+        return codes
+
+
+class IdDictionary:
+    """
+    Shared, append-only dictionaries of the key columns (see the module
+    docstring). Thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._columns = {column: _ColumnDictionary() for column in ENCODED_COLUMNS}
+
+    def encode(self, series):
+        """
+        Return the codes of a key column as an int32 Series.
+        """
+        column = self._columns[series.name]
+        high, low, is_key = parse_keys(series)
+        codes = np.full(len(series), NULL_CODE, dtype=CODE_DTYPE)
+        with self._lock:
+            key_positions = np.flatnonzero(is_key)
+            key_codes, collides = column.encode_keys(high[key_positions], low[key_positions])
+            codes[key_positions] = key_codes
+            is_key[key_positions[collides]] = False
+            others = np.flatnonzero(~is_key & series.notna().to_numpy())
+            if len(others):
+                codes[others] = column.encode_texts(series.iloc[others].astype(str).tolist())
+        return pd.Series(codes, index=series.index, name=series.name)
+
+    def decode(self, series):
+        """
+        Return the strings of an encoded key column, as an Arrow-backed
+        string Series.
+        """
+        column = self._columns[series.name]
+        codes = series.to_numpy(CODE_DTYPE)
+        with self._lock:
+            high, low, texts = column.high, column.low, dict(column.texts)
+        is_null = codes < 0
+        valid = np.where(is_null, 0, codes)
+        array = format_keys(high[valid], low[valid])
+        replace = is_null.copy()
+        if texts:
+            is_text = np.isin(valid, np.fromiter(texts, dtype=CODE_DTYPE, count=len(texts))) & ~is_null
+            replace |= is_text
+        if replace.any():
+            values = [texts.get(int(code)) for code in codes[replace]]
+            array = pc.replace_with_mask(array, pa.array(replace), pa.array(values, type=pa.string()))
+        return pd.Series(pd.arrays.ArrowStringArray(array), index=series.index, name=series.name)
+
+    def encode_frame(self, df):
+        """
+        Return a DataFrame with its key columns encoded (a shallow copy;
+        columns that are already encoded are kept).
+        """
+        columns = [c for c in df.columns if c in self._columns and not is_encoded(df[c])]
+        if pa is None or not columns:
+            return df
+        df = df.copy(deep=False)
+        for column in columns:
+            df[column] = self.encode(df[column])
+        return df
+
+    def decode_frame(self, df):
+        """
+        Return a DataFrame with its encoded key columns decoded (a shallow
+        copy; the DataFrame itself when nothing is encoded).
+        """
+        columns = [c for c in df.columns if c in self._columns and is_encoded(df[c])]
+        if not columns:
+            return df
+        df = df.copy(deep=False)
+        for column in columns:
+            df[column] = self.decode(df[column])
+        return df
+
+    def sizes(self):
+        """
+        Return the number of distinct keys of every column.
+        """
+        with self._lock:
+            return {name: column.size for name, column in self._columns.items()}
+
+    def reset(self):
+        """
+        Forget every code; frames encoded so far can no longer be decoded.
+        """
+        with self._lock:
+            self._columns = {column: _ColumnDictionary() for column in ENCODED_COLUMNS}
+
+
+_shared = IdDictionary()
+
+
+def shared_dictionary():
+    """
+    Return the process-wide dictionary the ingestion encodes with.
+    """
+    return _shared
+
+
+def encode_ids(df):
+    """
+    Encode the key columns of a DataFrame with the shared dictionary.
+    """
+    return _shared.encode_frame(df)
+
+
+def decode_ids(df):
+    """
+    Decode the key columns a DataFrame has encoded with the shared
+    dictionary; a DataFrame without encoded columns is returned as is.
+    """
+    return _shared.decode_frame(df)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the Olist tables with and without encoded keys.")
+    parser.add_argument('--data-dir', default=str(project_root / 'data' / 'raw_data'),
+                        help="Directory of the raw CSV files.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from scripts.bronze_schemas import csv_file_path, read_csv_typed
+
+    args = parse_args(argv)
+    ids = IdDictionary()
+    frames = {}
+    for table in ("raw_products", "raw_order_items", "raw_orders", "raw_customers", "raw_sellers"):
+        df = read_csv_typed(csv_file_path(args.data_dir, table), table)
+        started = time.perf_counter()
+        encoded = ids.encode_frame(df)
+        seconds = time.perf_counter() - started
+        plain_bytes, encoded_bytes = df.memory_usage(deep=True).sum(), encoded.memory_usage(deep=True).sum()
+        logging.info(
+            f"{table:20} {len(df):>10,} rows: {plain_bytes / max(len(df), 1):6.1f} -> "
+            f"{encoded_bytes / max(len(df), 1):5.1f} bytes/row, encoded in {seconds:.2f}s"
+        )
+        frames[table] = (df, encoded)
+
+    (products, encoded_products), (items, encoded_items) = frames["raw_products"], frames["raw_order_items"]
+    started = time.perf_counter()
+    items[["product_id"]].merge(products[["product_id", "product_category_name"]], on="product_id", how="left")
+    merge_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    lookup = pd.Series(encoded_products["product_category_name"].to_numpy(), index=encoded_products["product_id"])
+    lookup.reindex(encoded_items["product_id"].to_numpy())
+    code_seconds = time.perf_counter() - started
+    logging.info(f"order items x products: {merge_seconds:.3f}s on strings, {code_seconds:.3f}s on codes")
+    logging.info(f"Distinct keys: {ids.sizes()}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,292 @@
+"""
+Per-stage metrics of an ingestion run.
+
+Every table is ingested inside `track_table()`, which makes a TableMetrics
+record current for the calling thread. Code on the ingestion path wraps
+its work in `stage(name)` for one of STAGES (or `timed_iter()` for batches
+pulled from a reader) and reports the batches it moved with
+`record_batch()`. Outside `track_table()` these helpers do
+nothing, so the same functions can be reused by the benchmark or by hand.
+In a pipelined load (see `scripts/ingest_pipeline.py`) the stages run in
+threads that share the table's record, and their times overlap.
+
+At the end of a run the per-table records and a run summary are emitted as
+one-line JSON log records on the `olist.ingest.metrics` logger and can be
+written to a metrics file, either as JSON or as StatsD line protocol.
+"""
+import contextvars
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows has no resource module
+    resource = None
+
+STAGES = ('connect', 'checksum', 'extract', 'transform', 'cache', 'load')
+METRICS_FORMATS = ('json', 'statsd')
+STATSD_PREFIX = 'olist.ingest'
+
+metrics_logger = logging.getLogger('olist.ingest.metrics')
+
+_current = contextvars.ContextVar('ingest_table_metrics', default=None)
+_DONE = object()
+
+
+def peak_rss_mb():
+    """
+    Return the peak resident set size of the current process in MB,
+    or None when the platform does not expose it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+class TableMetrics:
+    """
+    Timings and volumes collected while one table is ingested.
+    """
+
+    def __init__(self, table, source, kind):
+        self.table = table
+        self.source = source
+        self.kind = kind
+        self.stage_seconds = {stage: 0.0 for stage in STAGES}
+        self.rows = 0
+        self.batches = 0
+        self.dataframe_bytes = 0
+        self.source_bytes = None
+        self.staged_bytes = None
+        # Rows in/out and dropped per step of the pre-load transformations
+        self.transform = None
+        # Stage busy times and queue statistics of a pipelined load
+        self.pipeline = None
+        self.seconds = 0.0
+        self.peak_rss_mb = None
+        # The stages of a pipelined load are timed from several threads
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage, seconds):
+        with self._lock:
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+    def as_dict(self):
+        return {
+            "table": self.table,
+            "source": self.source,
+            "kind": self.kind,
+            "rows": self.rows,
+            "batches": self.batches,
+            "source_bytes": self.source_bytes,
+            "dataframe_bytes": self.dataframe_bytes,
+            "staged_bytes": self.staged_bytes,
+            "transform": self.transform,
+            "pipeline": self.pipeline,
+            "seconds": round(self.seconds, 4),
+            "stage_seconds": {stage: round(seconds, 4) for stage, seconds in self.stage_seconds.items()},
+            "rows_per_sec": round(self.rows / self.seconds, 1) if self.seconds > 0 else None,
+            "peak_rss_mb": round(self.peak_rss_mb, 1) if self.peak_rss_mb is not None else None,
+        }
+
+
+@contextmanager
+def track_table(table, source, kind):
+    """
+    Collect the metrics of one table for the duration of the block and
+    yield its TableMetrics record.
+    """
+    metrics = TableMetrics(table, source, kind)
+    token = _current.set(metrics)
+    started = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics.seconds = time.perf_counter() - started
+        metrics.peak_rss_mb = peak_rss_mb()
+        _current.reset(token)
+
+
+def current_table():
+    """
+    Return the TableMetrics record of the table being ingested, or None.
+    """
+    return _current.get()
+
+
+@contextmanager
+def stage(name):
+    """
+    Add the time spent in the block to stage `name` of the current table.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.add_stage(name, time.perf_counter() - started)
+
+
+def timed_iter(iterable, name):
+    """
+    Iterate over `iterable`, timing each step as stage `name`. Only the
+    time spent producing an item is counted, not the consumer's work.
+    """
+    iterator = iter(iterable)
+    while True:
+        with stage(name):
+            item = next(iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item
+
+
+def record_batch(df):
+    """
+    Count a DataFrame moved for the current table.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return
+    metrics.rows += len(df)
+    metrics.batches += 1
+    metrics.dataframe_bytes += int(df.memory_usage(deep=True).sum())
+
+
+def record(**values):
+    """
+    Set attributes (e.g. source_bytes, staged_bytes) of the current table.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return
+    for key, value in values.items():
+        setattr(metrics, key, value)
+
+
+def summarize_run(results, wall_seconds, options):
+    """
+    Build the run summary from the result records returned by main_ingest.
+    """
+    tables = [result["metrics"] for result in results if result.get("metrics")]
+    stage_totals = {stage: 0.0 for stage in STAGES}
+    for table in tables:
+        for stage_name, seconds in table["stage_seconds"].items():
+            stage_totals[stage_name] = stage_totals.get(stage_name, 0.0) + seconds
+    rows = sum(result["rows"] for result in results)
+    peak = peak_rss_mb()
+    return {
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "wall_seconds": round(wall_seconds, 3),
+        "tables": len(results),
+        "loaded": sum(not result["skipped"] and not result["error"] for result in results),
+        "skipped": sum(bool(result["skipped"]) for result in results),
+        "failed": sum(bool(result["error"]) for result in results),
+        "rows": rows,
+        "source_bytes": sum(table["source_bytes"] or 0 for table in tables),
+        "dataframe_bytes": sum(table["dataframe_bytes"] for table in tables),
+        "rows_dropped": sum((table.get("transform") or {}).get("rows_dropped", 0) for table in tables),
+        "rows_per_sec": round(rows / wall_seconds, 1) if wall_seconds > 0 else None,
+        "stage_seconds": {stage_name: round(seconds, 4) for stage_name, seconds in stage_totals.items()},
+        "peak_rss_mb": round(peak, 1) if peak is not None else None,
+        "options": {
+            key: options[key]
+            for key in (
+                "streaming", "batch_size", "max_workers", "incremental", "cdc", "load_engine", "cache",
+                "transforms", "kpi_store", "encode_ids", "pipeline", "warehouse",
+            )
+        },
+    }
+
+
+def _configure_metrics_logger():
+    """
+    Give the metrics logger its own bare handler so every record is one
+    line of JSON, without the timestamp/level prefix of the main log.
+    """
+    if metrics_logger.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    metrics_logger.addHandler(handler)
+    metrics_logger.setLevel(logging.INFO)
+    metrics_logger.propagate = False
+
+
+def log_metrics(run, tables):
+    """
+    Emit one JSON log record per table and one for the run.
+    """
+    _configure_metrics_logger()
+    for table in tables:
+        metrics_logger.info(json.dumps({"event": "ingest.table", **table}, default=str))
+    metrics_logger.info(json.dumps({"event": "ingest.run", **run}, default=str))
+
+
+def _statsd_tag(value):
+    return str(value).replace(',', '_').replace('|', '_').replace(':', '_')
+
+
+def to_statsd_lines(run, tables, prefix=STATSD_PREFIX):
+    """
+    Render the metrics as StatsD line protocol with DogStatsD-style tags,
+    e.g. `olist.ingest.stage.extract:1523.4|ms|#table:raw_orders`.
+    """
+    lines = []
+    for table in tables:
+        tags = f"|#table:{_statsd_tag(table['table'])},kind:{_statsd_tag(table['kind'])}"
+        lines.append(f"{prefix}.rows:{table['rows']}|c{tags}")
+        lines.append(f"{prefix}.dataframe_bytes:{table['dataframe_bytes']}|c{tags}")
+        if table["source_bytes"] is not None:
+            lines.append(f"{prefix}.source_bytes:{table['source_bytes']}|c{tags}")
+        if table.get("transform"):
+            lines.append(f"{prefix}.rows_dropped:{table['transform']['rows_dropped']}|c{tags}")
+        lines.append(f"{prefix}.table_duration:{table['seconds'] * 1000:.1f}|ms{tags}")
+        for stage_name, seconds in table["stage_seconds"].items():
+            lines.append(f"{prefix}.stage.{stage_name}:{seconds * 1000:.1f}|ms{tags}")
+        if table.get("pipeline"):
+            for name, queue in table["pipeline"]["queues"].items():
+                queue_tags = f"{tags},queue:{name}"
+                lines.append(f"{prefix}.pipeline.max_depth:{queue['max_depth']}|g{queue_tags}")
+                lines.append(f"{prefix}.pipeline.put_wait:{queue['put_wait_seconds'] * 1000:.1f}|ms{queue_tags}")
+                lines.append(f"{prefix}.pipeline.get_wait:{queue['get_wait_seconds'] * 1000:.1f}|ms{queue_tags}")
+    lines.append(f"{prefix}.run_duration:{run['wall_seconds'] * 1000:.1f}|ms")
+    lines.append(f"{prefix}.rows_total:{run['rows']}|g")
+    lines.append(f"{prefix}.rows_dropped_total:{run.get('rows_dropped', 0)}|g")
+    lines.append(f"{prefix}.tables_failed:{run['failed']}|g")
+    lines.append(f"{prefix}.tables_skipped:{run['skipped']}|g")
+    if run["peak_rss_mb"] is not None:
+        lines.append(f"{prefix}.peak_rss_mb:{run['peak_rss_mb']}|g")
+    snowflake = (run.get("connections") or {}).get("snowflake")
+    if snowflake:
+        for name in ("opened", "reused", "waits"):
+            lines.append(f"{prefix}.snowflake_connections.{name}:{snowflake[name]}|g")
+        lines.append(f"{prefix}.snowflake_connections.wait:{snowflake['wait_seconds'] * 1000:.1f}|ms")
+    return lines
+
+
+def write_metrics_file(path, run, tables, fmt='json'):
+    """
+    Write the run metrics to `path` as a JSON document or as StatsD lines.
+    """
+    if fmt not in METRICS_FORMATS:
+        raise ValueError(f"Unknown metrics format '{fmt}', expected one of {METRICS_FORMATS}")
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        if fmt == 'json':
+            json.dump({"run": run, "tables": tables}, f, indent=2, default=str)
+        else:
+            f.write("\n".join(to_statsd_lines(run, tables)) + "\n")
+    logging.info(f"📈 Ingestion metrics written to {path} ({fmt})")
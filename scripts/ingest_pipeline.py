@@ -0,0 +1,233 @@
+"""
+Pipelined loading of one table.
+
+Without a pipeline a streamed table is read, serialized and uploaded one
+batch at a time, so the source sits idle while a batch is sent and the
+network while the next one is read. `BatchPipeline` runs the three steps
+of successive batches concurrently:
+
+    extract thread  ->  queue  ->  serialize thread  ->  queue  ->  upload (calling thread)
+
+The extract thread pulls DataFrames from the source iterator (which also
+runs the schema typing, pre-load transformations and KPI staging on its
+way), the serialize thread prepares them for the loader (Parquet files
+for the copy engine) and the calling thread uploads them and saves the
+checkpoints, in source order. The queues are bounded (INGEST_PIPELINE_QUEUE_SIZE),
+so a slow upload blocks the stages before it instead of buffering the
+table: at most 2 * queue size + 3 batches are held at once. A table then
+takes about as long as its slowest step rather than the sum of all three.
+
+Every queue reports how full it got and how long its producer waited on
+it being full (backpressure from the stage after it) and its consumer on
+it being empty (starved by the stage before it); every stage reports the
+time it was busy. The busiest stage is the bottleneck. The statistics
+are recorded with the table's metrics ("pipeline").
+"""
+import contextvars
+import logging
+import queue
+import threading
+import time
+
+# Seconds between checks for a stopped pipeline while a queue is full or empty
+POLL_SECONDS = 0.1
+_DONE = object()
+
+
+class StageQueue:
+    """
+    A bounded queue between two stages of a BatchPipeline, with depth and
+    wait statistics.
+    """
+
+    def __init__(self, name, size, stop):
+        self.name = name
+        self.size = size
+        self.stop = stop
+        self.queue = queue.Queue(maxsize=size)
+        self.items = 0
+        self.max_depth = 0
+        self.depth_total = 0
+        self.put_wait_seconds = 0.0
+        self.get_wait_seconds = 0.0
+
+    def put(self, item):
+        """
+        Add an item, waiting while the queue is full. Returns False when
+        the pipeline was stopped in the meantime.
+        """
+        started = time.perf_counter()
+        try:
+            while not self.stop.is_set():
+                try:
+                    self.queue.put(item, timeout=POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            self.put_wait_seconds += time.perf_counter() - started
+
+    def get(self):
+        """
+        Take the next item, waiting while the queue is empty. Returns
+        _DONE when the pipeline was stopped in the meantime.
+        """
+        started = time.perf_counter()
+        try:
+            while not self.stop.is_set():
+                try:
+                    item = self.queue.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    continue
+                if item is not _DONE:
+                    # Depth seen by the consumer, including the item it takes
+                    depth = self.queue.qsize() + 1
+                    self.items += 1
+                    self.depth_total += depth
+                    self.max_depth = max(self.max_depth, depth)
+                return item
+            return _DONE
+        finally:
+            self.get_wait_seconds += time.perf_counter() - started
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "items": self.items,
+            "max_depth": self.max_depth,
+            "mean_depth": round(self.depth_total / self.items, 2) if self.items else 0.0,
+            "put_wait_seconds": round(self.put_wait_seconds, 4),
+            "get_wait_seconds": round(self.get_wait_seconds, 4),
+        }
+
+
+class BatchPipeline:
+    """
+    Extract, serialize and upload the batches of one table concurrently
+    (see the module docstring).
+
+        with BatchPipeline(batches, loader.serialize, queue_size=2) as pipeline:
+            for df, payload in pipeline:
+                loader.upload(payload)
+
+    `batches` is iterated in the extract thread and `serialize(df)` called
+    in the serialize thread; iterating the pipeline yields (df, payload)
+    pairs in source order. The first error of any stage stops the others
+    and is raised to the caller; leaving the `with` block stops the
+    threads and waits for them.
+    """
+
+    def __init__(self, batches, serialize, queue_size=2, name=None):
+        self.batches = batches
+        self.serialize = serialize
+        self.queue_size = max(1, queue_size)
+        self.name = name
+        self.stop = threading.Event()
+        self.errors = []
+        self.queues = {
+            "serialize": StageQueue("serialize", self.queue_size, self.stop),
+            "upload": StageQueue("upload", self.queue_size, self.stop),
+        }
+        self.busy_seconds = {"extract": 0.0, "serialize": 0.0, "upload": 0.0}
+        self.threads = []
+        self.started = None
+        self.seconds = 0.0
+
+    def _run(self, stage_name, work):
+        try:
+            work()
+        except BaseException as e:
+            self.errors.append(e)
+            logging.error(f"❌ Pipeline stage {stage_name} of {self.name or 'the table'} failed: {e}")
+            self.stop.set()
+
+    def _extract(self):
+        output = self.queues["serialize"]
+        iterator = iter(self.batches)
+        try:
+            while not self.stop.is_set():
+                started = time.perf_counter()
+                df = next(iterator, _DONE)
+                self.busy_seconds["extract"] += time.perf_counter() - started
+                if df is _DONE or not output.put(df):
+                    break
+        finally:
+            # The source (e.g. a server-side cursor) is closed by the thread that reads it
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+        output.put(_DONE)
+
+    def _serialize(self):
+        source, output = self.queues["serialize"], self.queues["upload"]
+        while True:
+            df = source.get()
+            if df is _DONE:
+                break
+            started = time.perf_counter()
+            payload = self.serialize(df)
+            self.busy_seconds["serialize"] += time.perf_counter() - started
+            if not output.put((df, payload)):
+                return
+        output.put(_DONE)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        for stage_name, work in (("extract", self._extract), ("serialize", self._serialize)):
+            # Every thread gets its own copy of the context, so stage timings reach the table's metrics
+            context = contextvars.copy_context()
+            thread = threading.Thread(
+                target=context.run, args=(self._run, stage_name, work),
+                name=f"pipeline-{stage_name}", daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def __iter__(self):
+        source = self.queues["upload"]
+        while True:
+            item = source.get()
+            if item is _DONE:
+                break
+            started = time.perf_counter()
+            yield item
+            self.busy_seconds["upload"] += time.perf_counter() - started
+        if self.errors:
+            raise self.errors[0]
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.stop.set()
+        for thread in self.threads:
+            thread.join()
+        self.seconds = time.perf_counter() - self.started
+        if exc_type is None and self.errors:
+            raise self.errors[0]
+        return False
+
+    def stats(self):
+        """
+        Return the busy time of every stage and the statistics of every
+        queue, named after the stage that consumes it.
+        """
+        return {
+            "queue_size": self.queue_size,
+            "seconds": round(self.seconds, 4),
+            "busy_seconds": {stage_name: round(seconds, 4) for stage_name, seconds in self.busy_seconds.items()},
+            "bottleneck": max(self.busy_seconds, key=self.busy_seconds.get),
+            "queues": {name: stage_queue.stats() for name, stage_queue in self.queues.items()},
+        }
+
+    def log_stats(self):
+        stats = self.stats()
+        busy = ", ".join(f"{stage_name} {seconds:.1f}s" for stage_name, seconds in stats["busy_seconds"].items())
+        waits = ", ".join(
+            f"{name} queue max {queue_stats['max_depth']}/{queue_stats['size']}, "
+            f"full {queue_stats['put_wait_seconds']:.1f}s, empty {queue_stats['get_wait_seconds']:.1f}s"
+            for name, queue_stats in stats["queues"].items()
+        )
+        logging.info(
+            f"⏩ Pipelined {self.name or 'table'} in {stats['seconds']:.1f}s: busy {busy} "
+            f"(bottleneck: {stats['bottleneck']}); {waits}"
+        )
@@ -0,0 +1,372 @@
+"""
+Local state persisted between ingestion runs.
+
+State lives as small JSON documents in INGEST_CONFIG["state_dir"]. Writes
+are atomic (temp file + rename) and serialized with a lock, held across
+threads and (where `fcntl` is available) across processes, so parallel
+ingestion workers and the per-table Airflow tasks can update the same
+document safely.
+
+Besides the watermarks and the CSV manifest, the checkpoints of the
+current run are kept here: per table, its load id, the rows already
+staged and where to resume the source, so a retried run continues each
+unfinished table from its first incomplete chunk and skips the tables it
+already loaded. They are cleared once a run completes.
+
+The position of every change data capture slot (the LSN up to which its
+changes were merged into bronze, see `scripts/cdc.py`) is kept here too.
+
+The bronze tables that received new rows are also recorded until the dbt
+models built on them have been rebuilt (see `scripts/dbt_selection.py`).
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+import numbers
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: the thread lock only covers a single process
+    fcntl = None
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+from config import INGEST_CONFIG
+from scripts.id_encoding import decode_ids
+
+WATERMARKS_FILE = 'watermarks.json'
+CSV_MANIFEST_FILE = 'csv_manifest.json'
+CHECKPOINTS_FILE = 'checkpoints.json'
+CHANGED_TABLES_FILE = 'changed_tables.json'
+CDC_POSITIONS_FILE = 'cdc_positions.json'
+# Key of the run id in the checkpoints document; every other key is a table
+RUN_ID_KEY = '_run_id'
+
+LOCK_FILE = '.lock'
+
+_lock = threading.Lock()
+
+
+def state_dir():
+    """
+    Return the state directory, creating it if needed.
+    """
+    path = Path(INGEST_CONFIG["state_dir"])
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@contextmanager
+def state_lock():
+    """
+    Hold the state lock for a read-modify-write of the state documents.
+    """
+    with _lock:
+        if fcntl is None:
+            yield
+            return
+        with open(state_dir() / LOCK_FILE, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_state(name):
+    """
+    Load a JSON state document, returning an empty dict if it does not exist.
+    """
+    path = state_dir() / name
+    if not path.exists():
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(name, data):
+    """
+    Atomically replace a JSON state document.
+    """
+    path = state_dir() / name
+    # A unique temp name per writer, so concurrent processes never share one
+    tmp_path = path.with_name(f".{name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True, default=str)
+    os.replace(tmp_path, path)
+
+
+def update_state(name, key, value):
+    """
+    Set a single key in a JSON state document (read-modify-write under lock).
+    A value of None removes the key.
+    """
+    with state_lock():
+        data = load_state(name)
+        if value is None:
+            data.pop(key, None)
+        else:
+            data[key] = value
+        save_state(name, data)
+
+
+def get_watermark(table):
+    """
+    Return the stored high-watermark for a table, or None for a first load.
+    """
+    return load_state(WATERMARKS_FILE).get(table)
+
+
+def is_past_watermark(value, watermark):
+    """
+    Return whether a watermark column value lies past a stored watermark.
+
+    Watermarks are stored as text, where "10" sorts before "9", so the
+    stored value is converted back to the type of the column value (a
+    number, a date or a timestamp) before comparing.
+    """
+    if watermark is None:
+        return True
+    if isinstance(value, numbers.Number) and not isinstance(value, bool):
+        return Decimal(str(value)) > Decimal(watermark)
+    if isinstance(value, (datetime, date)):
+        return value > type(value).fromisoformat(watermark)
+    return str(value) > watermark
+
+
+def set_watermark(table, value):
+    """
+    Persist the high-watermark reached by the last successful load of a table.
+    """
+    update_state(WATERMARKS_FILE, table, None if value is None else str(value))
+
+
+def get_cdc_position(table):
+    """
+    Return the stored CDC position of a table ({"slot", "lsn"}), or None
+    before its first snapshot.
+    """
+    return load_state(CDC_POSITIONS_FILE).get(table)
+
+
+def set_cdc_position(table, slot, lsn):
+    """
+    Persist the LSN up to which the changes of a table's slot are in bronze.
+    """
+    update_state(CDC_POSITIONS_FILE, table, {"slot": slot, "lsn": lsn})
+
+
+def clear_cdc_position(table):
+    """
+    Forget the CDC position of a table, so its next run starts with a snapshot.
+    """
+    update_state(CDC_POSITIONS_FILE, table, None)
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """
+    Return the SHA-256 hex digest of a file, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def check_csv_changed(path, table):
+    """
+    Compare a CSV file with its entry in the manifest.
+
+    Returns `(changed, content_hash)`. A file whose size and mtime match the
+    manifest is treated as unchanged without being read (its recorded hash
+    is returned); otherwise its content is hashed, so a file that was
+    merely touched is still skipped.
+    """
+    path = Path(path)
+    entry = load_state(CSV_MANIFEST_FILE).get(str(path.resolve()))
+    stat = path.stat()
+    if entry is None or entry.get("table") != table:
+        return True, hash_file(path)
+    if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return False, entry["content_hash"]
+
+    content_hash = hash_file(path)
+    if content_hash == entry["content_hash"]:
+        # Same bytes with a new mtime: remember the new mtime to avoid rehashing
+        update_state(CSV_MANIFEST_FILE, str(path.resolve()), dict(entry, mtime_ns=stat.st_mtime_ns))
+        return False, content_hash
+    return True, content_hash
+
+
+def record_csv_load(path, table, content_hash, row_count):
+    """
+    Record a successfully loaded CSV file in the manifest.
+    """
+    path = Path(path)
+    stat = path.stat()
+    update_state(CSV_MANIFEST_FILE, str(path.resolve()), {
+        "path": str(path.resolve()),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "content_hash": content_hash or hash_file(path),
+        "row_count": row_count,
+        "table": table,
+    })
+
+
+def record_changed_tables(tables):
+    """
+    Remember bronze tables that received new rows, until `clear_changed_tables`.
+    """
+    changed_at = datetime.now(timezone.utc).isoformat()
+    with state_lock():
+        data = load_state(CHANGED_TABLES_FILE)
+        data.update({table: changed_at for table in tables})
+        save_state(CHANGED_TABLES_FILE, data)
+
+
+def changed_tables():
+    """
+    Return the bronze tables changed since their models were last rebuilt.
+    """
+    return sorted(load_state(CHANGED_TABLES_FILE))
+
+
+def clear_changed_tables(tables, before=None):
+    """
+    Forget changed tables once their models have been rebuilt. With
+    `before` (an ISO timestamp) a table changed again since then is kept.
+    """
+    with state_lock():
+        data = load_state(CHANGED_TABLES_FILE)
+        for table in tables:
+            if table in data and (before is None or data[table] <= before):
+                del data[table]
+        save_state(CHANGED_TABLES_FILE, data)
+
+
+def resolve_run_id(run_id=None):
+    """
+    Return the id of the ingestion run and make it the owner of the
+    checkpoints.
+
+    Without `run_id` the checkpoints left by an unfinished run (one with a
+    table that is not loaded) are adopted, so rerunning by hand resumes
+    it; otherwise a new id is generated. The per-table Airflow tasks never
+    clear their checkpoints, so a DAG run whose tables all loaded is left
+    behind as finished, not adopted. Checkpoints of a different run are
+    discarded.
+    """
+    with state_lock():
+        data = load_state(CHECKPOINTS_FILE)
+        previous = data.get(RUN_ID_KEY)
+        finished = all(state.get("status") == "loaded" for key, state in data.items() if key != RUN_ID_KEY)
+        if run_id is None:
+            run_id = (previous if previous and not finished
+                      else f"manual__{datetime.now(timezone.utc):%Y%m%dT%H%M%S}_{uuid.uuid4().hex[:8]}")
+        if previous != run_id:
+            save_state(CHECKPOINTS_FILE, {RUN_ID_KEY: run_id})
+    return run_id
+
+
+def get_checkpoint(table):
+    """
+    Return the checkpoint of a table in the current run, or None.
+    """
+    return load_state(CHECKPOINTS_FILE).get(table)
+
+
+def clear_checkpoints():
+    """
+    Forget every checkpoint once a run has completed.
+    """
+    with state_lock():
+        save_state(CHECKPOINTS_FILE, {})
+
+
+class TableCheckpoint:
+    """
+    Progress of one table within an ingestion run.
+
+    The load id is derived from the run, the table and the source key (a
+    content hash, fingerprint or extraction window), so a retry of the same
+    load reuses it: loaders stage rows under it and record it in the
+    warehouse load log in the same transaction as the rows, which makes
+    the final commit idempotent. A previous checkpoint is resumed only if
+    it was written for the same source key, load engine and batch size.
+
+    With `reload` a table the run already loaded is loaded again, under a
+    load id chained to the committed one (so a retry of the reload still
+    resumes it).
+    """
+
+    def __init__(self, run_id, table, source_key, engine, batch_size, key_column=None, reload=False):
+        self.table = table
+        self.key_column = key_column
+        previous = get_checkpoint(table)
+        if reload and previous and previous.get("status") == "loaded":
+            reload_of = previous["load_id"]
+        else:
+            reload_of = previous.get("reload_of") if previous else None
+        parts = [run_id, table, source_key, engine, batch_size] + ([reload_of] if reload_of else [])
+        fingerprint = json.dumps(parts, default=str)
+        self.load_id = hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()[:32]
+        self.resumed = bool(previous) and previous.get("load_id") == self.load_id
+        self.state = previous if self.resumed else {
+            "load_id": self.load_id,
+            "source_key": source_key,
+            "engine": engine,
+            "batch_size": batch_size,
+            "status": "loading",
+            "rows": 0,
+            "chunks": 0,
+            "resume_after": None,
+            "loader": None,
+            "reload_of": reload_of,
+        }
+
+    @property
+    def rows(self):
+        return self.state["rows"]
+
+    @property
+    def resume_after(self):
+        return self.state["resume_after"]
+
+    @property
+    def loader_state(self):
+        return self.state["loader"]
+
+    def save(self, **changes):
+        self.state.update(changes, updated_at=datetime.now(timezone.utc).isoformat())
+        update_state(CHECKPOINTS_FILE, self.table, self.state)
+
+    def restart(self):
+        """
+        Drop the progress of a checkpoint whose staged rows cannot be trusted.
+        """
+        self.save(rows=0, chunks=0, resume_after=None, loader=None)
+
+    def chunk_done(self, df, loader_state):
+        """
+        Record a chunk as durably staged by the loader.
+        """
+        resume_after = self.state["resume_after"]
+        if self.key_column and len(df):
+            # An encoded key is resumed from its value, as codes do not outlive the process
+            resume_after = decode_ids(df[[self.key_column]].iloc[-1:])[self.key_column].iloc[0]
+            # numpy scalars would be stored as strings and compare as such on resume
+            resume_after = resume_after.item() if hasattr(resume_after, 'item') else resume_after
+        self.save(rows=self.state["rows"] + len(df), chunks=self.state["chunks"] + 1,
+                  resume_after=resume_after, loader=loader_state)
+
+    def mark_loaded(self, stats=None):
+        self.save(status="loaded", stats=stats)
@@ -1,9 +1,12 @@
 import os
 import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
 import pandas as pd
-from sqlalchemy import create_engine
-import snowflake.connector
-from snowflake.connector.pandas_tools import write_pandas
+from sqlalchemy import text
 from pathlib import Path
 import logging
 from dotenv import load_dotenv
@@ -12,11 +15,35 @@ from dotenv import load_dotenv
 # This makes the script runnable from anywhere
 project_root = Path(__file__).resolve().parent.parent
 sys.path.append(str(project_root))
-from config import PG_CONFIG, SNOWFLAKE_CONFIG
+from config import INGEST_CONFIG, INCREMENTAL_SOURCES, WAREHOUSE_CONFIG
+from connections import WAREHOUSES, WarehouseConnectionPool, get_pg_engine, get_warehouse_pool, pool_stats
+from scripts.bronze_cache import cached_frames, csv_cache_key, postgres_cache_key
+from scripts.bronze_loaders import make_loader, LOAD_ENGINES
+from scripts.bronze_schemas import CSV_SUFFIXES, apply_schema, read_csv_typed, table_for_csv
+from scripts.cdc import (
+    advance_slot, apply_batch, change_batches, create_slot, parse_transactions, peek_changes,
+    slot_exists, slot_name,
+)
+from scripts.frame_engines import FRAME_ENGINES, get_engine
+from scripts.id_encoding import shared_dictionary
+from scripts.ingest_pipeline import BatchPipeline
+from scripts.kpi_store import kpi_feed
+from scripts.preload_transforms import preload_transform
+from scripts.ingest_state import (
+    get_watermark, set_watermark, is_past_watermark, check_csv_changed, record_csv_load, record_changed_tables,
+    resolve_run_id, get_checkpoint, clear_checkpoints, get_cdc_position, set_cdc_position, TableCheckpoint
+)
+from scripts.ingest_metrics import (
+    METRICS_FORMATS, peak_rss_mb, track_table, stage, timed_iter, record_batch, record,
+    summarize_run, log_metrics, write_metrics_file
+)
 
 # Load environment variables from .env file
 load_dotenv()
 
+# PostgreSQL tables that are loaded into the Bronze layer
+PG_TABLES = ['raw_customers', 'raw_orders']
+
 # --- Setup professional logging ---
 logging.basicConfig(
     level=logging.INFO,
@@ -24,84 +51,1015 @@ logging.basicConfig(
 )
 
 
-def main_ingest():
+def iter_postgres_batches(pg_engine, table, batch_size, query=None, params=None):
+    """
+    Yield a PostgreSQL table (or the rows of `query`) as DataFrames of at
+    most `batch_size` rows, typed with the table's declared schema.
+
+    `stream_results` makes psycopg2 use a named (server-side) cursor, so
+    only one batch is held in memory at a time instead of the whole table.
+    """
+    query = text(query or f'SELECT * FROM {table}')
+    with stage('connect'):
+        pg_conn = pg_engine.connect().execution_options(stream_results=True, max_row_buffer=batch_size)
+    with pg_conn:
+        for chunk in timed_iter(pd.read_sql(query, pg_conn, params=params, chunksize=batch_size), 'extract'):
+            with stage('transform'):
+                df = apply_schema(chunk, table)
+            yield df
+
+
+def iter_csv_batches(csv_file, table_name_sf, batch_size, skip_rows=0):
+    """
+    Yield a CSV file as DataFrames of at most `batch_size` rows, parsed
+    with the target table's declared schema, after the first `skip_rows`
+    data rows.
+    """
+    record(source_bytes=Path(csv_file).stat().st_size)
+    with stage('extract'):
+        reader = read_csv_typed(csv_file, table_name_sf, chunksize=batch_size, skip_rows=skip_rows)
+    with reader:
+        # Typing happens while parsing, so the whole read counts as extraction
+        yield from timed_iter(reader, 'extract')
+
+
+def iter_csv_file(csv_file, table_name_sf, frame_engine=None, csv_workers=None):
+    """
+    Yield a whole CSV file, parsed with the target table's declared
+    schema by the DataFrame engine `frame_engine` (see
+    `scripts/frame_engines.py`), as a single pandas DataFrame. With
+    `csv_workers` > 1 the pandas engine parses byte ranges of the file in
+    that many processes (see `scripts/parallel_csv.py`).
+    """
+    record(source_bytes=Path(csv_file).stat().st_size)
+    engine = get_engine(frame_engine, csv_workers)
+    with stage('extract'):
+        df = engine.read(csv_file, table_name_sf)
+    with stage('transform'):
+        df = engine.to_pandas(df, table_name_sf)
+    logging.info(f"Loaded {len(df):,} rows from {Path(csv_file).name}")
+    yield df
+
+
+def iter_postgres_table(pg_engine, table, query=None, params=None):
+    """
+    Yield a whole PostgreSQL table (or the rows of `query`), typed with its
+    declared schema, as a single DataFrame.
+    """
+    with stage('extract'), pg_engine.connect() as pg_conn:
+        df = pd.read_sql(text(query or f'SELECT * FROM {table}'), pg_conn, params=params)
+    with stage('transform'):
+        df = apply_schema(df, table)
+    logging.info(f"Loaded {len(df):,} rows from {table}")
+    yield df
+
+
+def skip_leading_rows(batches, rows):
+    """
+    Drop the first `rows` rows of a stream of DataFrames.
+    """
+    for df in batches:
+        if rows >= len(df):
+            rows -= len(df)
+            continue
+        if rows:
+            df, rows = df.iloc[rows:], 0
+        yield df
+
+
+def paged_query(query, key, after=None):
+    """
+    Order `query` by `key` so its batches are reproducible, starting after
+    the key value `after` (bound as :after) when resuming.
+    """
+    if after is not None:
+        query = f"SELECT * FROM ({query}) AS q WHERE {key} > :after"
+    return f"{query} ORDER BY {key}"
+
+
+def load_batches(loader, batches, checkpoint=None, pipeline=None):
+    """
+    Push every DataFrame in `batches` to the loader's table as it arrives.
+
+    Returns the loader's per-table load statistics. Throughput and peak
+    memory are logged once the table is done. Every batch is recorded in
+    `checkpoint` once the loader has it. On error the loader is aborted so
+    no partial staging files are left behind (unless they are kept for
+    resuming the load).
+
+    With `pipeline` (a queue size) the batches are read and serialized in
+    background threads while the previous ones are uploaded, see
+    `scripts/ingest_pipeline.py`; batches are still uploaded and
+    checkpointed in order.
+    """
+    table_name_sf = loader.table_name
+    started = time.perf_counter()
+    total_rows = 0
+    if pipeline:
+        def serialize(df):
+            with stage('load'):
+                return loader.serialize(df)
+
+        batch_stream = BatchPipeline(batches, serialize, queue_size=pipeline, name=table_name_sf)
+        send = loader.upload
+    else:
+        batch_stream = nullcontext((df, df) for df in batches)
+        send = loader.write
+    try:
+        with batch_stream as pairs:
+            for batch_number, (df, payload) in enumerate(pairs, start=1):
+                record_batch(df)
+                with stage('load'):
+                    send(payload)
+                if checkpoint is not None:
+                    checkpoint.chunk_done(df, loader.checkpoint_state())
+                total_rows += len(df)
+                logging.info(f"  batch {batch_number}: wrote {len(df):,} rows to {table_name_sf} ({total_rows:,} total)")
+        if pipeline:
+            batch_stream.log_stats()
+            record(pipeline=batch_stream.stats())
+        with stage('load'):
+            stats = loader.close()
+        record(staged_bytes=stats.get("bytes"))
+    except Exception:
+        loader.abort()
+        raise
+
+    elapsed = time.perf_counter() - started
+    rows_per_sec = total_rows / elapsed if elapsed > 0 else 0.0
+    peak_rss = peak_rss_mb()
+    peak_rss_text = f"{peak_rss:,.1f} MB" if peak_rss is not None else "n/a"
+    logging.info(
+        f"✓ Loaded {total_rows:,} rows to {table_name_sf} in {elapsed:.1f}s "
+        f"({rows_per_sec:,.0f} rows/sec, peak RSS {peak_rss_text})"
+    )
+    return stats
+
+
+def load_table(loader, read_batches, checkpoint=None, before_load=None, after_load=None, transform=None, kpi=None,
+               pipeline=None, encode_ids=False):
+    """
+    Load one table, resuming an interrupted attempt of the same load.
+
+    `read_batches(skip_rows, resume_after)` returns the source DataFrames
+    that follow the first `skip_rows` rows (whose last key, for key-ordered
+    sources, is `resume_after`). Without a checkpoint everything is read.
+    With one, a load that an earlier attempt already committed is not
+    repeated, rows the loader still has staged are kept, and only the rest
+    of the source is read. `before_load()` runs right before loading (e.g.
+    to truncate the table for a full reload) and `after_load()` once the
+    load is committed, before the table is checkpointed as loaded.
+
+    `transform` (see `scripts/preload_transforms.py`) is applied to the
+    batches on their way to the loader. Its state is not checkpointed, so
+    an interrupted load of a transformed table starts over. `kpi` (see
+    `scripts/kpi_store.py`) stages the loaded batches in the KPI store and
+    applies them once the load is committed. `pipeline` is passed on to
+    `load_batches`. With `encode_ids` the key columns of the batches are
+    held as codes of the shared dictionary (see `scripts/id_encoding.py`)
+    until the loader, the KPI store and the checkpoint decode them.
+    Returns the load statistics.
+    """
+    table_name_sf = loader.table_name
+    if transform is not None:
+        source_batches = read_batches
+
+        def read_batches(skip_rows, resume_after):
+            return transform.apply(source_batches(skip_rows, resume_after))
+
+    if encode_ids:
+        decoded_batches = read_batches
+
+        def read_batches(skip_rows, resume_after):
+            for df in decoded_batches(skip_rows, resume_after):
+                with stage('transform'):
+                    df = shared_dictionary().encode_frame(df)
+                yield df
+
+    if kpi is not None:
+        loaded_batches = read_batches
+
+        def read_batches(skip_rows, resume_after):
+            # A resumed load keeps the rows its earlier attempt staged
+            kpi.start(skip_rows)
+            for df in loaded_batches(skip_rows, resume_after):
+                kpi.add(df)
+                yield df
+
+        committed = after_load
+
+        def after_load():
+            if committed:
+                committed()
+            kpi.commit()
+
+    if checkpoint is None:
+        if before_load:
+            before_load()
+        stats = load_batches(loader, read_batches(0, None), pipeline=pipeline)
+        if after_load:
+            after_load()
+        return stats
+
+    if checkpoint.resumed and loader.is_committed():
+        logging.info(f"⏭ Load {checkpoint.load_id} of {table_name_sf} was already committed; not loading it again.")
+        stats = checkpoint.state.get("stats") or {"engine": None, "table": table_name_sf, "rows": checkpoint.rows}
+        if after_load:
+            after_load()
+        checkpoint.mark_loaded(stats)
+        return stats
+
+    staged = loader.begin(checkpoint.loader_state if checkpoint.resumed and transform is None else None)
+    if staged:
+        logging.info(f"↻ Resuming {table_name_sf} after {staged:,} rows staged by an earlier attempt")
+    elif checkpoint.rows:
+        checkpoint.restart()
+    if before_load:
+        before_load()
+    # Chunks of a transformed table are not resumable, only the committed load is
+    stats = load_batches(loader, read_batches(staged, checkpoint.resume_after if staged else None),
+                         checkpoint if transform is None else None, pipeline=pipeline)
+    if after_load:
+        after_load()
+    checkpoint.mark_loaded(stats)
+    return stats
+
+
+def open_checkpoint(options, table_name_sf, source_key, key_column=None):
+    """
+    Return the checkpoint of a table load in this run, or None when
+    checkpoints are disabled.
+    """
+    if not options["checkpoints"]:
+        return None
+    batch_size = options["batch_size"] if options["streaming"] else None
+    return TableCheckpoint(options["run_id"], table_name_sf, source_key, options["load_engine"], batch_size,
+                           key_column=key_column, reload=options["force"])
+
+
+def pipeline_queue_size(options):
+    """
+    Return the queue size of a pipelined load, or None when loads are not
+    pipelined.
+    """
+    return options["pipeline_queue_size"] if options["pipeline"] else None
+
+
+def truncate_bronze_table(conn_sf, table_name_sf, warehouse=None):
+    """
+    Remove every row from a bronze table ahead of a full reload.
+    """
+    if (warehouse or WAREHOUSE_CONFIG["engine"]) == 'duckdb':
+        from scripts.duckdb_warehouse import truncate_table
+        truncate_table(conn_sf, table_name_sf)
+        return
+    cursor = conn_sf.cursor()
+    try:
+        cursor.execute(f'TRUNCATE TABLE IF EXISTS "{table_name_sf}"')
+    finally:
+        cursor.close()
+
+
+def build_incremental_query(table, spec):
+    """
+    Build the SELECT for rows whose watermark lies in (:low, :high].
+
+    When the spec names a `watermark_table` the watermark is taken from
+    that table through `join_column` (raw_customers follows raw_orders).
+    """
+    column = spec["watermark_column"]
+    condition = f"{column} > :low AND {column} <= :high"
+    watermark_table = spec.get("watermark_table")
+    if watermark_table:
+        join_column = spec["join_column"]
+        return (
+            f"SELECT * FROM {table} WHERE {join_column} IN "
+            f"(SELECT {join_column} FROM {watermark_table} WHERE {condition})"
+        )
+    return f"SELECT * FROM {table} WHERE {condition}"
+
+
+def ingest_postgres_incremental(table, conn_sf, pg_engine, options):
+    """
+    Load only the rows of a PostgreSQL table past its stored high-watermark.
+
+    The upper bound is snapshotted before extraction so rows arriving
+    mid-run are picked up by the next run rather than skipped. Without a
+    stored watermark, or with options["full_refresh"], the bronze table is truncated
+    and reloaded in full. The new watermark is persisted only after the
+    load succeeds. Returns the load statistics.
+    """
+    spec = INCREMENTAL_SOURCES[table]
+    write_mode = options["incremental_write"]
+    table_name_sf = table.lower()
+    watermark_table = spec.get("watermark_table", table)
+
+    previous = get_checkpoint(table_name_sf) if options["checkpoints"] else None
+    if previous and previous.get("window"):
+        # A retry extracts the same window as the failed attempt, so its load id is reused
+        low, high = previous["window"]
+        logging.info(f"↻ Resuming the extraction window ({low}, {high}] of {table}")
+    else:
+        with stage('extract'), pg_engine.connect() as pg_conn:
+            high = pg_conn.execute(
+                text(f"SELECT MAX({spec['watermark_column']}) FROM {watermark_table}")
+            ).scalar()
+        low = None if options["full_refresh"] else get_watermark(table)
+
+        if high is None or not is_past_watermark(high, low):
+            logging.info(f"No new rows in {table} past watermark {low}; skipping.")
+            return {"engine": None, "table": table_name_sf, "rows": 0}
+        high = str(high)
+
+    params = {"low": low, "high": high}
+    before_load = None
+    if low is None:
+        # A full load takes every row, including rows without a watermark value
+        logging.info(f"Full load of {table} up to watermark {high} (no previous watermark or full refresh)")
+        query = f"SELECT * FROM {table}"
+        before_load = partial(truncate_bronze_table, conn_sf, table_name_sf, options["warehouse"])
+        merge_key = None
+    else:
+        query = build_incremental_query(table, spec)
+        logging.info(f"Incremental load of {table}: {spec['watermark_column']} in ({low}, {high}] ({write_mode})")
+        merge_key = spec["key"] if write_mode == 'merge' else None
+
+    checkpoint = open_checkpoint(options, table_name_sf, [low, high], key_column=spec["key"])
+    if checkpoint is not None:
+        checkpoint.save(window=[low, high])
+    loader = make_loader(conn_sf, table_name_sf, engine=options["load_engine"], merge_key=merge_key,
+                         load_id=checkpoint.load_id if checkpoint else None, warehouse=options["warehouse"])
+
+    def read_batches(skip_rows, resume_after):
+        if not options["streaming"]:
+            return skip_leading_rows(iter_postgres_table(pg_engine, table, query, params), skip_rows)
+        if checkpoint is None:
+            return iter_postgres_batches(pg_engine, table, options["batch_size"], query, params)
+        return iter_postgres_batches(
+            pg_engine, table, options["batch_size"],
+            paged_query(query, spec["key"], resume_after), dict(params, after=resume_after)
+        )
+
+    def advance_watermark():
+        set_watermark(table, high)
+        logging.info(f"✓ {table} watermark advanced to {high}")
+
+    return load_table(loader, read_batches, checkpoint, before_load, advance_watermark,
+                      transform=preload_transform(table_name_sf, options),
+                      kpi=kpi_feed(table_name_sf, options, replace=low is None),
+                      pipeline=pipeline_queue_size(options), encode_ids=options["encode_ids"])
+
+
+def ingest_postgres_cdc(table, conn_sf, pg_engine, options):
+    """
+    Merge the changes of a PostgreSQL table recorded by its logical
+    replication slot into bronze (see `scripts/cdc.py`).
+
+    Without a stored slot position, when the slot is gone, or with
+    options["full_refresh"], the slot is (re)created and the bronze table
+    truncated and reloaded from a snapshot of the table; the slot's
+    starting LSN becomes the position. Otherwise the slot is read in
+    batches of INGEST_CDC_BATCH_CHANGES changes until it is drained, each
+    batch merged, its commit LSN saved as the position and the slot
+    advanced. Returns the load statistics.
+    """
+    key = INCREMENTAL_SOURCES[table]["key"]
+    table_name_sf = table.lower()
+    slot = slot_name(table)
+    position = get_cdc_position(table)
+    with stage('connect'):
+        has_slot = slot_exists(pg_engine, slot)
+    if position is not None and not has_slot:
+        logging.warning(f"⚠️ The replication slot {slot} of {table} is gone; taking a new snapshot")
+
+    if options["full_refresh"] or position is None or position["slot"] != slot or not has_slot:
+        # The slot is created first, so no change committed after the snapshot is lost
+        with stage('connect'):
+            start_lsn = create_slot(pg_engine, slot)
+        logging.info(f"Snapshot of {table} for change data capture from {start_lsn}")
+        loader = make_loader(conn_sf, table_name_sf, engine=options["load_engine"], warehouse=options["warehouse"])
+
+        def read_batches(skip_rows, resume_after):
+            if options["streaming"]:
+                return iter_postgres_batches(pg_engine, table, options["batch_size"])
+            return iter_postgres_table(pg_engine, table)
+
+        stats = load_table(loader, read_batches,
+                           before_load=partial(truncate_bronze_table, conn_sf, table_name_sf, options["warehouse"]),
+                           after_load=partial(set_cdc_position, table, slot, start_lsn),
+                           kpi=kpi_feed(table_name_sf, options), pipeline=pipeline_queue_size(options),
+                           encode_ids=options["encode_ids"])
+        return dict(stats, cdc={"slot": slot, "lsn": start_lsn, "snapshot": True})
+
+    loader = make_loader(conn_sf, table_name_sf, merge_key=key, warehouse=options["warehouse"])
+    truncate = partial(truncate_bronze_table, conn_sf, table_name_sf, options["warehouse"])
+    kpi = kpi_feed(table_name_sf, options)
+    limit = INGEST_CONFIG["cdc_batch_changes"]
+    lsn = position["lsn"]
+    totals = {"transactions": 0, "upserted": 0, "deleted": 0}
+    while True:
+        with stage('extract'):
+            rows = peek_changes(pg_engine, slot, table, limit)
+        with stage('transform'):
+            transactions = parse_transactions(rows)
+        for batch in change_batches(transactions, key, after_lsn=lsn):
+            upserts, deletes = apply_batch(loader, batch, truncate)
+            if kpi is not None:
+                kpi.store.apply_changes(table_name_sf, upserts, deletes, truncate=batch.truncate)
+            set_cdc_position(table, slot, batch.lsn)
+            upserted, deleted = len(upserts), len(deletes)
+            lsn = batch.lsn
+            totals["transactions"] += batch.transactions
+            totals["upserted"] += upserted
+            totals["deleted"] += deleted
+            logging.info(
+                f"  merged {batch.transactions:,} transaction(s) into {table_name_sf}: {upserted:,} upserted, "
+                f"{deleted:,} deleted" + (", after a truncation" if batch.truncate else "") + f" (up to {lsn})"
+            )
+        if not transactions:
+            break
+        # Also releases transactions an interrupted run merged without advancing the slot
+        with stage('load'):
+            advance_slot(pg_engine, slot, transactions[-1][0])
+        if len(rows) < limit:
+            break
+
+    logging.info(
+        f"✓ {table} is at {lsn}: {totals['transactions']:,} transaction(s), "
+        f"{totals['upserted']:,} upserted and {totals['deleted']:,} deleted row(s)"
+    )
+    return {
+        "engine": "cdc", "table": table_name_sf, "rows": totals["upserted"] + totals["deleted"],
+        "load_seconds": loader.stats["load_seconds"], "cdc": dict(totals, slot=slot, lsn=lsn, snapshot=False),
+    }
+
+
+def default_csv_path():
+    """
+    Return the directory of the raw CSV files.
+    """
+    return project_root / 'data' / 'raw_data'
+
+
+def discover_sources(csv_path=None):
+    """
+    List every source to ingest as a dict with its kind ('postgres' or
+    'csv'), the source name (table or file name) and the target table.
+    The dicts are JSON-serializable, so the Airflow DAG maps one
+    `ingest_table` task over them.
+    """
+    csv_path = Path(csv_path) if csv_path else default_csv_path()
+    sources = [
+        {"kind": "postgres", "source": table, "table": table.lower()}
+        for table in PG_TABLES
+    ]
+
+    if not csv_path.exists():
+        raise FileNotFoundError(f"Critical error: CSV directory not found at {csv_path}")
+
+    csv_files = [
+        f for f in sorted(os.listdir(csv_path))
+        if f.endswith(CSV_SUFFIXES)
+        and 'customers' not in f
+        and 'orders' not in f
+    ]
+    for file in csv_files:
+        sources.append({"kind": "csv", "source": file, "table": table_for_csv(file)})
+    return sources
+
+
+def ingest_source(source, conn_sf, pg_engine, csv_path, options):
+    """
+    Extract a single source and load it into its Snowflake table.
+
+    `options` are the run options built by `resolve_options`. With
+    "cdc", PostgreSQL tables listed in INCREMENTAL_SOURCES merge the
+    changes of their replication slot (see `ingest_postgres_cdc`); with
+    "incremental" they are loaded from their stored watermark (see
+    `ingest_postgres_incremental`).
+    CSV files that are unchanged since their last successful load (per the
+    manifest in the state directory) are skipped unless "force" is set.
+    With "checkpoints", a table already loaded earlier in the same run is
+    skipped (unless "force" is set) and an interrupted one is resumed (see
+    `load_table`).
+    Returns the load statistics, or None when the source was skipped.
+    """
+    name, table_name_sf = source["source"], source["table"]
+
+    if options["checkpoints"]:
+        previous = get_checkpoint(table_name_sf)
+        if previous and previous["status"] == "loaded" and not options["force"]:
+            logging.info(f"⏭ {table_name_sf} was already loaded in run {options['run_id']}; skipping.")
+            return None
+
+    if source["kind"] == "csv":
+        with stage('checksum'):
+            changed, content_hash = check_csv_changed(csv_path / name, table_name_sf)
+        if not changed and not options["force"]:
+            logging.info(f"⏭ {name} is unchanged since its last load; skipping.")
+            return None
+        stats = _ingest_csv(name, table_name_sf, conn_sf, csv_path, options, content_hash)
+        record_csv_load(csv_path / name, table_name_sf, content_hash, stats["rows"])
+        return stats
+
+    if options["cdc"] and name in INCREMENTAL_SOURCES:
+        return ingest_postgres_cdc(name, conn_sf, pg_engine, options)
+
+    if options["incremental"] and name in INCREMENTAL_SOURCES:
+        return ingest_postgres_incremental(name, conn_sf, pg_engine, options)
+
+    # Ordering by the key makes the batches reproducible, so a retry can resume after the last one
+    key_column = INCREMENTAL_SOURCES.get(name, {}).get("key")
+    fingerprint = None
+    if options["cache"] or options["checkpoints"]:
+        with stage('checksum'):
+            fingerprint = postgres_cache_key(pg_engine, name)
+    checkpoint = open_checkpoint(options, table_name_sf, fingerprint, key_column=key_column)
+    loader = make_loader(conn_sf, table_name_sf, engine=options["load_engine"],
+                         load_id=checkpoint.load_id if checkpoint else None, warehouse=options["warehouse"])
+    batch_size = options["batch_size"] if options["streaming"] else None
+    if options["streaming"]:
+        logging.info(f"Streaming table: {name} from PostgreSQL to {table_name_sf}...")
+    else:
+        logging.info(f"Reading table: {name} from PostgreSQL...")
+
+    def read_source(skip_rows=0, resume_after=None):
+        if not options["streaming"]:
+            return skip_leading_rows(iter_postgres_table(pg_engine, name), skip_rows)
+        if checkpoint is None or key_column is None:
+            return skip_leading_rows(iter_postgres_batches(pg_engine, name, batch_size), skip_rows)
+        query = paged_query(f"SELECT * FROM {name}", key_column, resume_after)
+        return iter_postgres_batches(pg_engine, name, batch_size, query, {"after": resume_after})
+
+    def read_batches(skip_rows, resume_after):
+        if options["cache"] and fingerprint is not None:
+            # Cached copies are read in a fixed order, so resuming only skips rows
+            return skip_leading_rows(cached_frames(name, fingerprint, read_source, batch_size=batch_size), skip_rows)
+        return read_source(skip_rows, resume_after)
+
+    return load_table(loader, read_batches, checkpoint, transform=preload_transform(table_name_sf, options),
+                      kpi=kpi_feed(table_name_sf, options), pipeline=pipeline_queue_size(options),
+                      encode_ids=options["encode_ids"])
+
+
+def _ingest_csv(name, table_name_sf, conn_sf, csv_path, options, content_hash=None):
+    """
+    Read one CSV file (fully or in batches) and load it into Snowflake.
+    With the cache enabled the file is read from its cached Parquet copy
+    when there is one, and cached on the way through otherwise.
+    """
+    csv_file = csv_path / name
+    checkpoint = open_checkpoint(options, table_name_sf, content_hash)
+    loader = make_loader(conn_sf, table_name_sf, engine=options["load_engine"],
+                         load_id=checkpoint.load_id if checkpoint else None, warehouse=options["warehouse"])
+    batch_size = options["batch_size"] if options["streaming"] else None
+    if options["streaming"]:
+        logging.info(f"Streaming file: {name} to {table_name_sf}...")
+    else:
+        logging.info(f"Reading file: {name}...")
+
+    def read_source(skip_rows=0):
+        if options["streaming"]:
+            return iter_csv_batches(csv_file, table_name_sf, batch_size, skip_rows=skip_rows)
+        frames = iter_csv_file(csv_file, table_name_sf, options["frame_engine"], options["csv_workers"])
+        return skip_leading_rows(frames, skip_rows)
+
+    def read_batches(skip_rows, resume_after):
+        if not options["cache"]:
+            return read_source(skip_rows)
+        with stage('checksum'):
+            key = csv_cache_key(csv_file, table_name_sf, content_hash)
+        return skip_leading_rows(cached_frames(table_name_sf, key, read_source, batch_size=batch_size), skip_rows)
+
+    return load_table(loader, read_batches, checkpoint, transform=preload_transform(table_name_sf, options),
+                      kpi=kpi_feed(table_name_sf, options), pipeline=pipeline_queue_size(options),
+                      encode_ids=options["encode_ids"])
+
+
+def _run_source(source, pool, pg_engine, csv_path, options):
+    """
+    Ingest one source on a pooled connection and return its result record.
+    Errors are captured in the record instead of being raised so one
+    failing table does not discard the results of the others. The
+    per-stage metrics of the table are attached under "metrics". A table
+    that received rows is flagged "changed" and recorded in the state
+    directory, so only the dbt models built on it are rebuilt.
+    """
+    result = {
+        "table": source["table"], "source": source["source"], "rows": 0, "seconds": 0.0,
+        "skipped": False, "changed": False, "error": None, "load_stats": None, "metrics": None
+    }
+    started = time.perf_counter()
+    conn_sf = None
+    with track_table(source["table"], source["source"], source["kind"]) as metrics:
+        try:
+            with stage('connect'):
+                conn_sf = pool.acquire()
+            stats = ingest_source(source, conn_sf, pg_engine, csv_path, options)
+            result["skipped"] = stats is None
+            if stats:
+                result["rows"] = stats["rows"]
+                result["load_stats"] = stats
+            if stats and stats["rows"]:
+                result["changed"] = True
+                record_changed_tables([source["table"]])
+        except Exception as e:
+            logging.error(f"❌ Failed to ingest {source['source']} into {source['table']}: {e}")
+            result["error"] = str(e)
+        finally:
+            if conn_sf:
+                pool.release(conn_sf)
+            result["seconds"] = time.perf_counter() - started
+    result["metrics"] = metrics.as_dict()
+    return result
+
+
+def resolve_options(**overrides):
+    """
+    Build the run options: INGEST_CONFIG defaults updated with every
+    override that is not None.
+    """
+    options = {
+        "streaming": INGEST_CONFIG["streaming"],
+        "batch_size": INGEST_CONFIG["batch_size"],
+        "max_workers": INGEST_CONFIG["max_workers"],
+        "incremental": INGEST_CONFIG["incremental"],
+        "incremental_write": INGEST_CONFIG["incremental_write"],
+        "cdc": INGEST_CONFIG["cdc"],
+        "full_refresh": False,
+        "force": False,
+        "load_engine": INGEST_CONFIG["load_engine"],
+        "warehouse": WAREHOUSE_CONFIG["engine"],
+        "metrics_log": INGEST_CONFIG["metrics_log"],
+        "metrics_file": INGEST_CONFIG["metrics_file"],
+        "metrics_format": INGEST_CONFIG["metrics_format"],
+        "cache": INGEST_CONFIG["cache"],
+        "frame_engine": INGEST_CONFIG["frame_engine"],
+        "csv_workers": INGEST_CONFIG["csv_workers"],
+        "transforms": INGEST_CONFIG["transforms"],
+        "kpi_store": INGEST_CONFIG["kpi_store"],
+        "encode_ids": INGEST_CONFIG["encode_ids"],
+        "pipeline": INGEST_CONFIG["pipeline"],
+        "pipeline_queue_size": INGEST_CONFIG["pipeline_queue_size"],
+        "checkpoints": INGEST_CONFIG["checkpoints"],
+        "run_id": None,
+    }
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    options["max_workers"] = max(1, options["max_workers"])
+    if options["load_engine"] not in LOAD_ENGINES:
+        raise ValueError(f"Unknown load engine '{options['load_engine']}', expected one of {LOAD_ENGINES}")
+    if options["warehouse"] not in WAREHOUSES:
+        raise ValueError(f"Unknown warehouse '{options['warehouse']}', expected one of {WAREHOUSES}")
+    if options["metrics_format"] not in METRICS_FORMATS:
+        raise ValueError(f"Unknown metrics format '{options['metrics_format']}', expected one of {METRICS_FORMATS}")
+    if options["frame_engine"] not in FRAME_ENGINES:
+        raise ValueError(f"Unknown frame engine '{options['frame_engine']}', expected one of {FRAME_ENGINES}")
+    return options
+
+
+def start_run(options, run_id=None, restart=False):
+    """
+    Resolve the run id of the checkpoints (see `main_ingest`) and log the
+    run options.
+    """
+    if options["checkpoints"]:
+        if restart:
+            clear_checkpoints()
+        options["run_id"] = resolve_run_id(run_id)
+    if options["streaming"]:
+        logging.info(f"Streaming mode enabled with batches of {options['batch_size']:,} rows")
+    if options["encode_ids"]:
+        logging.info("Key columns encoded as integer codes until they are loaded")
+    if options["pipeline"]:
+        logging.info(f"Pipelined loads enabled with queues of {options['pipeline_queue_size']} batch(es)")
+    if options["incremental"]:
+        logging.info("Incremental mode enabled" + (" (full refresh requested)" if options["full_refresh"] else ""))
+    if options["cdc"]:
+        logging.info("Change data capture enabled for the PostgreSQL tables"
+                     + (" (new snapshots requested)" if options["full_refresh"] else ""))
+    if options["warehouse"] == 'duckdb':
+        logging.info(f"Loading into the local DuckDB warehouse {WAREHOUSE_CONFIG['duckdb_path']}")
+    else:
+        logging.info(f"Load engine: {options['load_engine']}")
+    if options["cache"]:
+        logging.info(f"Local source cache enabled in {INGEST_CONFIG['cache_dir']}")
+    if options["checkpoints"]:
+        logging.info(f"Checkpoints enabled for run {options['run_id']}")
+    return options
+
+
+def ingest_table(source, run_id=None, pg_engine=None, csv_path=None, connect=None, **overrides):
+    """
+    Ingest a single source (one of the dicts returned by
+    `discover_sources`) on a connection of the shared pool.
+
+    This is the callable of the per-table Airflow tasks: each table is
+    retried, timed and limited by the ingestion pool on its own, and the
+    tables of a DAG run share its `run_id` for checkpoints. `overrides` are
+    the options of `main_ingest` (streaming, batch_size, load_engine, ...);
+    `pg_engine`, `csv_path` and `connect` replace the PostgreSQL engine,
+    the CSV directory and the warehouse connection factory.
+    Returns the table's result record (pushed as the task's XCom) and
+    raises if the table failed, so Airflow retries it.
+    """
+    options = start_run(resolve_options(max_workers=1, **overrides), run_id)
+    pool = (WarehouseConnectionPool(max_size=1, connect=connect) if connect
+            else get_warehouse_pool(options["warehouse"]))
+    try:
+        if pg_engine is None:
+            pg_engine = get_pg_engine()
+        csv_path = Path(csv_path) if csv_path else default_csv_path()
+        result = _run_source(source, pool, pg_engine, csv_path, options)
+    finally:
+        if connect:
+            pool.close_all()
+
+    status = "❌ FAILED" if result["error"] else "⏭ skipped" if result["skipped"] else "✓ loaded"
+    logging.info(f"{status:10} {result['table']:40} {result['rows']:>12,} rows {result['seconds']:>8.1f}s")
+    emit_run_metrics([result], result["seconds"], options, pool)
+    if result["error"]:
+        raise RuntimeError(f"Ingestion failed for {result['table']}: {result['error']}")
+    return result
+
+
+def main_ingest(streaming=None, batch_size=None, max_workers=None, incremental=None, cdc=None, full_refresh=False,
+                force=False, load_engine=None, metrics_file=None, metrics_format=None, cache=None,
+                frame_engine=None, csv_workers=None, transforms=None, kpi_store=None, encode_ids=None, pipeline=None,
+                pipeline_queue_size=None, warehouse=None, run_id=None, restart=False, pg_engine=None, csv_path=None,
+                connect=None):
     """
     Main function to extract data from all sources (PostgreSQL & CSVs)
     and load it into the Snowflake Bronze layer.
+
+    When `streaming` is enabled every table is read in batches of
+    `batch_size` rows and each batch is written to Snowflake as soon as it
+    is read, so peak memory is bounded by the batch size rather than the
+    table size. With `pipeline` the batches of a table are also extracted,
+    serialized and uploaded concurrently, through queues of
+    `pipeline_queue_size` batches that block the source when the upload
+    falls behind (see `scripts/ingest_pipeline.py`). With `encode_ids` the
+    key columns travel as integer codes of a dictionary shared by the
+    tables and are decoded by the loaders (see `scripts/id_encoding.py`).
+
+    With `max_workers` > 1 sources are ingested concurrently by a bounded
+    thread pool, each worker on its own pooled Snowflake connection, so the
+    wall-clock time approaches that of the slowest table. A failing table
+    does not stop the others; all failures are reported together at the
+    end.
+
+    The PostgreSQL engine and the Snowflake connections come from the
+    process-wide pools of `connections.py`: they are opened on first use
+    and reused by every table, worker and later run in the process.
+
+    With `incremental` the PostgreSQL tables are extracted from their
+    persisted high-watermark and appended or merged into bronze;
+    `full_refresh` forces a full reload that resets the watermarks.
+
+    With `cdc` they are kept in sync through logical replication instead:
+    the inserts, updates and deletes recorded by a replication slot per
+    table since the last run are merged into bronze, and the slot position
+    is saved locally (see `scripts/cdc.py`). The first run, or
+    `full_refresh`, loads a snapshot.
+
+    CSV files whose content has not changed since their last successful
+    load are skipped; `force` reloads them anyway, as well as the tables
+    already loaded in a resumed run.
+
+    `load_engine` selects how rows reach Snowflake: 'write_pandas' or
+    'copy' (local Parquet staging + parallel PUT + one COPY INTO per table,
+    see `scripts/bronze_loaders.py`).
+
+    `warehouse` 'duckdb' loads bronze into the local DuckDB file of
+    WAREHOUSE_CONFIG instead of Snowflake, so the pipeline runs offline
+    (see `scripts/duckdb_warehouse.py`); the load engine does not apply.
+
+    Every table is timed per stage (connect, checksum, extract, transform,
+    load) along with rows, bytes and peak RSS. The per-table records and a
+    run summary are logged as JSON records and, with `metrics_file`, written
+    as JSON or StatsD lines (`metrics_format`), see `scripts/ingest_metrics.py`.
+
+    With `cache` every full read of a source goes through the local
+    columnar cache (`scripts/bronze_cache.py`): an unchanged CSV file or
+    PostgreSQL table is read from its memory-mapped Parquet copy instead
+    of being parsed or extracted again.
+
+    `frame_engine` selects the DataFrame engine that parses whole CSV
+    files: 'pandas' or the multithreaded 'polars' (see
+    `scripts/frame_engines.py`); streamed files are always read with pandas.
+    With `csv_workers` > 1 the pandas engine splits large files into byte
+    ranges parsed by that many processes (`scripts/parallel_csv.py`).
+    CSV files may be gzip or zstd compressed (.csv.gz, .csv.zst).
+
+    With `transforms` the PRELOAD_TRANSFORMS of config.py (column pruning,
+    normalization, deduplication, aggregation) are applied to the batches
+    of the tables that declare them before they are loaded, and the rows
+    they drop are reported in the metrics (see `scripts/preload_transforms.py`).
+
+    With `kpi_store` the loaded rows of the orders, customers, products and
+    order items also update the local KPI store of the business summary,
+    which retracts the previous version of changed rows
+    (see `scripts/kpi_store.py`).
+
+    With checkpoints (INGEST_CHECKPOINTS, on by default) the progress of
+    every table and chunk is saved under `run_id` (Airflow passes its run
+    id, so a task retry resumes the failed attempt; by hand the last
+    unfinished run is resumed unless `restart` is set). Tables already
+    loaded in the run are skipped, interrupted ones continue from the
+    first incomplete chunk, and each table is committed together with its
+    load id in the load log, so a replay never loads the same rows twice.
+    The checkpoints are cleared once every table has been loaded.
+
+    The Airflow DAG runs the same ingestion as one mapped `ingest_table`
+    task per source instead (see `discover_sources`).
+
+    Options left as None default to the values in `INGEST_CONFIG`.
+    `pg_engine`, `csv_path` and `connect` replace the PostgreSQL engine,
+    the CSV directory and the warehouse connection factory, which lets the
+    benchmark run against local stand-ins.
+    Returns a list of per-table result records, which Airflow pushes as
+    the task's XCom.
     """
-    
-    conn_sf = None  # Initialize connection to None
+    options = resolve_options(
+        streaming=streaming, batch_size=batch_size, max_workers=max_workers, incremental=incremental, cdc=cdc,
+        full_refresh=full_refresh, force=force, load_engine=load_engine,
+        metrics_file=metrics_file, metrics_format=metrics_format, cache=cache,
+        frame_engine=frame_engine, csv_workers=csv_workers, transforms=transforms, kpi_store=kpi_store,
+        encode_ids=encode_ids, pipeline=pipeline, pipeline_queue_size=pipeline_queue_size, warehouse=warehouse
+    )
+    start_run(options, run_id, restart)
+    max_workers = options["max_workers"]
+
+    # A custom connection factory gets a private pool; otherwise the process-wide pool is reused
+    pool = (WarehouseConnectionPool(max_size=max_workers, connect=connect) if connect
+            else get_warehouse_pool(options["warehouse"], max_workers))
+    started = time.perf_counter()
     try:
-        # --- Connect to Snowflake ---
-        # Add role to Snowflake config for correct permissions
-        snowflake_config_with_role = SNOWFLAKE_CONFIG.copy()
-        snowflake_config_with_role['role'] = os.getenv("SNOWFLAKE_ROLE", "ACCOUNTADMIN")
-        
-        conn_sf = snowflake.connector.connect(**snowflake_config_with_role)
-        logging.info("✅ Connected to Snowflake successfully")
-
-        # --- Extract from PostgreSQL ---
-        logging.info("=" * 20 + " Starting PostgreSQL Ingestion " + "=" * 20)
-        pg_engine = create_engine(
-            f'postgresql://{PG_CONFIG["user"]}:{PG_CONFIG["password"]}@{PG_CONFIG["host"]}:{PG_CONFIG["port"]}/{PG_CONFIG["database"]}'
-        )
-        pg_tables = ['raw_customers', 'raw_orders']
-
-        for table in pg_tables:
-            logging.info(f"Reading table: {table} from PostgreSQL...")
-            df = pd.read_sql(f'SELECT * FROM {table}', pg_engine)
-            logging.info(f"Loaded {len(df):,} rows from {table}")
-            
-            # Use lowercase with quoting for consistency
-            table_name_sf = table.lower()
-            logging.info(f"Writing to Snowflake table: {table_name_sf}...")
-            write_pandas(conn_sf, df, table_name_sf)
-            logging.info(f"✓ Successfully wrote {table_name_sf} to Snowflake")
-
-        # --- Extract from CSV files ---
-        logging.info("=" * 20 + " Starting CSV Ingestion " + "=" * 20)
-        csv_path = project_root / 'data' / 'raw_data'
-        
-        if not csv_path.exists():
-            raise FileNotFoundError(f"Critical error: CSV directory not found at {csv_path}")
-
-        csv_files = [
-            f for f in os.listdir(csv_path) 
-            if f.endswith('.csv') 
-            and 'customers' not in f 
-            and 'orders' not in f
-        ]
-        
-        logging.info(f"Found {len(csv_files)} CSV files to process.")
-
-        for file in csv_files:
-            logging.info(f"Reading file: {file}...")
-            df = pd.read_csv(csv_path / file)
-            logging.info(f"Loaded {len(df):,} rows from {file}")
-            
-            # Generate a clean, lowercase table name
-            table_name_sf = "raw_" + os.path.splitext(file)[0]\
-                .replace('olist_', '')\
-                .replace('_dataset', '')
-            
-            logging.info(f"Writing to Snowflake table: {table_name_sf}...")
-            write_pandas(conn_sf, df, table_name_sf)
-            logging.info(f"✓ Successfully wrote {table_name_sf} to Snowflake")
+        if pg_engine is None:
+            pg_engine = get_pg_engine(pool_size=max_workers)
+        csv_path = Path(csv_path) if csv_path else default_csv_path()
+        sources = discover_sources(csv_path)
+        logging.info(f"Found {len(sources)} sources to ingest with {max_workers} worker(s).")
+
+        if max_workers == 1:
+            results = [
+                _run_source(source, pool, pg_engine, csv_path, options)
+                for source in sources
+            ]
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ingest') as executor:
+                futures = [
+                    executor.submit(_run_source, source, pool, pg_engine, csv_path, options)
+                    for source in sources
+                ]
+                results = [future.result() for future in futures]
 
     except Exception as e:
         logging.error(f"❌ An error occurred during the ingestion process: {e}")
         # Raise the exception to make the Airflow task fail
         raise
     finally:
-        # --- This block ensures the connection is always closed ---
-        if conn_sf:
-            conn_sf.close()
-            logging.info("Snowflake connection closed.")
-    
+        # --- A private pool is closed here; the shared one stays open for reuse ---
+        if connect:
+            pool.close_all()
+        # Every table is loaded (or failed), so the codes of the run are no longer needed
+        if options["encode_ids"]:
+            shared_dictionary().reset()
+
+    # --- Summary ---
     logging.info("=" * 50)
+    for result in results:
+        status = "❌ FAILED" if result["error"] else "⏭ skipped" if result["skipped"] else "✓ loaded"
+        logging.info(f"{status:10} {result['table']:40} {result['rows']:>12,} rows {result['seconds']:>8.1f}s")
+    skipped = sum(result["skipped"] for result in results)
+    logging.info(f"Loaded {len(results) - skipped} source(s), skipped {skipped} unchanged source(s).")
+    wall_seconds = time.perf_counter() - started
+    logging.info(f"Total wall-clock time: {wall_seconds:.1f}s")
+    emit_run_metrics(results, wall_seconds, options, pool)
+
+    failures = [result for result in results if result["error"]]
+    if failures:
+        failed_tables = ", ".join(result["table"] for result in failures)
+        logging.error(f"❌ Ingestion failed for {len(failures)} of {len(results)} tables: {failed_tables}")
+        # Raise to make the Airflow task fail once every table has been attempted
+        raise RuntimeError(f"Ingestion failed for: {failed_tables}")
+
+    if options["checkpoints"]:
+        clear_checkpoints()
+
     logging.info("✅✅✅ Ingestion process completed successfully! ✅✅✅")
     logging.info("=" * 50)
+    return results
+
+
+def emit_run_metrics(results, wall_seconds, options, sf_pool=None):
+    """
+    Log the per-table and run metrics as JSON records and write the
+    metrics file if one is configured. The run record includes the
+    statistics of the connection pools (`sf_pool` for a private pool). A metrics file that cannot be
+    written is reported but does not fail the ingestion.
+    """
+    run = summarize_run(results, wall_seconds, options)
+    run["connections"] = pool_stats()
+    warehouse = options["warehouse"]
+    if sf_pool is not None:
+        run["connections"][warehouse] = sf_pool.stats()
+    sf_stats = run["connections"][warehouse]
+    if sf_stats:
+        label = "DuckDB" if warehouse == 'duckdb' else "Snowflake"
+        logging.info(
+            f"{label} connections: {sf_stats['opened']} opened, {sf_stats['reused']} reused, "
+            f"{sf_stats['waits']} wait(s) ({sf_stats['wait_seconds']:.1f}s)"
+        )
+    tables = [result["metrics"] for result in results if result["metrics"]]
+    stage_text = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in run["stage_seconds"].items())
+    logging.info(f"Time by stage (summed over tables): {stage_text}")
+    if options["metrics_log"]:
+        log_metrics(run, tables)
+    if options["metrics_file"]:
+        try:
+            write_metrics_file(options["metrics_file"], run, tables, fmt=options["metrics_format"])
+        except OSError as e:
+            logging.warning(f"⚠️ Could not write metrics file {options['metrics_file']}: {e}")
+    return run
+
+
+def parse_args(argv=None):
+    """
+    Parse command line options for running the ingestion by hand.
+    """
+    parser = argparse.ArgumentParser(description="Load Olist raw data into the Snowflake Bronze layer.")
+    parser.add_argument('--stream', action='store_true', default=None,
+                        help="Stream tables in batches instead of loading them fully into memory.")
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help="Rows per batch in streaming mode (default: INGEST_BATCH_SIZE).")
+    parser.add_argument('--max-workers', type=int, default=None,
+                        help="Number of tables ingested in parallel (default: INGEST_MAX_WORKERS).")
+    parser.add_argument('--incremental', action='store_true', default=None,
+                        help="Extract PostgreSQL tables from their stored watermark (default: INGEST_INCREMENTAL).")
+    parser.add_argument('--cdc', action='store_true', default=None,
+                        help="Merge the PostgreSQL changes of the replication slots (default: INGEST_CDC).")
+    parser.add_argument('--full-refresh', action='store_true',
+                        help="With --incremental or --cdc, reload the PostgreSQL tables in full "
+                             "(resetting their watermarks or slots).")
+    parser.add_argument('--force', action='store_true',
+                        help="Reload CSV files even if they are unchanged since their last load, and tables "
+                             "already loaded in the resumed run.")
+    parser.add_argument('--load-engine', choices=LOAD_ENGINES, default=None,
+                        help="How rows are loaded into Snowflake (default: INGEST_LOAD_ENGINE).")
+    parser.add_argument('--warehouse', choices=WAREHOUSES, default=None,
+                        help="Warehouse of the bronze tables: snowflake, or duckdb to run offline "
+                             "(default: WAREHOUSE).")
+    parser.add_argument('--metrics-file', default=None,
+                        help="Write per-stage metrics of the run to this file (default: INGEST_METRICS_FILE).")
+    parser.add_argument('--metrics-format', choices=METRICS_FORMATS, default=None,
+                        help="Format of the metrics file: json or statsd (default: INGEST_METRICS_FORMAT).")
+    parser.add_argument('--cache', action='store_true', default=None,
+                        help="Read sources through the local Parquet cache (default: INGEST_CACHE).")
+    parser.add_argument('--frame-engine', choices=FRAME_ENGINES, default=None,
+                        help="DataFrame engine of whole-file CSV reads (default: INGEST_FRAME_ENGINE).")
+    parser.add_argument('--csv-workers', type=int, default=None,
+                        help="Processes parsing a large CSV file in parallel (default: INGEST_CSV_WORKERS).")
+    parser.add_argument('--transforms', action='store_true', default=None,
+                        help="Apply the pre-load transformations of PRELOAD_TRANSFORMS (default: INGEST_TRANSFORMS).")
+    parser.add_argument('--kpi-store', action='store_true', default=None,
+                        help="Update the local KPI store with the loaded rows (default: INGEST_KPI_STORE).")
+    parser.add_argument('--encode-ids', action='store_true', default=None,
+                        help="Hold the key columns as integer codes until they are loaded "
+                             "(default: INGEST_ENCODE_IDS).")
+    parser.add_argument('--pipeline', action='store_true', default=None,
+                        help="Extract, serialize and upload the batches of a table concurrently "
+                             "(default: INGEST_PIPELINE).")
+    parser.add_argument('--pipeline-queue-size', type=int, default=None,
+                        help="Batches buffered between pipeline stages (default: INGEST_PIPELINE_QUEUE_SIZE).")
+    parser.add_argument('--run-id', default=None,
+                        help="Id of the run the checkpoints belong to (default: resume the last unfinished run).")
+    parser.add_argument('--restart', action='store_true',
+                        help="Discard the checkpoints of an unfinished run and start over.")
+    return parser.parse_args(argv)
 
 
 if __name__ == '__main__':
-    main_ingest()
\ No newline at end of file
+    args = parse_args()
+    main_ingest(
+        streaming=args.stream,
+        batch_size=args.batch_size,
+        max_workers=args.max_workers,
+        incremental=args.incremental,
+        cdc=args.cdc,
+        full_refresh=args.full_refresh,
+        force=args.force,
+        load_engine=args.load_engine,
+        metrics_file=args.metrics_file,
+        metrics_format=args.metrics_format,
+        cache=args.cache,
+        frame_engine=args.frame_engine,
+        csv_workers=args.csv_workers,
+        transforms=args.transforms,
+        kpi_store=args.kpi_store,
+        encode_ids=args.encode_ids,
+        pipeline=args.pipeline,
+        pipeline_queue_size=args.pipeline_queue_size,
+        warehouse=args.warehouse,
+        run_id=args.run_id,
+        restart=args.restart
+    )
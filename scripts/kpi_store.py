@@ -0,0 +1,571 @@
+"""
+Incrementally maintained KPI store of the business summary.
+
+The summary of the data-quality report (revenue, average order value,
+average delivery time, top state, top category, orders per month) is
+recomputed from every raw row. This store keeps it as small aggregate
+tables in a local SQLite file (INGEST_KPI_STORE_PATH), updated by the
+ingestion with the rows it loads (INGEST_KPI_STORE, `--kpi-store`):
+
+- `agg_orders`    orders, delivered orders and delivery days per
+                  purchase month, customer state and order status;
+- `agg_items`     order items, valued items and revenue per purchase
+                  month, customer state and product category;
+- `agg_customers` customers per state.
+
+Next to them the store keeps one narrow row per order, customer, product
+and order item (the columns the aggregates depend on). When rows are
+loaded, only the ones that are new or differ from their stored version
+count as changed; the contributions of everything they affect (an
+order's items follow its month, a customer's orders and items follow
+its state, a product's items follow its category) are subtracted from
+the aggregates with the old rows and added back with the new ones, in
+one transaction. Updated and deleted rows are therefore retracted, the
+result does not depend on the order tables are loaded in, and it equals
+a full recompute (revenue is kept in integer cents, so retractions are
+exact).
+
+A full load of a table replaces its rows (rows missing from the load
+are retracted); incremental and CDC loads upsert and delete. Rows are
+staged in the store by their position in the load while a table loads
+and applied once the load is committed, so a load that resumes after an
+interruption applies each of its rows once.
+
+    python scripts/kpi_store.py --summary
+    python scripts/kpi_store.py --monthly --state SP
+    python scripts/kpi_store.py --rebuild --data-dir data/raw_data
+    python scripts/kpi_store.py --verify --data-dir data/raw_data
+"""
+import argparse
+import logging
+import sqlite3
+import sys
+import time
+from contextlib import closing
+from pathlib import Path
+
+import pandas as pd
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+from config import INGEST_CONFIG
+from scripts.bronze_schemas import csv_file_path
+from scripts.frame_engines import PandasEngine, compare_metrics
+from scripts.id_encoding import decode_ids
+
+# Narrow rows kept per source table: entity name, key columns and the columns aggregates depend on
+ENTITIES = {
+    "raw_orders": ("orders", ["order_id"], ["customer_id", "month", "status", "delivery_days"]),
+    "raw_customers": ("customers", ["customer_id"], ["state"]),
+    "raw_products": ("products", ["product_id"], ["category"]),
+    "raw_order_items": ("items", ["order_id", "order_item_id"], ["product_id", "value_cents"]),
+}
+KPI_TABLES = tuple(ENTITIES)
+# Entities kept once per key (the first row), as the report drops duplicate products;
+# repeated keys of the others all count, told apart by their occurrence number (seq)
+DEDUPLICATED = ("products",)
+
+_COLUMN_TYPES = {"order_item_id": "INTEGER", "delivery_days": "INTEGER", "value_cents": "INTEGER"}
+
+_AGGREGATES = """
+CREATE TABLE IF NOT EXISTS agg_orders (
+    month TEXT, state TEXT, status TEXT,
+    orders INTEGER, delivered INTEGER, delivery_days INTEGER,
+    PRIMARY KEY (month, state, status)
+);
+CREATE TABLE IF NOT EXISTS agg_items (
+    month TEXT, state TEXT, category TEXT,
+    items INTEGER, valued_items INTEGER, revenue_cents INTEGER,
+    PRIMARY KEY (month, state, category)
+);
+CREATE TABLE IF NOT EXISTS agg_customers (state TEXT PRIMARY KEY, customers INTEGER);
+CREATE TABLE IF NOT EXISTS open_stages (source_table TEXT PRIMARY KEY, replace_rows INTEGER);
+"""
+
+# Contributions of the affected rows (a_orders, a_items, a_customers) to every aggregate.
+# Unknown dimensions (an item whose order is not loaded yet) are grouped under ''.
+_CONTRIBUTIONS = {
+    "agg_customers": (
+        ["state"], ["customers"],
+        "SELECT COALESCE(c.state, ''), :sign * COUNT(*) "
+        "FROM a_customers a JOIN e_customers c ON c.customer_id = a.customer_id GROUP BY 1"
+    ),
+    "agg_orders": (
+        ["month", "state", "status"], ["orders", "delivered", "delivery_days"],
+        "SELECT COALESCE(o.month, ''), COALESCE(c.state, ''), COALESCE(o.status, ''), :sign * COUNT(*), "
+        ":sign * COUNT(CASE WHEN o.delivery_days > 0 THEN 1 END), "
+        ":sign * COALESCE(SUM(CASE WHEN o.delivery_days > 0 THEN o.delivery_days END), 0) "
+        "FROM a_orders a JOIN e_orders o ON o.order_id = a.order_id "
+        "LEFT JOIN e_customers c ON c.customer_id = o.customer_id GROUP BY 1, 2, 3"
+    ),
+    "agg_items": (
+        ["month", "state", "category"], ["items", "valued_items", "revenue_cents"],
+        "SELECT COALESCE(o.month, ''), COALESCE(c.state, ''), COALESCE(p.category, ''), :sign * COUNT(*), "
+        ":sign * COUNT(i.value_cents), :sign * COALESCE(SUM(i.value_cents), 0) "
+        "FROM a_items a JOIN e_items i ON i.order_id = a.order_id AND i.order_item_id = a.order_item_id "
+        "LEFT JOIN e_orders o ON o.order_id = i.order_id "
+        "LEFT JOIN e_customers c ON c.customer_id = o.customer_id "
+        "LEFT JOIN e_products p ON p.product_id = i.product_id GROUP BY 1, 2, 3"
+    ),
+}
+
+# How changed rows of an entity spread to the affected rows of every aggregate, in order
+_PROPAGATION = {
+    "orders": [
+        "INSERT OR IGNORE INTO a_orders SELECT order_id FROM changed",
+    ],
+    "customers": [
+        "INSERT OR IGNORE INTO a_customers SELECT customer_id FROM changed",
+        "INSERT OR IGNORE INTO a_orders SELECT o.order_id FROM e_orders o JOIN changed c ON c.customer_id = o.customer_id",
+    ],
+    "products": [
+        "INSERT OR IGNORE INTO a_items SELECT i.order_id, i.order_item_id FROM e_items i "
+        "JOIN changed c ON c.product_id = i.product_id",
+    ],
+    "items": [
+        "INSERT OR IGNORE INTO a_items SELECT order_id, order_item_id FROM changed",
+    ],
+}
+# Items follow the month and state of their order
+_ORDER_ITEMS = (
+    "INSERT OR IGNORE INTO a_items SELECT i.order_id, i.order_item_id FROM e_items i "
+    "JOIN a_orders a ON a.order_id = i.order_id"
+)
+
+
+def _definitions(columns):
+    return ", ".join(f"{c} {_COLUMN_TYPES.get(c, 'TEXT')}" for c in columns)
+
+
+def _entity_ddl(entity, keys, columns):
+    # Stored rows, and rows staged by their position in the load
+    return [
+        f"CREATE TABLE IF NOT EXISTS e_{entity} ({_definitions(keys)}, seq INTEGER, {_definitions(columns)}, "
+        f"PRIMARY KEY ({', '.join(keys)}, seq))",
+        f"CREATE TABLE IF NOT EXISTS s_{entity} (position INTEGER PRIMARY KEY, {_definitions(keys + columns)})",
+    ]
+
+
+def project_rows(table, df):
+    """
+    Return the narrow rows the store keeps for a DataFrame of a source
+    table, in the entity's column order (with its key columns decoded).
+    """
+    df = decode_ids(df)
+    if table == "raw_orders":
+        purchase = df["order_purchase_timestamp"]
+        rows = pd.DataFrame({
+            "order_id": df["order_id"],
+            "customer_id": df["customer_id"],
+            "month": purchase.dt.strftime('%Y-%m'),
+            "status": df["order_status"],
+            "delivery_days": (df["order_delivered_customer_date"] - purchase).dt.days.astype('Int64'),
+        })
+    elif table == "raw_customers":
+        rows = pd.DataFrame({"customer_id": df["customer_id"], "state": df["customer_state"]})
+    elif table == "raw_products":
+        rows = pd.DataFrame({"product_id": df["product_id"], "category": df["product_category_name"]})
+    elif table == "raw_order_items":
+        rows = pd.DataFrame({
+            "order_id": df["order_id"],
+            "order_item_id": df["order_item_id"],
+            "product_id": df["product_id"],
+            "value_cents": ((df["price"] + df["freight_value"]) * 100).round().astype('Int64'),
+        })
+    else:
+        raise ValueError(f"{table} does not feed the KPI store, expected one of {KPI_TABLES}")
+    rows = rows.astype(object)
+    return rows.where(rows.notna(), None)
+
+
+class KpiStore:
+    """
+    The SQLite KPI store at `path` (default: INGEST_CONFIG["kpi_store_path"]).
+    Every call opens its own connection, so ingestion threads and
+    processes can share one store; writes are serialized by SQLite.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path or INGEST_CONFIG["kpi_store_path"])
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_AGGREGATES)
+            for entity, keys, columns in ENTITIES.values():
+                for statement in _entity_ddl(entity, keys, columns):
+                    conn.execute(statement)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=120, isolation_level=None)
+
+    def _insert_staged(self, conn, table, df, position):
+        entity, keys, columns = ENTITIES[table]
+        rows = project_rows(table, df)
+        rows.insert(0, "position", range(position, position + len(rows)))
+        conn.executemany(f"INSERT OR REPLACE INTO s_{entity} VALUES ({', '.join('?' for _ in rows.columns)})",
+                         rows.itertuples(index=False, name=None))
+
+    def open_stage(self, table, replace, keep_rows=0):
+        """
+        Start staging the rows of a load of `table`, keeping the first
+        `keep_rows` rows staged by an interrupted attempt of the same load.
+        `replace` makes the load replace every stored row of the table.
+        """
+        entity = ENTITIES[table][0]
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            is_open = conn.execute("SELECT 1 FROM open_stages WHERE source_table = ?", (table,)).fetchone()
+            conn.execute(f"DELETE FROM s_{entity} WHERE position >= ?", (keep_rows if is_open else 0,))
+            conn.execute("INSERT OR REPLACE INTO open_stages VALUES (?, ?)", (table, int(replace)))
+            conn.execute("COMMIT")
+
+    def stage(self, table, df, position):
+        """
+        Stage the rows of a DataFrame of `table` that start at row
+        `position` of the load. Staging the same rows again replaces them.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._insert_staged(conn, table, df, position)
+            conn.execute("COMMIT")
+
+    def commit_stage(self, table):
+        """
+        Apply the staged rows of `table` to the aggregates. Returns the
+        number of changed rows, or None when no load of the table is staged.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT replace_rows FROM open_stages WHERE source_table = ?", (table,)).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                return None
+            try:
+                changed = self._apply(conn, table, replace=bool(row[0]))
+                conn.execute("DELETE FROM open_stages WHERE source_table = ?", (table,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return changed
+
+    def apply_changes(self, table, upserts, deletes=None, truncate=False):
+        """
+        Apply a batch of changes of `table` at once: `upserts` (a
+        DataFrame with one row per key), the keys in `deletes` (a Series,
+        single-key tables) and, first, a truncation of the table. Returns
+        the number of changed rows.
+        """
+        entity = ENTITIES[table][0]
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(f"DELETE FROM s_{entity}")
+                if len(upserts):
+                    self._insert_staged(conn, table, upserts, 0)
+                removed = None if deletes is None or truncate else [(key,) for key in deletes]
+                changed = self._apply(conn, table, replace=truncate, removed=removed)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return changed
+
+    def _apply(self, conn, table, replace, removed=None):
+        entity, keys, columns = ENTITIES[table]
+        stored = f"e_{entity}"
+        identity = keys + ["seq"]
+        match = " AND ".join(f"s.{k} = e.{k}" for k in identity)
+        same = " AND ".join(f"s.{c} IS e.{c}" for c in columns)
+        row_columns = ", ".join(identity + columns)
+        started = time.perf_counter()
+
+        # The staged rows numbered per key in load order
+        key_list = ", ".join(keys)
+        conn.execute(
+            f"CREATE TEMP TABLE staged AS SELECT {row_columns} FROM ("
+            f"SELECT *, ROW_NUMBER() OVER (PARTITION BY {key_list} ORDER BY position) AS seq FROM s_{entity})"
+            + (" WHERE seq = 1" if entity in DEDUPLICATED else "")
+        )
+        conn.execute(f"CREATE TEMP TABLE changed AS SELECT {row_columns} FROM {stored} WHERE 0")
+        conn.execute("CREATE TEMP TABLE a_orders (order_id TEXT PRIMARY KEY)")
+        conn.execute("CREATE TEMP TABLE a_customers (customer_id TEXT PRIMARY KEY)")
+        conn.execute("CREATE TEMP TABLE a_items (order_id TEXT, order_item_id INTEGER, "
+                     "PRIMARY KEY (order_id, order_item_id))")
+        try:
+            # New or different staged rows, then stored rows the load removes (with their stored values)
+            conn.execute(
+                f"INSERT INTO changed SELECT s.* FROM staged s LEFT JOIN {stored} e ON {match} "
+                f"WHERE e.seq IS NULL OR NOT ({same})"
+            )
+            gone = f"NOT EXISTS (SELECT 1 FROM staged s WHERE {match})"
+            if replace:
+                conn.execute(f"CREATE TEMP TABLE removed AS SELECT {row_columns} FROM {stored} e WHERE {gone}")
+            else:
+                conn.execute(f"CREATE TEMP TABLE removed AS SELECT {row_columns} FROM {stored} WHERE 0")
+                if removed:
+                    conn.execute(f"CREATE TEMP TABLE deleted_keys ({keys[0]} TEXT PRIMARY KEY)")
+                    conn.executemany("INSERT OR IGNORE INTO deleted_keys VALUES (?)", removed)
+                    conn.execute(
+                        f"INSERT INTO removed SELECT e.* FROM {stored} e "
+                        f"JOIN deleted_keys d ON d.{keys[0]} = e.{keys[0]} WHERE {gone}"
+                    )
+            conn.execute("INSERT INTO changed SELECT * FROM removed")
+            changed = conn.execute("SELECT COUNT(*) FROM changed").fetchone()[0]
+            if changed:
+                for statement in _PROPAGATION[entity]:
+                    conn.execute(statement)
+                conn.execute(_ORDER_ITEMS)
+                self._accumulate(conn, -1)
+                conn.execute(f"DELETE FROM {stored} WHERE ({', '.join(identity)}) IN "
+                             f"(SELECT {', '.join(identity)} FROM removed)")
+                conn.execute(f"INSERT OR REPLACE INTO {stored} ({row_columns}) SELECT * FROM staged "
+                             f"WHERE ({', '.join(identity)}) IN (SELECT {', '.join(identity)} FROM changed)")
+                self._accumulate(conn, 1)
+            conn.execute(f"DELETE FROM s_{entity}")
+        finally:
+            for temp_table in ("staged", "changed", "removed", "deleted_keys", "a_orders", "a_customers", "a_items"):
+                conn.execute(f"DROP TABLE IF EXISTS temp.{temp_table}")
+        logging.info(f"📈 KPI store: {changed:,} changed {entity} row(s) applied in "
+                     f"{(time.perf_counter() - started) * 1000:.0f} ms")
+        return changed
+
+    def _accumulate(self, conn, sign):
+        for aggregate, (dimensions, measures, select) in _CONTRIBUTIONS.items():
+            updates = ", ".join(f"{m} = {m} + excluded.{m}" for m in measures)
+            conn.execute(
+                f"INSERT INTO {aggregate} ({', '.join(dimensions + measures)}) {select} "
+                f"ON CONFLICT ({', '.join(dimensions)}) DO UPDATE SET {updates}",
+                {"sign": sign}
+            )
+            conn.execute(f"DELETE FROM {aggregate} WHERE {' AND '.join(f'{m} = 0' for m in measures)}")
+
+    def _query(self, sql, params=()):
+        with closing(self._connect()) as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def _series(self, sql, dtype):
+        rows = self._query(sql)
+        return pd.Series([value for _, value in rows], index=pd.Index([key for key, _ in rows], dtype=object),
+                         dtype=dtype)
+
+    def metrics(self):
+        """
+        Return the aggregates the summary is built from, with the names and
+        types of `summary_metrics` of the frame engines.
+        """
+        items, valued, cents = self._query(
+            "SELECT COALESCE(SUM(items), 0), COALESCE(SUM(valued_items), 0), COALESCE(SUM(revenue_cents), 0) "
+            "FROM agg_items"
+        )[0]
+        delivered, days = self._query(
+            "SELECT COALESCE(SUM(delivered), 0), COALESCE(SUM(delivery_days), 0) FROM agg_orders"
+        )[0]
+        return {
+            "total_value": cents / 100.0,
+            "valued_items": valued,
+            "category_items": self._series(
+                "SELECT category, SUM(items) FROM agg_items WHERE category != '' GROUP BY 1 ORDER BY 1", 'int64'
+            ),
+            "category_revenue": self._series(
+                "SELECT category, SUM(revenue_cents) / 100.0 FROM agg_items WHERE category != '' GROUP BY 1 ORDER BY 1",
+                'float64'
+            ),
+            "delivered_orders": delivered,
+            "delivery_days_total": days,
+            "orders_by_month": self._series(
+                "SELECT month, SUM(orders) FROM agg_orders WHERE month != '' GROUP BY 1 ORDER BY 1", 'int64'
+            ),
+            "order_status": self._series(
+                "SELECT status, SUM(orders) FROM agg_orders WHERE status != '' GROUP BY 1 ORDER BY 1", 'int64'
+            ),
+            "customers_by_state": self._series(
+                "SELECT state, customers FROM agg_customers WHERE state != '' ORDER BY 1", 'int64'
+            ),
+        }
+
+    def summary(self):
+        """
+        Return the KPIs of the report's business summary.
+        """
+        metrics = self.metrics()
+        states, categories = metrics["customers_by_state"], metrics["category_items"]
+        months = metrics["orders_by_month"]
+        return {
+            "total_revenue": metrics["total_value"],
+            "average_order_value": (
+                metrics["total_value"] / metrics["valued_items"] if metrics["valued_items"] else None
+            ),
+            "average_delivery_days": (
+                metrics["delivery_days_total"] / metrics["delivered_orders"] if metrics["delivered_orders"] else None
+            ),
+            "top_state": states.idxmax() if len(states) else None,
+            "most_sold_category": categories.idxmax() if len(categories) else None,
+            "peak_month": months.idxmax() if len(months) else None,
+            "orders_by_month": {month: int(count) for month, count in months.items()},
+        }
+
+    def monthly(self, state=None, category=None):
+        """
+        Return the monthly time series (orders, average delivery days,
+        items and revenue), optionally for one customer state or product
+        category (the order columns then cover the orders with an item of
+        that category).
+        """
+        params = {"state": state, "category": category}
+        where = "WHERE month != ''" + (" AND state = :state" if state is not None else "")
+        items_where = where + (" AND category = :category" if category is not None else "")
+        with closing(self._connect()) as conn:
+            items = pd.read_sql(
+                f"SELECT month, SUM(items) AS items, SUM(revenue_cents) / 100.0 AS revenue "
+                f"FROM agg_items {items_where} GROUP BY month", conn, params=params, index_col="month"
+            )
+            if category is not None:
+                return items.sort_index()
+            orders = pd.read_sql(
+                f"SELECT month, SUM(orders) AS orders, "
+                f"CAST(SUM(delivery_days) AS REAL) / NULLIF(SUM(delivered), 0) AS average_delivery_days "
+                f"FROM agg_orders {where} GROUP BY month", conn, params=params, index_col="month"
+            )
+        return orders.join(items, how='outer').sort_index()
+
+    def reset(self):
+        """
+        Remove every stored row and aggregate.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for name in ("agg_orders", "agg_items", "agg_customers", "open_stages"):
+                conn.execute(f"DELETE FROM {name}")
+            for entity, _, _ in ENTITIES.values():
+                conn.execute(f"DELETE FROM e_{entity}")
+                conn.execute(f"DELETE FROM s_{entity}")
+            conn.execute("COMMIT")
+
+
+class KpiFeed:
+    """
+    The rows of one table load on their way to the KPI store: staged
+    batch by batch and applied once the load is committed.
+    """
+
+    def __init__(self, store, table, replace=True):
+        self.store = store
+        self.table = table
+        self.replace = replace
+        self.position = 0
+
+    def start(self, skip_rows=0):
+        """
+        Start the load, after the first `skip_rows` rows when it resumes.
+        """
+        self.store.open_stage(self.table, self.replace, keep_rows=skip_rows)
+        self.position = skip_rows
+
+    def add(self, df):
+        self.store.stage(self.table, df, self.position)
+        self.position += len(df)
+
+    def commit(self):
+        self.store.commit_stage(self.table)
+
+
+def kpi_feed(table, options, replace=True):
+    """
+    Return the KpiFeed of a table load, or None when the KPI store is
+    disabled or the table does not feed it. `replace` is False for loads
+    that only carry new or changed rows (incremental windows).
+    """
+    if not options.get("kpi_store") or table not in ENTITIES:
+        return None
+    return KpiFeed(KpiStore(), table, replace)
+
+
+def recompute_metrics(data_dir):
+    """
+    Compute the metrics of `KpiStore.metrics` from the raw CSV files, the
+    way the data-quality report does.
+    """
+    engine = PandasEngine()
+    frames = {table: engine.read(csv_file_path(data_dir, table), table) for table in KPI_TABLES}
+    metrics = engine.summary_metrics(frames)
+    delivery_days = metrics.pop("delivery_days")
+    states = frames["raw_customers"]["customer_state"].astype(object).value_counts()
+    metrics.update(
+        delivered_orders=len(delivery_days),
+        delivery_days_total=int(delivery_days.sum()),
+        customers_by_state=states[states.index.notna()].astype('int64').sort_index(),
+    )
+    return metrics, frames
+
+
+def rebuild(store, frames):
+    """
+    Replace the store's rows with whole tables.
+    """
+    for table, df in frames.items():
+        store.open_stage(table, replace=True)
+        store.stage(table, df, 0)
+        store.commit_stage(table)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Query, rebuild or verify the KPI store.")
+    parser.add_argument('--store', default=None, help="SQLite file of the store (default: INGEST_KPI_STORE_PATH).")
+    parser.add_argument('--data-dir', default=str(project_root / 'data' / 'raw_data'),
+                        help="Directory with the raw CSV files (--rebuild, --verify).")
+    parser.add_argument('--summary', action='store_true', help="Print the business summary KPIs.")
+    parser.add_argument('--monthly', action='store_true', help="Print the monthly time series.")
+    parser.add_argument('--state', default=None, help="With --monthly, only this customer state.")
+    parser.add_argument('--category', default=None, help="With --monthly, only this product category.")
+    parser.add_argument('--rebuild', action='store_true', help="Load the store from the raw CSV files.")
+    parser.add_argument('--verify', action='store_true',
+                        help="Compare the store with a full recompute from the raw CSV files.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    store = KpiStore(args.store)
+    frames = None
+    if args.rebuild or args.verify:
+        started = time.perf_counter()
+        expected, frames = recompute_metrics(Path(args.data_dir))
+        logging.info(f"Recomputed the metrics from {args.data_dir} in {time.perf_counter() - started:.2f}s")
+    if args.rebuild:
+        store.reset()
+        rebuild(store, frames)
+    if args.verify:
+        started = time.perf_counter()
+        actual = store.metrics()
+        logging.info(f"Read the metrics from the store in {(time.perf_counter() - started) * 1000:.1f} ms")
+        differences = compare_metrics(expected, actual)
+        if differences:
+            logging.error(f"❌ The KPI store differs from a full recompute: {', '.join(differences)}")
+            sys.exit(1)
+        logging.info("✅ The KPI store matches a full recompute")
+    if args.summary or not (args.monthly or args.rebuild or args.verify):
+        started = time.perf_counter()
+        summary = store.summary()
+        elapsed = (time.perf_counter() - started) * 1000
+
+        def fmt(value, pattern):
+            return 'n/a' if value is None else format(value, pattern)
+
+        print(f"""
+Business Insights (KPI store, {elapsed:.1f} ms):
+{'=' * 50}
+💰 Total Revenue: R$ {summary['total_revenue']:,.2f}
+📊 Average Order Value: R$ {fmt(summary['average_order_value'], '.2f')}
+⏱️  Average Delivery Time: {fmt(summary['average_delivery_days'], '.1f')} days
+🏆 Top State: {summary['top_state'] or 'N/A'}
+🎯 Most Sold Category: {summary['most_sold_category'] or 'N/A'}
+📦 Peak Month: {summary['peak_month'] or 'N/A'}
+""")
+    if args.monthly:
+        print(store.monthly(args.state, args.category).to_string())
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
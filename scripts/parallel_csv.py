@@ -0,0 +1,282 @@
+"""
+Parallel CSV reader for large raw files.
+
+A source can be one file, a directory of part files or a glob pattern
+(e.g. `data/raw_data/geolocation/part-*.csv.gz`). Plain files larger than
+`split_bytes` are split into byte ranges that end at a newline outside
+quoted fields, so a quoted value with embedded newlines is never cut in
+two. The ranges (and every compressed file, which cannot be split) are
+parsed in a process pool with pyarrow's CSV parser, using the declared
+schema of the table, and the resulting Arrow tables are concatenated
+without copying before the one conversion to pandas.
+
+gzip (.gz) and zstd (.zst) files are decompressed by pyarrow while they
+are parsed. Parse throughput grows with the number of worker processes
+until the disk is the bottleneck; files below `split_bytes` are read
+directly (`read_csv_typed`), where a pool would only add overhead.
+
+Example:
+    python scripts/parallel_csv.py data/raw_data/olist_geolocation_dataset.csv --workers 8 --compare
+"""
+import argparse
+import csv
+import glob
+import io
+import logging
+import mmap
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+from config import INGEST_CONFIG
+from scripts.bronze_cache import arrow_to_frame
+from scripts.bronze_schemas import (
+    COMPRESSION_SUFFIXES, CSV_SUFFIXES, get_schema, read_csv_typed, table_for_csv, validate_columns,
+)
+
+# Bytes scanned at a time when counting quotes before a split point
+SCAN_BLOCK_BYTES = 16 * 1024 * 1024
+
+
+def compression_of(path):
+    """
+    Return the pyarrow codec of a compressed file ('gzip', 'zstd'), or None.
+    """
+    return COMPRESSION_SUFFIXES.get(Path(path).suffix)
+
+
+def expand_sources(source):
+    """
+    Return the CSV files of a source: a file, a directory (its CSV files),
+    a glob pattern or a list of files, sorted by name.
+    """
+    if isinstance(source, (list, tuple)):
+        return sorted(Path(p) for p in source)
+    path = Path(source)
+    if path.is_dir():
+        files = [p for p in path.iterdir() if p.name.endswith(CSV_SUFFIXES)]
+    elif glob.has_magic(str(source)):
+        files = [Path(p) for p in glob.glob(str(source)) if Path(p).is_file()]
+    else:
+        files = [path] if path.exists() else []
+    if not files:
+        raise FileNotFoundError(f"No CSV file found for {source}")
+    return sorted(files)
+
+
+def read_header(path):
+    """
+    Return the column names of a CSV file and the byte offset where its
+    data rows start (None for compressed files, which are not split).
+    """
+    compression = compression_of(path)
+    with pa.input_stream(str(path), compression=compression) as stream:
+        head = b''
+        while b'\n' not in head:
+            block = stream.read(64 * 1024)
+            if not block:
+                break
+            head += block
+    line = head.split(b'\n', 1)[0]
+    columns = next(csv.reader([line.decode('utf-8-sig').rstrip('\r')]))
+    return columns, None if compression else len(line) + 1
+
+
+def _count_quotes(mapped, start, end):
+    return sum(
+        mapped[position:min(position + SCAN_BLOCK_BYTES, end)].count(b'"')
+        for position in range(start, end, SCAN_BLOCK_BYTES)
+    )
+
+
+def split_ranges(path, data_start, parts, min_bytes):
+    """
+    Split the data rows of a plain CSV file into at most `parts` byte
+    ranges of at least `min_bytes`. Every range ends at a newline that is
+    outside quoted fields: a newline is inside a quoted field exactly when
+    an odd number of quote characters precede it (escaped quotes come in
+    pairs), so the quotes are counted up to every split point.
+    """
+    size = os.path.getsize(path)
+    parts = min(parts, (size - data_start) // max(min_bytes, 1))
+    if parts <= 1:
+        return [(data_start, size)] if size > data_start else []
+
+    boundaries = [data_start]
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        position, quotes = data_start, 0
+        for part in range(1, parts):
+            target = data_start + (size - data_start) * part // parts
+            if target <= position:
+                continue
+            quotes += _count_quotes(mapped, position, target)
+            position = target
+            while position < size:
+                newline = mapped.find(b'\n', position)
+                if newline == -1:
+                    quotes += _count_quotes(mapped, position, size)
+                    position = size
+                    break
+                quotes += _count_quotes(mapped, position, newline)
+                position = newline + 1
+                if quotes % 2 == 0:
+                    break
+            if position >= size:
+                break
+            boundaries.append(position)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def arrow_types(table):
+    """
+    Return the pyarrow parse types of a table's declared columns. Text and
+    category columns are parsed as strings and nullable integers (written
+    as "25.0" in the public dataset) as floats; `arrow_to_frame` casts them
+    to the declared dtypes afterwards.
+    """
+    types = {}
+    for column, dtype in get_schema(table)["columns"].items():
+        if dtype.startswith('datetime64'):
+            types[column] = pa.timestamp('ns')
+        elif dtype in ('int8', 'int16', 'int32', 'int64'):
+            types[column] = pa.type_for_alias(dtype)
+        elif dtype == 'float64' or dtype.startswith('Int'):
+            types[column] = pa.float64()
+        else:
+            types[column] = pa.string()
+    return types
+
+
+def parse_range(path, start, end, column_names, table, use_threads=False):
+    """
+    Parse the rows of `path` between byte offsets `start` and `end` (the
+    whole file after its header when `start` is None) into an Arrow table
+    with the declared columns of `table`.
+    """
+    compression = compression_of(path)
+    if start is None:
+        source = pa.input_stream(str(path), compression=compression)
+        skip_rows = 1
+    else:
+        with open(path, 'rb') as f:
+            f.seek(start)
+            source = io.BytesIO(f.read(end - start))
+        skip_rows = 0
+    types = arrow_types(table)
+    with source:
+        return pacsv.read_csv(
+            source,
+            read_options=pacsv.ReadOptions(column_names=column_names, skip_rows=skip_rows, use_threads=use_threads),
+            # Comments and descriptions can contain quoted line breaks
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(
+                column_types=types, include_columns=list(types), strings_can_be_null=True,
+            ),
+        )
+
+
+def plan_ranges(files, table, workers, split_bytes):
+    """
+    Check the header of every file and return the (path, start, end,
+    column names) parse tasks: byte ranges of plain files, whole
+    compressed files.
+    """
+    tasks = []
+    for path in files:
+        column_names, data_start = read_header(path)
+        validate_columns(table, column_names)
+        if data_start is None:
+            tasks.append((str(path), None, None, column_names))
+            continue
+        for start, end in split_ranges(path, data_start, workers, split_bytes):
+            tasks.append((str(path), start, end, column_names))
+    return tasks
+
+
+def read_arrow_parallel(source, table, workers=None, split_bytes=None):
+    """
+    Read a CSV source (file, directory or glob) with the declared schema of
+    `table` into one Arrow table, parsing its ranges in `workers` processes.
+    """
+    workers = workers or INGEST_CONFIG["csv_workers"]
+    split_bytes = split_bytes or INGEST_CONFIG["csv_split_bytes"]
+    files = expand_sources(source)
+    tasks = plan_ranges(files, table, workers, split_bytes)
+    started = time.perf_counter()
+    if len(tasks) <= 1 or workers <= 1:
+        tables = [parse_range(*task, table, use_threads=True) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            tables = list(pool.map(parse_range, *zip(*tasks), [table] * len(tasks)))
+    if not tables:
+        tables = [pa.table({column: pa.array([], type) for column, type in arrow_types(table).items()})]
+    arrow_table = pa.concat_tables(tables)
+    seconds = time.perf_counter() - started
+    size = sum(os.path.getsize(path) for path in files)
+    logging.info(
+        f"⚡ Parsed {arrow_table.num_rows:,} rows of {table} from {len(files)} file(s) in {len(tasks)} range(s) "
+        f"with {min(workers, max(len(tasks), 1))} process(es) in {seconds:.2f}s "
+        f"({size / 1e6 / seconds if seconds else 0:.1f} MB/s)"
+    )
+    return arrow_table
+
+
+def read_csv_parallel(source, table=None, workers=None, split_bytes=None):
+    """
+    Read a CSV source (file, directory or glob) into a pandas DataFrame
+    with the declared schema of `table` (derived from the file name by
+    default). A single plain file below `split_bytes`, or a table without
+    a declared schema, is read directly with `read_csv_typed`.
+    """
+    files = expand_sources(source)
+    table = table or table_for_csv(files[0])
+    split_bytes = split_bytes or INGEST_CONFIG["csv_split_bytes"]
+    small = len(files) == 1 and not compression_of(files[0]) and os.path.getsize(files[0]) < 2 * split_bytes
+    if get_schema(table) is None or small:
+        if len(files) > 1:
+            raise ValueError(f"{table} has no declared schema; multi-file sources need one")
+        return read_csv_typed(files[0], table)
+    return arrow_to_frame(read_arrow_parallel(files, table, workers, split_bytes), table)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Parse a CSV source with the parallel reader.")
+    parser.add_argument('source', help="CSV file (optionally .gz/.zst), directory or glob pattern.")
+    parser.add_argument('--table', default=None, help="Bronze table of the source (default: from the file name).")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Parser processes (default: INGEST_CSV_WORKERS).")
+    parser.add_argument('--split-bytes', type=int, default=None,
+                        help="Minimum bytes per range (default: INGEST_CSV_SPLIT_BYTES).")
+    parser.add_argument('--compare', action='store_true',
+                        help="Also read a single file with read_csv_typed and check the results are identical.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    files = expand_sources(args.source)
+    table = args.table or table_for_csv(files[0])
+    df = arrow_to_frame(read_arrow_parallel(files, table, args.workers, args.split_bytes), table)
+    if args.compare:
+        if len(files) > 1:
+            raise ValueError("--compare needs a single file")
+        started = time.perf_counter()
+        expected = read_csv_typed(files[0], table)
+        logging.info(f"read_csv_typed parsed {len(expected):,} rows in {time.perf_counter() - started:.2f}s")
+        if not df.equals(expected) or not df.dtypes.equals(expected.dtypes):
+            logging.error("❌ The parallel reader differs from read_csv_typed")
+            sys.exit(1)
+        logging.info("✅ The parallel reader matches read_csv_typed")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,250 @@
+"""
+Declarative pre-load transformations of the Bronze tables.
+
+PRELOAD_TRANSFORMS in config.py declares, per table, steps that run on
+every batch between extraction and load, in this order:
+
+- "columns": keep only these columns (pruning).
+- "normalize": value normalizations per column, applied in order:
+  "strip", "lower", "upper", "ascii" (drop accents) and "round:N".
+  Category columns are normalized once per category, not per row.
+- "dedupe": drop rows already seen in this or an earlier batch, compared
+  on these columns (True: every column) through a 64-bit row hash. Memory
+  grows with the number of distinct rows (one hash each), not with the
+  table.
+- "aggregate": one row per "by" key, with one of "first", "last", "min",
+  "max", "sum", "count" or "mean" per column of "columns"; other columns
+  are dropped. Batches are reduced to mergeable partials (sum and count
+  for a mean), so memory is bounded by the number of keys; the result is
+  emitted once the source is exhausted.
+
+The transformations are off unless INGEST_TRANSFORMS (`--transforms`) is
+set. Rows dropped by every step are counted and reported with the table's
+metrics. A table with transformations does not resume an interrupted load
+in the middle (deduplication and aggregation state is not checkpointed):
+a retry reloads it from the start, while a committed load is still
+skipped.
+"""
+import logging
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+from config import PRELOAD_TRANSFORMS
+from scripts.ingest_metrics import record, stage
+
+NORMALIZATIONS = ('strip', 'lower', 'upper', 'ascii', 'round')
+AGGREGATIONS = ('first', 'last', 'min', 'max', 'sum', 'count', 'mean')
+# Partial aggregates are merged once they hold this many rows
+COMPACT_ROWS = 500000
+
+
+def _normalize_values(series, operations):
+    for operation in operations:
+        name, _, argument = operation.partition(':')
+        if name == 'strip':
+            series = series.str.strip()
+        elif name == 'lower':
+            series = series.str.lower()
+        elif name == 'upper':
+            series = series.str.upper()
+        elif name == 'ascii':
+            series = series.str.normalize('NFKD').str.replace('[\u0300-\u036f]', '', regex=True)
+        elif name == 'round':
+            series = series.round(int(argument or 0))
+        else:
+            raise ValueError(f"Unknown normalization '{operation}', expected one of {NORMALIZATIONS}")
+    return series
+
+
+def normalize_column(series, operations):
+    """
+    Apply normalizations to a column. Category columns are normalized on
+    their categories, which may merge some of them.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return _normalize_values(series, operations)
+    categories = _normalize_values(pd.Series(series.cat.categories, dtype=object), operations).to_numpy(object)
+    codes = series.cat.codes.to_numpy()
+    values = np.where(codes >= 0, categories[codes], None) if len(categories) else np.full(len(codes), None)
+    return pd.Series(values, index=series.index, dtype='category')
+
+
+class StreamingAggregate:
+    """
+    A group-by over a stream of DataFrames, kept as mergeable partial
+    aggregates.
+    """
+
+    # Partial aggregates of every aggregation (computed per batch), and how partials are merged
+    PARTIALS = {
+        "first": [("first", "first")], "last": [("last", "last")],
+        "min": [("min", "min")], "max": [("max", "max")],
+        "sum": [("sum", "sum")], "count": [("count", "sum")],
+        "mean": [("sum", "sum"), ("count", "sum")],
+    }
+
+    def __init__(self, by, columns):
+        for column, aggregation in columns.items():
+            if aggregation not in AGGREGATIONS:
+                raise ValueError(f"Unknown aggregation '{aggregation}' for {column}, expected one of {AGGREGATIONS}")
+        self.by = list(by)
+        self.columns = dict(columns)
+        self.dtypes = None
+        self.order = None
+        self.partials = []
+        self.partial_rows = 0
+
+    def update(self, df):
+        if self.dtypes is None:
+            self.order = [column for column in df.columns if column in self.by or column in self.columns]
+            self.dtypes = df.dtypes
+        functions = {
+            f"{column}__{part}": (column, part)
+            for column, aggregation in self.columns.items()
+            for part, _ in self.PARTIALS[aggregation]
+        }
+        partial = df.groupby(self.by, sort=False, observed=True, dropna=False).agg(**functions)
+        self.partials.append(partial)
+        self.partial_rows += len(partial)
+        if self.partial_rows > COMPACT_ROWS and len(self.partials) > 1:
+            self._compact()
+
+    def _compact(self):
+        merged = pd.concat(self.partials)
+        functions = {
+            f"{column}__{part}": (f"{column}__{part}", combine)
+            for column, aggregation in self.columns.items()
+            for part, combine in self.PARTIALS[aggregation]
+        }
+        self.partials = [merged.groupby(level=self.by, sort=False, dropna=False).agg(**functions)]
+        self.partial_rows = len(self.partials[0])
+
+    def result(self):
+        """
+        Return the aggregated DataFrame, with the columns in source order.
+        """
+        if self.dtypes is None:
+            return None
+        if len(self.partials) > 1:
+            self._compact()
+        partial = self.partials[0]
+        df = pd.DataFrame(index=partial.index)
+        for column, aggregation in self.columns.items():
+            if aggregation == 'mean':
+                df[column] = partial[f"{column}__sum"] / partial[f"{column}__count"].replace(0, np.nan)
+            else:
+                df[column] = partial[f"{column}__{self.PARTIALS[aggregation][0][0]}"]
+        df = df.reset_index()[self.order]
+        # Kept values go back to their source dtype; sums, counts and means keep theirs
+        casts = {}
+        for column in self.order:
+            if column in self.by or self.columns[column] in ('first', 'last', 'min', 'max'):
+                dtype = self.dtypes[column]
+                casts[column] = 'category' if isinstance(dtype, pd.CategoricalDtype) else dtype
+        return df.astype(casts)
+
+
+class TransformPipeline:
+    """
+    The pre-load transformations of one table (see the module docstring).
+    `apply(batches)` transforms a stream of DataFrames; `stats()` reports
+    the rows that went in and out and what every step dropped.
+    """
+
+    def __init__(self, table, spec, batch_rows=None):
+        self.table = table
+        self.columns = spec.get("columns")
+        self.normalize = spec.get("normalize") or {}
+        dedupe = spec.get("dedupe")
+        self.deduplicate = bool(dedupe)
+        # Columns rows are compared on; None compares every column
+        self.dedupe_columns = list(dedupe) if dedupe and dedupe is not True else None
+        aggregate = spec.get("aggregate")
+        self.aggregate = StreamingAggregate(aggregate["by"], aggregate["columns"]) if aggregate else None
+        self.batch_rows = batch_rows
+        self._seen = set()
+        self.rows_in = 0
+        self.rows_out = 0
+        self.dropped = {"dedupe": 0, "aggregate": 0}
+        self.columns_pruned = 0
+
+    def _transform(self, df):
+        if self.columns is not None:
+            self.columns_pruned = len(df.columns) - len(self.columns)
+            df = df[self.columns]
+        if self.normalize:
+            df = df.assign(**{
+                column: normalize_column(df[column], operations) for column, operations in self.normalize.items()
+            })
+        if self.deduplicate:
+            hashes = pd.util.hash_pandas_object(
+                df[self.dedupe_columns] if self.dedupe_columns else df, index=False
+            ).to_numpy()
+            keep = ~pd.Series(hashes).duplicated().to_numpy()
+            keep[keep] = [value not in self._seen for value in hashes[keep].tolist()]
+            self._seen.update(hashes[keep].tolist())
+            self.dropped["dedupe"] += int(len(df) - keep.sum())
+            df = df[keep]
+        return df
+
+    def apply(self, batches):
+        """
+        Yield the transformed batches. With an aggregation the aggregated
+        rows are yielded once `batches` is exhausted, in batches of at most
+        `batch_rows` rows.
+        """
+        for df in batches:
+            self.rows_in += len(df)
+            with stage('transform'):
+                df = self._transform(df)
+                if self.aggregate is not None:
+                    self.aggregate.update(df)
+            if self.aggregate is None:
+                self.rows_out += len(df)
+                yield df
+
+        if self.aggregate is not None:
+            with stage('transform'):
+                result = self.aggregate.result()
+            if result is None:
+                return
+            self.dropped["aggregate"] = self.rows_in - self.dropped["dedupe"] - len(result)
+            self.rows_out = len(result)
+            step = self.batch_rows or len(result) or 1
+            for start in range(0, len(result), step):
+                yield result.iloc[start:start + step].reset_index(drop=True)
+        self._report()
+
+    def stats(self):
+        return {
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "rows_dropped": self.rows_in - self.rows_out,
+            "dropped_by_step": dict(self.dropped),
+            "columns_pruned": self.columns_pruned,
+        }
+
+    def _report(self):
+        stats = self.stats()
+        record(transform=stats)
+        logging.info(
+            f"🧹 Transformed {self.table}: {stats['rows_in']:,} → {stats['rows_out']:,} rows "
+            f"({self.dropped['dedupe']:,} duplicates, {self.dropped['aggregate']:,} aggregated away)"
+        )
+
+
+def preload_transform(table, options):
+    """
+    Return the TransformPipeline of a table, or None when transformations
+    are disabled or the table declares none.
+    """
+    spec = PRELOAD_TRANSFORMS.get(table)
+    if not options.get("transforms") or not spec:
+        return None
+    batch_rows = options["batch_size"] if options["streaming"] else None
+    return TransformPipeline(table, spec, batch_rows)
@@ -0,0 +1,290 @@
+"""
+Generate synthetic Olist-shaped datasets for benchmarking.
+
+All nine Bronze tables are produced with the columns and dtypes declared
+in `scripts/bronze_schemas.py` and row counts proportional to the public
+Olist dataset (scale factor 1 ~ 1.66M rows in total). Keys are 32-char
+hex strings derived deterministically from the row index, so foreign keys
+stay consistent across tables without holding every ID in memory, and
+each table is generated in chunks so memory stays flat at any scale.
+"""
+import argparse
+import binascii
+import logging
+import sys
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+from scripts.bronze_schemas import BRONZE_SCHEMAS, CSV_FILE_NAMES
+
+# Row counts of the public Olist dataset (scale factor 1)
+BASE_ROW_COUNTS = {
+    "raw_customers": 99441,
+    "raw_orders": 99441,
+    "raw_order_items": 112650,
+    "raw_order_payments": 103886,
+    "raw_order_reviews": 99224,
+    "raw_products": 32951,
+    "raw_sellers": 3095,
+    "raw_geolocation": 1000163,
+    "raw_product_category_name_translation": 71,
+}
+
+# Tables served from PostgreSQL in production; the benchmark puts them in SQLite
+POSTGRES_TABLES = ("raw_customers", "raw_orders")
+
+STATES = np.array([
+    "SP", "RJ", "MG", "RS", "PR", "SC", "BA", "DF", "ES", "GO", "PE", "CE", "PA", "MT",
+    "MA", "MS", "PB", "PI", "RN", "AL", "SE", "TO", "RO", "AM", "AC", "AP", "RR"
+])
+STATE_WEIGHTS = np.array([42, 13, 12, 5.5, 5, 3.7, 3.4, 2.2, 2, 2, 1.7, 1.3, 1, 0.9,
+                          0.8, 0.7, 0.5, 0.5, 0.5, 0.4, 0.4, 0.3, 0.25, 0.15, 0.08, 0.07, 0.05])
+STATE_WEIGHTS = STATE_WEIGHTS / STATE_WEIGHTS.sum()
+ORDER_STATUSES = np.array(["delivered", "shipped", "canceled", "unavailable", "invoiced",
+                           "processing", "created", "approved"])
+ORDER_STATUS_WEIGHTS = np.array([97.0, 1.1, 0.6, 0.6, 0.3, 0.3, 0.005, 0.002])
+ORDER_STATUS_WEIGHTS = ORDER_STATUS_WEIGHTS / ORDER_STATUS_WEIGHTS.sum()
+PAYMENT_TYPES = np.array(["credit_card", "boleto", "voucher", "debit_card"])
+PAYMENT_WEIGHTS = np.array([0.74, 0.19, 0.055, 0.015])
+CATEGORIES = np.array([f"categoria_{i:02d}" for i in range(71)])
+CITY_COUNT = 4119
+
+PURCHASE_START = np.datetime64("2016-09-04T00:00:00")
+PURCHASE_SPAN_SECONDS = 25 * 30 * 86400
+
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def _splitmix64(values):
+    """
+    Vectorized splitmix64 finalizer: a cheap, well-mixed hash of uint64s.
+    """
+    with np.errstate(over='ignore'):
+        z = (values + np.uint64(0x9E3779B97F4A7C15)) & _MASK64
+        z = ((z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)) & _MASK64
+        z = ((z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)) & _MASK64
+        return z ^ (z >> np.uint64(31))
+
+
+def hex_ids(indices, salt):
+    """
+    Return the 32-char hex ID of every entity index for a given salt.
+    The same (index, salt) always yields the same ID.
+    """
+    indices = np.asarray(indices, dtype=np.uint64)
+    salt = np.uint64(salt)
+    with np.errstate(over='ignore'):
+        high = _splitmix64(indices * np.uint64(2) + salt * np.uint64(0x100000001B3))
+        low = _splitmix64(indices * np.uint64(2) + np.uint64(1) + salt * np.uint64(0x100000001B3))
+    raw = np.empty((len(indices), 2), dtype='>u8')
+    raw[:, 0], raw[:, 1] = high, low
+    hex_bytes = binascii.hexlify(raw.tobytes())
+    return np.frombuffer(hex_bytes, dtype='S32').astype(str)
+
+
+def scaled_row_counts(scale):
+    """
+    Row count per table for a scale factor (the translation table is fixed).
+    """
+    return {
+        table: count if table == "raw_product_category_name_translation" else max(1, int(count * scale))
+        for table, count in BASE_ROW_COUNTS.items()
+    }
+
+
+def _timestamps(rng, n, start=PURCHASE_START, span_seconds=PURCHASE_SPAN_SECONDS):
+    return start + rng.integers(0, span_seconds, n).astype('timedelta64[s]')
+
+
+def _cities(rng, n):
+    # Zipf-like skew: a few large cities, a long tail of small ones
+    ranks = np.minimum(rng.zipf(1.3, n), CITY_COUNT) - 1
+    return np.char.add("cidade_", ranks.astype(str))
+
+
+def generate_chunk(table, start, stop, counts, seed=0):
+    """
+    Generate rows [start, stop) of a table as a DataFrame.
+    """
+    n = stop - start
+    index = np.arange(start, stop, dtype=np.uint64)
+    rng = np.random.default_rng([seed, zlib.crc32(table.encode()), start])
+
+    if table == "raw_customers":
+        return pd.DataFrame({
+            "customer_id": hex_ids(index, 1),
+            # ~3% of customers come back with a new customer_id
+            "customer_unique_id": hex_ids(index - (index % np.uint64(33) == 1), 2),
+            "customer_zip_code_prefix": rng.integers(1000, 99990, n, dtype=np.int32),
+            "customer_city": _cities(rng, n),
+            "customer_state": rng.choice(STATES, n, p=STATE_WEIGHTS),
+        })
+
+    if table == "raw_orders":
+        purchase = _timestamps(rng, n)
+        approved = purchase + rng.integers(600, 2 * 86400, n).astype('timedelta64[s]')
+        carrier = approved + rng.integers(86400, 5 * 86400, n).astype('timedelta64[s]')
+        delivered = carrier + rng.integers(86400, 25 * 86400, n).astype('timedelta64[s]')
+        estimated = (purchase + np.timedelta64(24, 'D')).astype('datetime64[D]')
+        status = rng.choice(ORDER_STATUSES, n, p=ORDER_STATUS_WEIGHTS)
+        undelivered = status != "delivered"
+        return pd.DataFrame({
+            "order_id": hex_ids(index, 3),
+            "customer_id": hex_ids(index, 1),
+            "order_status": status,
+            "order_purchase_timestamp": purchase,
+            "order_approved_at": pd.Series(approved).where(rng.random(n) > 0.0016),
+            "order_delivered_carrier_date": pd.Series(carrier).where(~undelivered | (status == "shipped")),
+            "order_delivered_customer_date": pd.Series(delivered).where(~undelivered),
+            "order_estimated_delivery_date": estimated.astype('datetime64[s]'),
+        })
+
+    if table == "raw_order_items":
+        order_index = rng.integers(0, counts["raw_orders"], n).astype(np.uint64)
+        return pd.DataFrame({
+            "order_id": hex_ids(order_index, 3),
+            "order_item_id": np.where(rng.random(n) < 0.1, rng.integers(2, 5, n), 1).astype(np.int16),
+            "product_id": hex_ids(rng.integers(0, counts["raw_products"], n).astype(np.uint64), 4),
+            "seller_id": hex_ids(rng.integers(0, counts["raw_sellers"], n).astype(np.uint64), 5),
+            "shipping_limit_date": _timestamps(rng, n) + np.timedelta64(6, 'D'),
+            "price": np.round(rng.lognormal(4.4, 0.95, n), 2),
+            "freight_value": np.round(rng.gamma(2.2, 9.0, n), 2),
+        })
+
+    if table == "raw_order_payments":
+        order_index = index % np.uint64(counts["raw_orders"])
+        return pd.DataFrame({
+            "order_id": hex_ids(order_index, 3),
+            "payment_sequential": (1 + index // np.uint64(counts["raw_orders"])).astype(np.int16),
+            "payment_type": rng.choice(PAYMENT_TYPES, n, p=PAYMENT_WEIGHTS),
+            "payment_installments": rng.integers(1, 11, n, dtype=np.int16),
+            "payment_value": np.round(rng.lognormal(4.7, 0.9, n), 2),
+        })
+
+    if table == "raw_order_reviews":
+        created = _timestamps(rng, n) + np.timedelta64(10, 'D')
+        has_comment = rng.random(n) < 0.41
+        return pd.DataFrame({
+            "review_id": hex_ids(index, 6),
+            "order_id": hex_ids(index % np.uint64(counts["raw_orders"]), 3),
+            "review_score": rng.choice(np.array([1, 2, 3, 4, 5], dtype=np.int8), n,
+                                       p=[0.115, 0.032, 0.083, 0.193, 0.577]),
+            "review_comment_title": pd.Series(np.where(rng.random(n) < 0.12, "recomendo", None)),
+            "review_comment_message": pd.Series(
+                np.where(has_comment, "Produto entregue antes do prazo, recomendo \"muito\"", None)
+            ),
+            "review_creation_date": created.astype('datetime64[D]').astype('datetime64[s]'),
+            "review_answer_timestamp": created + rng.integers(3600, 5 * 86400, n).astype('timedelta64[s]'),
+        })
+
+    if table == "raw_products":
+        missing = rng.random(n) < 0.0185
+        category = rng.choice(CATEGORIES, n)
+        measures = {
+            "product_name_lenght": rng.integers(5, 77, n),
+            "product_description_lenght": rng.integers(4, 3993, n),
+            "product_photos_qty": rng.integers(1, 21, n),
+            "product_weight_g": rng.integers(0, 40426, n),
+            "product_length_cm": rng.integers(7, 106, n),
+            "product_height_cm": rng.integers(2, 106, n),
+            "product_width_cm": rng.integers(6, 119, n),
+        }
+        df = pd.DataFrame({
+            "product_id": hex_ids(index, 4),
+            "product_category_name": pd.Series(category).where(~missing),
+        })
+        for column, values in measures.items():
+            # Products without a category also lack their listing metadata
+            if "lenght" in column or "photos" in column:
+                values = pd.Series(values).where(~missing)
+            df[column] = values
+        return df
+
+    if table == "raw_sellers":
+        return pd.DataFrame({
+            "seller_id": hex_ids(index, 5),
+            "seller_zip_code_prefix": rng.integers(1000, 99990, n, dtype=np.int32),
+            "seller_city": _cities(rng, n),
+            "seller_state": rng.choice(STATES, n, p=STATE_WEIGHTS),
+        })
+
+    if table == "raw_geolocation":
+        # ~19k zip prefixes, each repeated many times with jittered coordinates
+        zip_prefix = rng.integers(1000, 20015, n, dtype=np.int32)
+        return pd.DataFrame({
+            "geolocation_zip_code_prefix": zip_prefix,
+            "geolocation_lat": np.round(-23.5 + (zip_prefix % 97) * 0.1 + rng.normal(0, 0.01, n), 6),
+            "geolocation_lng": np.round(-46.6 + (zip_prefix % 89) * 0.1 + rng.normal(0, 0.01, n), 6),
+            "geolocation_city": _cities(rng, n),
+            "geolocation_state": rng.choice(STATES, n, p=STATE_WEIGHTS),
+        })
+
+    if table == "raw_product_category_name_translation":
+        return pd.DataFrame({
+            "product_category_name": CATEGORIES[start:stop],
+            "product_category_name_english": np.char.add("category_", np.arange(start, stop).astype(str)),
+        })
+
+    raise ValueError(f"Unknown table '{table}'")
+
+
+def iter_table_chunks(table, counts, chunk_rows=500000, seed=0):
+    """
+    Yield a table as DataFrames of at most `chunk_rows` rows, in the
+    declared column order.
+    """
+    columns = list(BRONZE_SCHEMAS[table]["columns"])
+    for start in range(0, counts[table], chunk_rows):
+        stop = min(start + chunk_rows, counts[table])
+        yield generate_chunk(table, start, stop, counts, seed=seed)[columns]
+
+
+def generate_dataset(output_dir, scale=1.0, sqlite_path=None, chunk_rows=500000, seed=0):
+    """
+    Write a synthetic dataset at the given scale factor.
+
+    Every table is written as a CSV file under `output_dir`. With
+    `sqlite_path`, the PostgreSQL tables (raw_customers, raw_orders) are
+    also written to that SQLite database as a local stand-in for the
+    source database. Returns the row count per table.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    counts = scaled_row_counts(scale)
+    sqlite_engine = create_engine(f"sqlite:///{sqlite_path}") if sqlite_path else None
+
+    for table in BASE_ROW_COUNTS:
+        started = time.perf_counter()
+        csv_file = output_dir / CSV_FILE_NAMES[table]
+        for chunk_number, df in enumerate(iter_table_chunks(table, counts, chunk_rows, seed)):
+            df.to_csv(csv_file, mode='w' if chunk_number == 0 else 'a', header=chunk_number == 0, index=False)
+            if sqlite_engine is not None and table in POSTGRES_TABLES:
+                df.to_sql(table, sqlite_engine, if_exists='replace' if chunk_number == 0 else 'append',
+                          index=False, chunksize=50000)
+        logging.info(f"Generated {counts[table]:,} rows for {table} in {time.perf_counter() - started:.1f}s")
+
+    if sqlite_engine is not None:
+        sqlite_engine.dispose()
+    return counts
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic Olist-shaped dataset.")
+    parser.add_argument('output_dir', help="Directory for the generated CSV files.")
+    parser.add_argument('--scale', type=float, default=1.0, help="Scale factor relative to the public dataset.")
+    parser.add_argument('--sqlite', default=None, help="Also write the PostgreSQL tables to this SQLite file.")
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args()
+    generate_dataset(args.output_dir, scale=args.scale, sqlite_path=args.sqlite, seed=args.seed)
@@ -0,0 +1,50 @@
+"""
+Shared fixtures of the test suite.
+
+The scripts import `config` and `scripts.*` from the project root, so it
+is put on the path here, as the scripts do for themselves.
+"""
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import INGEST_CONFIG  # noqa: E402
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    """
+    Keep the ingestion state (checkpoints, manifests) of a test in its own directory.
+    """
+    path = tmp_path / 'state'
+    monkeypatch.setitem(INGEST_CONFIG, "state_dir", str(path))
+    return path
+
+
+def make_batches(batches, rows):
+    """
+    Return `batches` DataFrames of `rows` rows each, numbered across batches.
+    """
+    return [
+        pd.DataFrame({
+            "order_id": [f"order-{number:05d}" for number in range(start, start + rows)],
+            "price": [float(number) for number in range(start, start + rows)],
+        })
+        for start in range(0, batches * rows, rows)
+    ]
+
+
+@pytest.fixture
+def duckdb_conn():
+    """
+    An in-memory DuckDB warehouse.
+    """
+    duckdb = pytest.importorskip("duckdb")
+    conn = duckdb.connect()
+    yield conn
+    conn.close()
@@ -0,0 +1,72 @@
+"""
+ParquetCopyLoader against the RecordingSnowflakeConnection stand-in.
+"""
+import pandas as pd
+import pyarrow.parquet as pq
+
+from conftest import make_batches
+from scripts.bronze_loaders import ParquetCopyLoader, RecordingSnowflakeConnection
+
+
+def _statements(conn, prefix):
+    return [sql for sql in conn.statements if sql.startswith(prefix)]
+
+
+def test_copy_loader_stages_chunks_and_loads_them_with_one_put_and_one_copy(tmp_path):
+    conn = RecordingSnowflakeConnection()
+    loader = ParquetCopyLoader(conn, "raw_orders", staging_dir=tmp_path, chunk_rows=10, put_parallel=4)
+    df = pd.concat(make_batches(1, 25), ignore_index=True)
+
+    loader.write(df)
+    files = sorted(loader.local_dir.glob('*.parquet'))
+    assert [pq.ParquetFile(path).metadata.num_rows for path in files] == [10, 10, 5]
+    sizes = [path.stat().st_size for path in files]
+    assert all(size > 0 for size in sizes)
+
+    stats = loader.close()
+
+    puts = _statements(conn, "PUT")
+    assert len(puts) == 1
+    assert f"file://{loader.local_dir.as_posix()}/*.parquet" in puts[0]
+    assert f"{loader.stage_path} PARALLEL=4 " in puts[0]
+    copies = _statements(conn, "COPY INTO")
+    assert len(copies) == 1
+    assert copies[0].startswith(f'COPY INTO "raw_orders" FROM {loader.stage_path} ')
+    assert conn.loaded_rows == {"raw_orders": 25}
+
+    assert stats["engine"] == "copy"
+    assert stats["files"] == 3
+    assert stats["bytes"] == sum(sizes)
+    assert stats["rows"] == stats["rows_loaded"] == 25
+    # The staged files are removed once loaded
+    assert not loader.local_dir.exists()
+
+
+def test_copy_loader_puts_pipelined_batches_as_they_are_serialized(tmp_path):
+    conn = RecordingSnowflakeConnection()
+    loader = ParquetCopyLoader(conn, "raw_orders", staging_dir=tmp_path, chunk_rows=10, put_parallel=2)
+
+    for df in make_batches(2, 15):
+        loader.upload(loader.serialize(df))
+    assert len(_statements(conn, "PUT")) == 4
+    assert all("PARALLEL=2 " in sql for sql in _statements(conn, "PUT"))
+    assert not _statements(conn, "COPY INTO")
+
+    stats = loader.close()
+
+    # close() only runs the COPY INTO, the files are already on the stage
+    assert len(_statements(conn, "PUT")) == 4
+    assert len(_statements(conn, "COPY INTO")) == 1
+    assert conn.loaded_rows == {"raw_orders": 30}
+    assert stats["files"] == 4
+    assert stats["rows"] == stats["rows_loaded"] == 30
+
+
+def test_copy_loader_without_rows_issues_no_statements(tmp_path):
+    conn = RecordingSnowflakeConnection()
+    loader = ParquetCopyLoader(conn, "raw_orders", staging_dir=tmp_path)
+
+    stats = loader.close()
+
+    assert conn.statements == []
+    assert stats["files"] == stats["rows"] == stats["rows_loaded"] == 0
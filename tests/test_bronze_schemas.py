@@ -0,0 +1,34 @@
+"""
+Typing PostgreSQL rows with the declared Bronze schemas.
+"""
+import pandas as pd
+import pytest
+
+from scripts.bronze_schemas import SchemaDriftError, apply_schema
+
+
+def _orders(purchase_timestamps):
+    rows = len(purchase_timestamps)
+    return pd.DataFrame({
+        "order_id": [f"order-{number}" for number in range(rows)],
+        "customer_id": [f"customer-{number}" for number in range(rows)],
+        "order_status": ["delivered"] * rows,
+        "order_purchase_timestamp": purchase_timestamps,
+        "order_approved_at": [None] * rows,
+        "order_delivered_carrier_date": [None] * rows,
+        "order_delivered_customer_date": [None] * rows,
+        "order_estimated_delivery_date": ["2018-01-10 00:00:00"] * rows,
+    })
+
+
+def test_text_timestamps_and_dates_are_parsed_and_nulls_kept():
+    df = apply_schema(_orders(["2018-01-01 10:00:00", "2018-01-02", None]), "raw_orders")
+    assert df["order_purchase_timestamp"].dtype == "datetime64[ns]"
+    assert df["order_purchase_timestamp"].iloc[:2].tolist() == [pd.Timestamp("2018-01-01 10:00:00"),
+                                                               pd.Timestamp("2018-01-02")]
+    assert df["order_purchase_timestamp"].isna().iloc[2]
+
+
+def test_a_malformed_timestamp_is_a_schema_violation():
+    with pytest.raises(SchemaDriftError, match="order_purchase_timestamp.*2018-13-45"):
+        apply_schema(_orders(["2018-01-01 10:00:00", "2018-13-45 99:00:00"]), "raw_orders")
@@ -0,0 +1,153 @@
+"""
+Change data capture: wal2json parsing, collapsing changes per key and
+advancing the slot only after a successful merge.
+"""
+import json
+
+import pandas as pd
+import pytest
+
+import scripts.ingest_to_bronze as ingest
+from scripts.bronze_schemas import apply_schema
+from scripts.cdc import ChangeBatch, change_batches, parse_transactions, slot_name
+from scripts.duckdb_warehouse import DuckDBLoader
+from scripts.ingest_state import get_cdc_position, set_cdc_position
+
+ORDER_COLUMNS = [
+    "order_id", "customer_id", "order_status", "order_purchase_timestamp", "order_approved_at",
+    "order_delivered_carrier_date", "order_delivered_customer_date", "order_estimated_delivery_date",
+]
+
+
+def _order(order_id, status="delivered"):
+    return {
+        "order_id": order_id, "customer_id": f"customer-{order_id}", "order_status": status,
+        "order_purchase_timestamp": "2018-01-01 10:00:00", "order_approved_at": "2018-01-01 10:15:00.5",
+        "order_delivered_carrier_date": None, "order_delivered_customer_date": None,
+        "order_estimated_delivery_date": "2018-01-20 00:00:00",
+    }
+
+
+def _row(lsn, action, columns=None, identity=None):
+    message = {"action": action}
+    if action in ('I', 'U', 'D'):
+        message.update(schema="public", table="raw_orders")
+    if columns is not None:
+        message["columns"] = [{"name": name, "type": "text", "value": value} for name, value in columns.items()]
+    if identity is not None:
+        message["identity"] = [{"name": name, "type": "text", "value": value} for name, value in identity.items()]
+    return (lsn, json.dumps(message))
+
+
+def _wal(*transactions):
+    """
+    Slot rows of whole transactions: (commit lsn, [(action, columns, identity)]).
+    """
+    rows = []
+    for lsn, changes in transactions:
+        rows.append(_row(lsn, 'B'))
+        rows.extend(_row(lsn, *change) for change in changes)
+        rows.append(_row(lsn, 'C'))
+    return rows
+
+
+def test_parse_transactions_groups_changes_and_drops_an_unfinished_transaction():
+    rows = _wal(
+        ("0/10", [('I', _order("o1"))]),
+        ("0/20", [('U', _order("o1", "shipped"), {"order_id": "o1"}), ('D', None, {"order_id": "o2"})]),
+    ) + [_row("0/30", 'B'), _row("0/30", 'I', _order("o3"))]
+
+    transactions = parse_transactions(rows)
+    assert [lsn for lsn, _ in transactions] == ["0/10", "0/20"]
+    assert transactions[1][1] == [
+        ('U', _order("o1", "shipped"), {"order_id": "o1"}),
+        ('D', {}, {"order_id": "o2"}),
+    ]
+
+
+def test_change_batch_keeps_the_last_change_of_every_key():
+    batch = ChangeBatch("order_id")
+    batch.add('I', _order("o1"), {})
+    batch.add('U', _order("o1", "shipped"), {"order_id": "o1"})
+    batch.add('I', _order("o2"), {})
+    batch.add('D', {}, {"order_id": "o2"})
+    batch.add('U', _order("o4"), {"order_id": "o3"})
+
+    upserts = batch.upserts("raw_orders")
+    assert sorted(upserts["order_id"]) == ["o1", "o4"]
+    assert upserts.set_index("order_id").loc["o1", "order_status"] == "shipped"
+    assert upserts["order_approved_at"].iloc[0] == pd.Timestamp("2018-01-01 10:15:00.5")
+    # A deleted key, and the old key of an update that changed it, are tombstones
+    assert sorted(batch.deletes()) == ["o2", "o3"]
+
+    batch.add('T', {}, {})
+    batch.add('I', _order("o5"), {})
+    assert batch.truncate and list(batch.upserts("raw_orders")["order_id"]) == ["o5"]
+    assert batch.deletes().empty
+
+
+def test_change_batches_skip_merged_transactions_and_split_on_whole_transactions():
+    transactions = parse_transactions(_wal(
+        ("0/10", [('I', _order("o1"))]),
+        ("0/20", [('I', _order("o2")), ('I', _order("o3"))]),
+        ("0/30", [('I', _order("o4"))]),
+    ))
+    batches = list(change_batches(transactions, "order_id", after_lsn="0/10", limit=2))
+    assert [(batch.lsn, batch.transactions, batch.changes) for batch in batches] == [("0/20", 1, 2), ("0/30", 1, 1)]
+
+
+@pytest.fixture
+def captured_orders(state_dir, duckdb_conn, monkeypatch):
+    """
+    raw_orders in bronze (o1, o2) at slot position 0/10, with a slot
+    holding an update of o1, the insert of o3 and the delete of o2.
+    """
+    snapshot = pd.DataFrame([_order("o1"), _order("o2")], columns=ORDER_COLUMNS)
+    DuckDBLoader(duckdb_conn, "raw_orders").write(apply_schema(snapshot, "raw_orders"))
+    slot = slot_name("raw_orders")
+    set_cdc_position("raw_orders", slot, "0/10")
+
+    wal = _wal(
+        ("0/20", [('U', _order("o1", "shipped"), {"order_id": "o1"}), ('I', _order("o3"))]),
+        ("0/30", [('D', None, {"order_id": "o2"})]),
+    )
+    advanced = []
+    monkeypatch.setattr(ingest, "slot_exists", lambda pg_engine, name: name == slot)
+    monkeypatch.setattr(ingest, "peek_changes", lambda pg_engine, name, table, limit: wal if not advanced else [])
+    monkeypatch.setattr(ingest, "advance_slot", lambda pg_engine, name, lsn: advanced.append(lsn))
+    options = ingest.resolve_options(warehouse='duckdb', cdc=True, checkpoints=False, kpi_store=False,
+                                     pipeline=False, encode_ids=False)
+    return options, advanced
+
+
+def _bronze_orders(conn):
+    return dict(conn.execute('SELECT "order_id", "order_status" FROM "raw_orders" ORDER BY 1').fetchall())
+
+
+def test_changes_are_merged_and_deletes_remove_their_key(captured_orders, duckdb_conn):
+    options, advanced = captured_orders
+    stats = ingest.ingest_postgres_cdc("raw_orders", duckdb_conn, None, options)
+
+    assert _bronze_orders(duckdb_conn) == {"o1": "shipped", "o3": "delivered"}
+    assert stats["cdc"]["upserted"] == 2 and stats["cdc"]["deleted"] == 1
+    assert get_cdc_position("raw_orders")["lsn"] == "0/30"
+    assert advanced == ["0/30"]
+
+
+def test_a_failed_merge_does_not_advance_the_position_or_the_slot(captured_orders, duckdb_conn, monkeypatch):
+    options, advanced = captured_orders
+
+    def fail(self, df):
+        raise RuntimeError("warehouse unavailable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(DuckDBLoader, "write", fail)
+        with pytest.raises(RuntimeError):
+            ingest.ingest_postgres_cdc("raw_orders", duckdb_conn, None, options)
+    assert get_cdc_position("raw_orders")["lsn"] == "0/10"
+    assert advanced == []
+
+    # The retry replays the changes from the saved position
+    ingest.ingest_postgres_cdc("raw_orders", duckdb_conn, None, options)
+    assert _bronze_orders(duckdb_conn) == {"o1": "shipped", "o3": "delivered"}
+    assert get_cdc_position("raw_orders")["lsn"] == "0/30"
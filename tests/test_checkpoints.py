@@ -0,0 +1,113 @@
+"""
+Checkpointed loads: resuming an interrupted load and replaying a committed one.
+"""
+import pytest
+
+from conftest import make_batches
+from scripts.bronze_loaders import ParquetCopyLoader, RecordingSnowflakeConnection
+from scripts.ingest_state import TableCheckpoint, get_checkpoint, resolve_run_id
+from scripts.ingest_to_bronze import load_table, skip_leading_rows
+
+BATCHES = 5
+ROWS = 10
+
+
+class Source:
+    """
+    A source of BATCHES batches that can fail after a number of them and
+    records how every read started.
+    """
+
+    def __init__(self, fail_after=None):
+        self.batches = make_batches(BATCHES, ROWS)
+        self.fail_after = fail_after
+        self.reads = []
+
+    def read_batches(self, skip_rows, resume_after):
+        self.reads.append(skip_rows)
+        for number, df in enumerate(skip_leading_rows(self.batches, skip_rows)):
+            if self.fail_after is not None and number == self.fail_after:
+                raise RuntimeError("source connection lost")
+            yield df
+
+
+def _attempt(run_id, conn, staging_dir):
+    checkpoint = TableCheckpoint(run_id, "raw_orders", "source-v1", "copy", ROWS)
+    loader = ParquetCopyLoader(conn, "raw_orders", staging_dir=staging_dir, chunk_rows=100,
+                               load_id=checkpoint.load_id)
+    return checkpoint, loader
+
+
+def _load_statements(conn):
+    return [sql for sql in conn.statements
+            if sql.startswith(("PUT", "COPY INTO", 'INSERT INTO "raw_orders"'))]
+
+
+def test_interrupted_load_resumes_from_the_first_incomplete_chunk(state_dir, tmp_path):
+    run_id = resolve_run_id("run-1")
+    conn = RecordingSnowflakeConnection()
+
+    checkpoint, loader = _attempt(run_id, conn, tmp_path / 'staging')
+    with pytest.raises(RuntimeError):
+        load_table(loader, Source(fail_after=3).read_batches, checkpoint)
+    assert get_checkpoint("raw_orders")["chunks"] == 3
+    assert get_checkpoint("raw_orders")["rows"] == 3 * ROWS
+    assert conn.loaded_rows == {}
+
+    source = Source()
+    checkpoint, loader = _attempt(run_id, conn, tmp_path / 'staging')
+    assert checkpoint.resumed
+    stats = load_table(loader, source.read_batches, checkpoint)
+
+    # The retry reads the source from chunk 4 on and keeps the 3 staged chunks
+    assert source.reads == [3 * ROWS]
+    assert stats["files"] == BATCHES
+    assert conn.loaded_rows == {"raw_orders": BATCHES * ROWS}
+    assert len([sql for sql in conn.statements if sql.startswith("COPY INTO")]) == 1
+    assert get_checkpoint("raw_orders")["status"] == "loaded"
+    assert get_checkpoint("raw_orders")["chunks"] == BATCHES
+
+
+def test_replaying_a_committed_load_does_not_load_it_again(state_dir, tmp_path):
+    run_id = resolve_run_id("run-1")
+    conn = RecordingSnowflakeConnection()
+
+    def fail_after_commit():
+        raise RuntimeError("worker killed after the commit")
+
+    # The load commits, but the attempt dies before the checkpoint records it
+    checkpoint, loader = _attempt(run_id, conn, tmp_path / 'staging')
+    with pytest.raises(RuntimeError):
+        load_table(loader, Source().read_batches, checkpoint, after_load=fail_after_commit)
+    assert conn.loaded_rows == {"raw_orders": BATCHES * ROWS}
+    assert checkpoint.load_id in conn.load_log()
+    assert get_checkpoint("raw_orders")["status"] == "loading"
+    statements = len(_load_statements(conn))
+
+    source = Source()
+    checkpoint, loader = _attempt(run_id, conn, tmp_path / 'staging')
+    load_table(loader, source.read_batches, checkpoint)
+
+    assert source.reads == []
+    assert len(_load_statements(conn)) == statements
+    assert conn.loaded_rows == {"raw_orders": BATCHES * ROWS}
+    assert list(conn.load_log()) == [checkpoint.load_id]
+    assert get_checkpoint("raw_orders")["status"] == "loaded"
+
+
+def test_a_finished_run_is_not_adopted_and_force_reloads_under_a_new_load_id(state_dir):
+    run_id = resolve_run_id("scheduled__2026-10-17")
+    checkpoint = TableCheckpoint(run_id, "raw_orders", "source-v1", "copy", ROWS)
+    checkpoint.mark_loaded()
+    assert resolve_run_id() != run_id
+
+    run_id = resolve_run_id(run_id)
+    checkpoint = TableCheckpoint(run_id, "raw_orders", "source-v1", "copy", ROWS)
+    checkpoint.mark_loaded()
+    reload = TableCheckpoint(run_id, "raw_orders", "source-v1", "copy", ROWS, reload=True)
+    assert not reload.resumed
+    assert reload.load_id != checkpoint.load_id
+    reload.save()
+    retry = TableCheckpoint(run_id, "raw_orders", "source-v1", "copy", ROWS)
+    assert retry.resumed and retry.load_id == reload.load_id
+    assert resolve_run_id() == run_id
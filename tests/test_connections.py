@@ -0,0 +1,65 @@
+"""
+The warehouse connection pool: opening connections outside its lock,
+giving back the slot of a failed connect and waking waiters on close.
+"""
+import threading
+
+import pytest
+
+from connections import WarehouseConnectionPool
+from scripts.bronze_loaders import RecordingSnowflakeConnection
+
+
+def test_a_slow_connect_does_not_block_releases_and_reuse():
+    connecting = threading.Event()
+    proceed = threading.Event()
+
+    def slow_connect():
+        connecting.set()
+        proceed.wait(5)
+        return RecordingSnowflakeConnection()
+
+    pool = WarehouseConnectionPool(2, connect=RecordingSnowflakeConnection, recycle=0)
+    first = pool.acquire()
+    pool.connect = slow_connect
+    opener = threading.Thread(target=pool.acquire)
+    opener.start()
+    assert connecting.wait(5)
+
+    pool.release(first)
+    assert pool.acquire() is first
+    assert pool.stats()["reused"] == 1
+    proceed.set()
+    opener.join(5)
+    assert pool.stats()["open"] == 2
+
+
+def test_a_failed_connect_gives_its_slot_back():
+    attempts = []
+
+    def flaky_connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("network unreachable")
+        return RecordingSnowflakeConnection()
+
+    pool = WarehouseConnectionPool(1, connect=flaky_connect, recycle=0)
+    with pytest.raises(ConnectionError):
+        pool.acquire()
+    assert pool.acquire() is not None
+    assert pool.stats()["open"] == 1
+
+
+def test_close_all_wakes_the_workers_waiting_for_a_connection():
+    pool = WarehouseConnectionPool(1, connect=RecordingSnowflakeConnection, recycle=0)
+    pool.acquire()
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+    waiter.start()
+    while not pool._waiting:
+        waiter.join(0.01)
+
+    pool.close_all()
+    waiter.join(5)
+    assert not waiter.is_alive()
+    assert len(acquired) == 1 and pool.stats()["open"] == 1
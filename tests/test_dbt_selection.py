@@ -0,0 +1,74 @@
+"""
+dbt selection planned from the changed bronze tables and the dbt project.
+"""
+import json
+
+import pytest
+
+from scripts.dbt_selection import dbt_state_dir, plan_dbt_selection, save_dbt_state
+from scripts.ingest_state import changed_tables, clear_changed_tables, record_changed_tables
+
+
+@pytest.fixture
+def dbt_project(tmp_path, state_dir):
+    """
+    A minimal dbt project with a built manifest.
+    """
+    project = tmp_path / 'dbt_project'
+    (project / 'models').mkdir(parents=True)
+    (project / 'target').mkdir()
+    (project / 'dbt_project.yml').write_text("name: olist\n")
+    (project / 'models' / 'stg_orders.sql').write_text("select * from {{ source('bronze', 'RAW_ORDERS') }}\n")
+    (project / 'target' / 'manifest.json').write_text(json.dumps({"nodes": {}}))
+    return project
+
+
+def _results(*tables, changed=True):
+    return [{"table": table, "changed": changed, "rows": 1} for table in tables]
+
+
+def test_changed_tables_select_their_downstream_models(dbt_project):
+    save_dbt_state(project_dir=dbt_project)
+    # main_ingest returns a list of records, every mapped task one record
+    results = [_results("raw_orders", "raw_sellers", changed=False) + _results("raw_customers"),
+               _results("raw_orders")[0], None]
+    plan = plan_dbt_selection(results, dbt_project)
+    assert plan["args"] == "--select source:bronze.RAW_CUSTOMERS+ source:bronze.RAW_ORDERS+"
+    assert plan["tables"] == ["raw_customers", "raw_orders"]
+    assert not plan["project_changed"]
+
+
+def test_a_changed_project_selects_modified_nodes_against_the_saved_state(dbt_project):
+    save_dbt_state(project_dir=dbt_project)
+    (dbt_project / 'models' / 'stg_orders.sql').write_text("select order_id from {{ source('bronze', 'RAW_ORDERS') }}\n")
+    plan = plan_dbt_selection(_results("raw_orders"), dbt_project)
+    assert plan["args"] == f"--select source:bronze.RAW_ORDERS+ state:modified+ --state {dbt_state_dir()}"
+    assert plan["project_changed"]
+
+
+def test_without_a_saved_manifest_the_whole_project_is_built(dbt_project):
+    plan = plan_dbt_selection(_results("raw_orders"), dbt_project)
+    assert plan["args"] == ""
+
+
+def test_nothing_changed_returns_no_plan_so_the_dag_skips_dbt(dbt_project):
+    save_dbt_state(project_dir=dbt_project)
+    # The ShortCircuitOperator skips the dbt tasks when its callable returns a falsy value
+    assert plan_dbt_selection(_results("raw_orders", changed=False), dbt_project) is None
+    assert plan_dbt_selection(None, dbt_project) is None
+
+
+def test_a_table_changed_again_during_the_build_stays_selected(dbt_project):
+    save_dbt_state(project_dir=dbt_project)
+    plan = plan_dbt_selection(_results("raw_orders", "raw_customers"), dbt_project)
+
+    # raw_orders is loaded again while dbt builds the plan
+    record_changed_tables(["raw_orders"])
+    save_dbt_state(plan, dbt_project)
+    assert changed_tables() == ["raw_orders"]
+    assert plan_dbt_selection(None, dbt_project)["args"] == "--select source:bronze.RAW_ORDERS+"
+
+    clear_changed_tables(["raw_orders"], before="2000-01-01T00:00:00+00:00")
+    assert changed_tables() == ["raw_orders"]
+    clear_changed_tables(["raw_orders"])
+    assert changed_tables() == []
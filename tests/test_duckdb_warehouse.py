@@ -0,0 +1,104 @@
+"""
+DuckDBLoader against an in-memory DuckDB warehouse.
+"""
+import pandas as pd
+import pytest
+
+from conftest import make_batches
+from config import INGEST_CONFIG
+from scripts.duckdb_warehouse import DuckDBLoader, table_exists
+from scripts.ingest_state import TableCheckpoint, get_checkpoint, resolve_run_id
+from scripts.ingest_to_bronze import load_table
+
+LOAD_ID = "load-0001"
+
+
+def _count(conn, table):
+    return conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+
+def _load_log(conn):
+    return conn.execute(
+        f'SELECT "LOAD_ID", "TABLE_NAME", "ROWS" FROM "{INGEST_CONFIG["load_log_table"]}"'
+    ).fetchall()
+
+
+def test_a_staged_load_is_committed_with_its_load_id_once(duckdb_conn):
+    loader = DuckDBLoader(duckdb_conn, "raw_orders", load_id=LOAD_ID)
+    assert loader.begin() == 0
+    for df in make_batches(2, 10):
+        loader.write(df)
+    # Nothing reaches the table before the commit
+    assert not table_exists(duckdb_conn, "raw_orders")
+    assert _count(duckdb_conn, "raw_orders_load_stage") == 20
+
+    stats = loader.close()
+    assert stats["rows"] == 20 and stats["batches"] == 2
+    assert _count(duckdb_conn, "raw_orders") == 20
+    assert _load_log(duckdb_conn) == [(LOAD_ID, "raw_orders", 20)]
+    assert not table_exists(duckdb_conn, "raw_orders_load_stage")
+
+    replay = DuckDBLoader(duckdb_conn, "raw_orders", load_id=LOAD_ID)
+    assert replay.is_committed()
+    assert not DuckDBLoader(duckdb_conn, "raw_orders", load_id="load-0002").is_committed()
+
+
+def test_replaying_a_committed_load_adds_no_rows(state_dir, duckdb_conn):
+    run_id = resolve_run_id("run-1")
+    batches = make_batches(3, 10)
+
+    def commit_then_fail():
+        raise RuntimeError("worker killed after the commit")
+
+    checkpoint = TableCheckpoint(run_id, "raw_orders", "source-v1", "duckdb", 10)
+    loader = DuckDBLoader(duckdb_conn, "raw_orders", load_id=checkpoint.load_id)
+    with pytest.raises(RuntimeError):
+        load_table(loader, lambda skip_rows, resume_after: batches, checkpoint, after_load=commit_then_fail)
+    assert _count(duckdb_conn, "raw_orders") == 30
+
+    checkpoint = TableCheckpoint(run_id, "raw_orders", "source-v1", "duckdb", 10)
+    loader = DuckDBLoader(duckdb_conn, "raw_orders", load_id=checkpoint.load_id)
+    load_table(loader, lambda skip_rows, resume_after: batches, checkpoint)
+    assert _count(duckdb_conn, "raw_orders") == 30
+    assert len(_load_log(duckdb_conn)) == 1
+    assert get_checkpoint("raw_orders")["status"] == "loaded"
+
+
+def test_an_interrupted_load_resumes_from_its_stage_table(duckdb_conn):
+    loader = DuckDBLoader(duckdb_conn, "raw_orders", load_id=LOAD_ID)
+    loader.begin()
+    for df in make_batches(2, 10):
+        loader.write(df)
+    state = loader.checkpoint_state()
+
+    resumed = DuckDBLoader(duckdb_conn, "raw_orders", load_id=LOAD_ID)
+    assert resumed.begin(state) == 20
+    resumed.write(make_batches(3, 10)[2])
+    assert resumed.close()["rows"] == 30
+    assert duckdb_conn.execute('SELECT COUNT(DISTINCT "order_id") FROM "raw_orders"').fetchone()[0] == 30
+
+    # Staged rows that do not match the checkpoint are dropped
+    stale = DuckDBLoader(duckdb_conn, "raw_customers", load_id="load-0002")
+    stale.begin()
+    stale.write(make_batches(1, 10)[0])
+    assert DuckDBLoader(duckdb_conn, "raw_customers", load_id="load-0002").begin({"rows": 5}) == 0
+    assert not table_exists(duckdb_conn, "raw_customers_load_stage")
+
+
+def test_a_merge_replaces_the_rows_of_its_keys(duckdb_conn):
+    DuckDBLoader(duckdb_conn, "raw_orders").write(make_batches(1, 10)[0])
+
+    loader = DuckDBLoader(duckdb_conn, "raw_orders", merge_key="order_id")
+    updates = make_batches(2, 10)[0].iloc[5:].assign(price=-1.0)
+    new = make_batches(2, 10)[1].iloc[:3]
+    # Columns are matched by name, not position
+    loader.write(pd.concat([updates, new])[["price", "order_id"]])
+    loader.delete(pd.Series(["order-00000"], name="order_id"))
+
+    rows = dict(duckdb_conn.execute('SELECT "order_id", "price" FROM "raw_orders"').fetchall())
+    assert len(rows) == 12
+    assert "order-00000" not in rows
+    assert rows["order-00004"] == 4.0
+    assert all(rows[f"order-{number:05d}"] == -1.0 for number in range(5, 10))
+    assert rows["order-00012"] == 12.0
+    assert loader.stats["deleted"] == 1
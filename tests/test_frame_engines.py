@@ -0,0 +1,31 @@
+"""
+The polars frame engine against the pandas reference.
+"""
+import pytest
+
+from scripts.bronze_schemas import csv_file_path
+from scripts.frame_engines import METRIC_TABLES, PandasEngine, compare_frames, compare_metrics, get_engine
+from scripts.synthetic_olist import generate_dataset
+
+pytest.importorskip("polars")
+
+
+@pytest.fixture(scope="module")
+def olist_dir(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp("olist")
+    generate_dataset(data_dir, scale=0.005)
+    return data_dir
+
+
+def test_polars_reads_the_same_frames_and_metrics_as_pandas(olist_dir):
+    reference, engine = PandasEngine(csv_workers=1), get_engine('polars')
+    frames = {reference.name: {}, engine.name: {}}
+    for table in METRIC_TABLES:
+        path = csv_file_path(olist_dir, table)
+        frames[reference.name][table] = reference.read(path, table)
+        frames[engine.name][table] = engine.read(path, table)
+        assert compare_frames(frames[reference.name][table], engine.to_pandas(frames[engine.name][table], table)) == []
+
+    expected = reference.summary_metrics(frames[reference.name])
+    assert expected["valued_items"] > 0
+    assert compare_metrics(expected, engine.summary_metrics(frames[engine.name])) == []
@@ -0,0 +1,100 @@
+"""
+Encoded keys: the encode -> load -> decode round trip and one dictionary
+shared across tables and threads.
+"""
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from scripts.duckdb_warehouse import DuckDBLoader
+from scripts.id_encoding import NULL_CODE, IdDictionary, is_encoded
+from scripts.ingest_state import TableCheckpoint, get_checkpoint, resolve_run_id
+from scripts.ingest_to_bronze import load_table
+
+pytest.importorskip("pyarrow")
+
+# Keys that are not plain lowercase hex, and two hex keys sharing their first 8 bytes
+ODD_KEYS = ["not-a-hex-key", "ABCDEF0123456789ABCDEF0123456789", "0123456789abcdef" + "0" * 16,
+            "0123456789abcdef" + "1" * 16]
+
+
+def _key(number):
+    return hashlib.md5(str(number).encode()).hexdigest()
+
+
+def _products():
+    return pd.DataFrame({"product_id": pd.array([_key(n) for n in range(200)] + ODD_KEYS + [None],
+                                                dtype="string[pyarrow]")})
+
+
+def _items():
+    keys = [_key(n) for n in range(150, 350)] + ODD_KEYS[::-1] + [None]
+    return pd.DataFrame({
+        "order_id": pd.array([_key(-n) for n in range(len(keys))], dtype="string[pyarrow]"),
+        "product_id": pd.array(keys, dtype="string[pyarrow]"),
+    })
+
+
+def _chunks(df, rows):
+    return [df.iloc[start:start + rows] for start in range(0, len(df), rows)]
+
+
+def test_tables_encoded_from_several_threads_share_codes_and_decode_back():
+    dictionary = IdDictionary()
+    products, items = _products(), _items()
+    product_chunks = _chunks(products, 16)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        encoded = list(pool.map(dictionary.encode_frame, product_chunks + _chunks(items, 16)))
+    encoded_products = pd.concat(encoded[:len(product_chunks)])
+    encoded_items = pd.concat(encoded[len(product_chunks):])
+    assert is_encoded(encoded_items["product_id"])
+
+    for original, frame in ((products, encoded_products), (items, encoded_items)):
+        pd.testing.assert_frame_equal(dictionary.decode_frame(frame), original)
+
+    # A key has one code whichever table or thread encoded it first
+    codes = pd.concat([
+        pd.DataFrame({"key": products["product_id"], "code": encoded_products["product_id"]}),
+        pd.DataFrame({"key": items["product_id"], "code": encoded_items["product_id"]}),
+    ]).dropna()
+    assert codes.groupby("key")["code"].nunique().max() == 1
+    assert codes["code"].nunique() == codes["key"].nunique()
+    # Null keys are NULL_CODE, which a join must leave out as it does nulls
+    joined = encoded_items[encoded_items["product_id"] != NULL_CODE].merge(encoded_products, on="product_id")
+    assert len(joined) == len(items.dropna().merge(products.dropna(), on="product_id"))
+
+
+def test_encoded_loads_reach_bronze_and_checkpoints_as_strings(state_dir, duckdb_conn):
+    products, items = _products(), _items()
+    load_table(DuckDBLoader(duckdb_conn, "raw_products"), lambda skip_rows, resume_after: _chunks(products, 50),
+               encode_ids=True)
+
+    run_id = resolve_run_id("run-1")
+    checkpoint = TableCheckpoint(run_id, "raw_order_items", "items-v1", "duckdb", 50, key_column="order_id")
+    loader = DuckDBLoader(duckdb_conn, "raw_order_items", load_id=checkpoint.load_id)
+
+    def interrupted(skip_rows, resume_after):
+        yield from _chunks(items, 50)[:2]
+        raise RuntimeError("source connection lost")
+
+    with pytest.raises(RuntimeError):
+        load_table(loader, interrupted, checkpoint, encode_ids=True)
+    # The resume position is the decoded key of the last staged row
+    assert get_checkpoint("raw_order_items")["resume_after"] == items["order_id"].iloc[99]
+
+    checkpoint = TableCheckpoint(run_id, "raw_order_items", "items-v1", "duckdb", 50, key_column="order_id")
+    loader = DuckDBLoader(duckdb_conn, "raw_order_items", load_id=checkpoint.load_id)
+    load_table(loader, lambda skip_rows, resume_after: _chunks(items.iloc[skip_rows:], 50), checkpoint,
+               encode_ids=True)
+
+    bronze = duckdb_conn.execute('SELECT * FROM "raw_order_items"').df()
+    pd.testing.assert_frame_equal(
+        bronze.astype(object).where(bronze.notna(), None).reset_index(drop=True),
+        items.astype(object).where(items.notna(), None).reset_index(drop=True),
+    )
+    joined = duckdb_conn.execute(
+        'SELECT COUNT(*) FROM "raw_order_items" i JOIN "raw_products" p ON p."product_id" = i."product_id"'
+    ).fetchone()[0]
+    assert joined == len(items.dropna().merge(products.dropna(), on="product_id"))
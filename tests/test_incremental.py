@@ -0,0 +1,60 @@
+"""
+Incremental extraction past a stored high-watermark.
+"""
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from config import INCREMENTAL_SOURCES
+from scripts.ingest_state import get_watermark, is_past_watermark
+from scripts.ingest_to_bronze import ingest_postgres_incremental, resolve_options
+
+
+@pytest.fixture
+def source_engine():
+    """
+    An in-memory SQLite database standing in for PostgreSQL.
+    """
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    yield engine
+    engine.dispose()
+
+
+def _insert_events(engine, first, last):
+    events = pd.DataFrame({
+        "event_id": [f"event-{number}" for number in range(first, last + 1)],
+        "event_seq": list(range(first, last + 1)),
+    })
+    events.to_sql("raw_events", engine, if_exists="append", index=False)
+
+
+@pytest.mark.parametrize("value, watermark, past", [
+    (10, "9", True),
+    (9, "9", False),
+    (2.5, "10.25", False),
+    (pd.Timestamp("2018-01-02 00:00:00"), "2018-01-01 23:59:59", True),
+    ("b", "a", True),
+])
+def test_watermarks_compare_as_the_column_type(value, watermark, past):
+    assert is_past_watermark(value, watermark) is past
+
+
+def test_a_numeric_watermark_column_picks_up_rows_past_nine(state_dir, source_engine, duckdb_conn, monkeypatch):
+    monkeypatch.setitem(INCREMENTAL_SOURCES, "raw_events", {"key": "event_id", "watermark_column": "event_seq"})
+    options = resolve_options(warehouse='duckdb', incremental=True, incremental_write='merge', streaming=False,
+                              checkpoints=False, transforms=False, kpi_store=False, encode_ids=False,
+                              pipeline=False)
+
+    _insert_events(source_engine, 1, 9)
+    ingest_postgres_incremental("raw_events", duckdb_conn, source_engine, options)
+    assert get_watermark("raw_events") == "9"
+
+    _insert_events(source_engine, 10, 12)
+    stats = ingest_postgres_incremental("raw_events", duckdb_conn, source_engine, options)
+    assert stats["rows"] == 3
+    assert get_watermark("raw_events") == "12"
+    assert duckdb_conn.execute('SELECT COUNT(*), MAX("event_seq") FROM "raw_events"').fetchone() == (12, 12)
+
+    stats = ingest_postgres_incremental("raw_events", duckdb_conn, source_engine, options)
+    assert stats["rows"] == 0
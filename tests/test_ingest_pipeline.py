@@ -0,0 +1,97 @@
+"""
+BatchPipeline: errors of every stage reach the caller, and bounded queues
+do not deadlock when a stage stops.
+"""
+import threading
+
+from conftest import make_batches
+from scripts.ingest_pipeline import BatchPipeline
+
+# Seconds a failing pipeline may take to stop before it counts as deadlocked
+STOP_SECONDS = 10
+
+
+def _consume(pipeline, upload=None):
+    """
+    Run a pipeline to the end in another thread, returning the uploaded
+    batches and the error raised to the caller.
+    """
+    outcome = {"uploaded": [], "error": None}
+
+    def run():
+        try:
+            with pipeline:
+                for df, payload in pipeline:
+                    if upload is not None:
+                        upload(len(outcome["uploaded"]))
+                    outcome["uploaded"].append(payload)
+        except Exception as e:
+            outcome["error"] = e
+
+    consumer = threading.Thread(target=run, daemon=True)
+    consumer.start()
+    consumer.join(STOP_SECONDS)
+    assert not consumer.is_alive(), "the pipeline did not stop"
+    assert not any(thread.is_alive() for thread in pipeline.threads)
+    return outcome
+
+
+class Source:
+    """
+    Endless batches, failing after `fail_after` of them; records whether
+    it was closed.
+    """
+
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.closed = False
+
+    def __iter__(self):
+        try:
+            number = 0
+            while True:
+                if number == self.fail_after:
+                    raise RuntimeError("source connection lost")
+                yield make_batches(1, 10)[0]
+                number += 1
+        finally:
+            self.closed = True
+
+
+def test_an_extract_error_reaches_the_caller():
+    source = Source(fail_after=3)
+    outcome = _consume(BatchPipeline(iter(source), len, queue_size=1))
+    assert isinstance(outcome["error"], RuntimeError)
+    assert outcome["uploaded"] == [10, 10, 10]
+    assert source.closed
+
+
+def test_a_serialize_error_reaches_the_caller():
+    source = Source()
+    serialized = []
+
+    def serialize(df):
+        if len(serialized) == 2:
+            raise ValueError("cannot write parquet")
+        serialized.append(df)
+        return len(df)
+
+    outcome = _consume(BatchPipeline(iter(source), serialize, queue_size=1))
+    assert isinstance(outcome["error"], ValueError)
+    assert outcome["uploaded"] == [10, 10]
+    assert source.closed
+
+
+def test_a_failing_upload_stops_the_stages_blocked_on_full_queues():
+    source = Source()
+
+    def upload(number):
+        if number == 1:
+            raise ConnectionError("warehouse unavailable")
+
+    pipeline = BatchPipeline(iter(source), len, queue_size=1)
+    outcome = _consume(pipeline, upload)
+    assert isinstance(outcome["error"], ConnectionError)
+    assert outcome["uploaded"] == [10]
+    assert source.closed
+    assert pipeline.errors == []
@@ -0,0 +1,67 @@
+"""
+The incrementally maintained KPI store against a full recompute.
+"""
+import pandas as pd
+import pytest
+
+from scripts.bronze_schemas import CSV_FILE_NAMES
+from scripts.frame_engines import compare_metrics
+from scripts.kpi_store import KPI_TABLES, KpiStore, main, rebuild, recompute_metrics
+from scripts.synthetic_olist import generate_dataset
+
+
+@pytest.fixture
+def olist_frames(tmp_path):
+    data_dir = tmp_path / 'raw_data'
+    generate_dataset(data_dir, scale=0.002)
+    return recompute_metrics(data_dir)[1]
+
+
+def _write_csv(frames, data_dir):
+    data_dir.mkdir(parents=True, exist_ok=True)
+    for table in KPI_TABLES:
+        frames[table].to_csv(data_dir / CSV_FILE_NAMES[table], index=False)
+    return data_dir
+
+
+def test_inserts_updates_and_deletes_match_a_full_recompute(olist_frames, tmp_path):
+    store = KpiStore(tmp_path / 'kpi.sqlite')
+    rebuild(store, olist_frames)
+    orders, items = olist_frames["raw_orders"], olist_frames["raw_order_items"]
+
+    # Insert: a new order of an existing customer, with one item
+    new_order = orders.iloc[[0]].assign(order_id="new-order", order_status="shipped")
+    new_item = items.iloc[[0]].assign(order_id="new-order", order_item_id=1, price=123.45)
+    assert store.apply_changes("raw_orders", new_order) == 1
+    assert store.apply_changes("raw_order_items", new_item) == 1
+
+    # Update: an order moves to another month and status, an item changes price
+    updated_order = orders.iloc[[1]].assign(
+        order_status="canceled", order_purchase_timestamp=pd.Timestamp("2016-09-15 12:00:00")
+    )
+    # (an item whose key appears once, as repeated keys are told apart by their position in a load)
+    unique_items = items[~items.duplicated(["order_id", "order_item_id"], keep=False)]
+    updated_item = unique_items.iloc[[0]].assign(price=unique_items["price"].iloc[0] + 10.0)
+    assert store.apply_changes("raw_orders", updated_order) == 1
+    assert store.apply_changes("raw_order_items", updated_item) == 1
+
+    # Delete: an order as change data capture reports it, and its items by a full reload of the table
+    deleted_order = orders["order_id"].iloc[2]
+    assert store.apply_changes("raw_orders", orders.iloc[0:0], deletes=pd.Series([deleted_order])) == 1
+    reloaded_items = pd.concat([items, new_item], ignore_index=True)
+    reloaded_items.loc[updated_item.index, "price"] = updated_item["price"]
+    reloaded_items = reloaded_items[reloaded_items["order_id"] != deleted_order]
+    store.open_stage("raw_order_items", replace=True)
+    store.stage("raw_order_items", reloaded_items, 0)
+    assert store.commit_stage("raw_order_items") == (items["order_id"] == deleted_order).sum()
+
+    changed = dict(olist_frames)
+    changed["raw_orders"] = pd.concat([
+        orders[~orders["order_id"].isin([deleted_order, updated_order["order_id"].iloc[0]])],
+        updated_order, new_order,
+    ])
+    changed["raw_order_items"] = reloaded_items
+    data_dir = _write_csv(changed, tmp_path / 'changed')
+    expected, _ = recompute_metrics(data_dir)
+    assert compare_metrics(expected, store.metrics()) == []
+    main(["--store", str(store.path), "--verify", "--data-dir", str(data_dir)])
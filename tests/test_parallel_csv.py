@@ -0,0 +1,69 @@
+"""
+The parallel CSV reader: split points outside quoted multiline fields,
+for plain and compressed files.
+"""
+import csv
+import gzip
+import shutil
+
+import pandas as pd
+import pytest
+
+from scripts.bronze_schemas import read_csv_typed
+from scripts.parallel_csv import read_csv_parallel, read_header, split_ranges
+
+pytest.importorskip("pyarrow")
+
+TABLE = "raw_order_reviews"
+COLUMNS = ["review_id", "order_id", "review_score", "review_comment_title", "review_comment_message",
+           "review_creation_date", "review_answer_timestamp"]
+# A quoted comment spanning many lines, with escaped quotes, placed across the middle of the file
+LONG_COMMENT = "\n".join(f'line {number}: "muito bom", recomendo,\r' for number in range(400))
+
+
+def _review(number, message):
+    return [f"review-{number:05d}", f"order-{number:05d}", number % 5 + 1, f"title {number}" if number % 3 else "",
+            message, "2018-01-01 00:00:00", "2018-01-02 10:30:00"]
+
+
+@pytest.fixture
+def reviews_csv(tmp_path):
+    path = tmp_path / "olist_order_reviews_dataset.csv"
+    rows = [_review(number, f'ok "{number}"\nsecond line' if number % 7 == 0 else "ok") for number in range(300)]
+    rows.insert(150, _review(999, LONG_COMMENT))
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(COLUMNS)
+        writer.writerows(rows)
+    return path
+
+
+def test_split_points_never_fall_inside_a_quoted_field(reviews_csv):
+    data = reviews_csv.read_bytes()
+    comment_start = data.index(b"line 0:")
+    comment_end = data.index(b"line 399:")
+    _, data_start = read_header(reviews_csv)
+    middle = data_start + (len(data) - data_start) // 2
+    # The naive split point of two ranges is inside the long comment
+    assert comment_start < middle < comment_end
+
+    ranges = split_ranges(reviews_csv, data_start, 2, 1024)
+    assert len(ranges) == 2
+    boundary = ranges[0][1]
+    assert boundary > comment_end and data[boundary - 1:boundary] == b'\n'
+    assert data[:boundary].count(b'"') % 2 == 0
+
+
+def test_parallel_reads_equal_read_csv(reviews_csv, tmp_path):
+    expected = read_csv_typed(reviews_csv, TABLE)
+    assert expected["review_comment_message"].str.contains("line 399").any()
+
+    df = read_csv_parallel(reviews_csv, TABLE, workers=4, split_bytes=1024)
+    pd.testing.assert_frame_equal(df, expected)
+
+    compressed = tmp_path / "olist_order_reviews_dataset.csv.gz"
+    with open(reviews_csv, 'rb') as source, gzip.open(compressed, 'wb') as target:
+        shutil.copyfileobj(source, target)
+    pd.testing.assert_frame_equal(read_csv_parallel(compressed, TABLE, workers=4, split_bytes=1024),
+                                  read_csv_typed(compressed, TABLE))
+    pd.testing.assert_frame_equal(read_csv_parallel(compressed, TABLE, workers=4, split_bytes=1024), expected)